@@ -1,33 +1,463 @@
-import requests
+import httpx
 import os
 import re
 import json
 import logging
-from typing import List, Dict, Any, Optional
-from youtube_transcript_api import YouTubeTranscriptApi
-from openai import OpenAI
-
-from models import Place, Coordinates
+import hashlib
+import sqlite3
+import threading
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Callable, Tuple
+
+from models import Place, Coordinates, Transcript, TranscriptSegment
+from cache import PersistentCache, MISSING, normalize_cache_key
+from singleflight import SingleFlight
+from extraction import split_transcript, merge_places
+from prefilter import Prefilter
+from transcript_store import MentionIndex, TranscriptStore
+from catalog import PlaceCatalog
+from gazetteer import Gazetteer, GazetteerMatch
+from photos import PhotoStore, photo_url
+from http_client import HttpClient
+from scheduler import Scheduler, BULK, INTERACTIVE
+from llm_backends import (
+    BackendChain,
+    BackendUnavailable,
+    CachedBackend,
+    ExtractionBackend,
+    LocalBackend,
+    OpenAIBackend,
+    PlaceCallback,
+    RegionCallback,
+    RuleBackend,
+)
+from normalization import collapse_places, names_match, normalize_place_name
+from metrics import (
+    FALLBACKS,
+    PLACES_MERGED,
+    PREFILTER_CHARS,
+    PREFILTER_KEPT_RATIO,
+    propagate,
+    span,
+)
 from config import (
     logger,
     YOUTUBE_API_KEY,
     OPENAI_API_KEY,
+    OPENAI_BASE_URL,
     GOOGLE_MAPS_API_KEY,
-    VALID_PLACE_TYPES,
+    OPENAI_MODEL,
+    LLM_CHUNK_TOKENS,
+    LLM_CHUNK_OVERLAP_TOKENS,
+    LLM_MAX_CONCURRENCY,
+    LLM_STREAMING,
+    LLM_BACKENDS,
+    LLM_TIMEOUT,
+    PREFILTER_ENABLED,
+    PREFILTER_CONTEXT_SENTENCES,
+    PREFILTER_MIN_TOKENS,
+    PREFILTER_MAX_SENTENCE_WORDS,
+    LLM_CACHE_TTL,
+    LLM_CACHE_MEMORY_ENTRIES,
+    LLM_RULES_GAZETTEER,
+    LOCAL_LLM_BASE_URL,
+    LOCAL_LLM_MODEL,
+    LOCAL_LLM_API_KEY,
+    ENRICHMENT_MAX_WORKERS,
+    ENRICHMENT_MODE,
+    DEDUP_FUZZY_THRESHOLD,
+    DEDUP_RADIUS_METERS,
+    GEOCODING_BASE_URL,
+    PLACES_BASE_URL,
+    YOUTUBE_DATA_BASE_URL,
+    HTTP_TIMEOUT,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_MAX_RETRIES,
+    HTTP_BACKOFF_BASE,
+    HTTP_BACKOFF_MAX,
+    HTTP_MAX_CONNECTIONS,
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_RESET_TIMEOUT,
+    RATE_LIMIT_GEOCODING,
+    RATE_LIMIT_PLACES,
+    RATE_LIMIT_YOUTUBE,
+    RATE_LIMIT_TRANSCRIPTS,
+    RATE_LIMIT_OPENAI,
+    RATE_LIMIT_GOOGLE_MAPS_KEY,
+    RATE_LIMIT_PROCESSES,
+    SCHEDULER_INTERACTIVE_RESERVE,
+    SCHEDULER_MAX_INTERACTIVE,
+    SCHEDULER_MAX_BULK,
+    SCHEDULER_MAX_QUEUE_INTERACTIVE,
+    SCHEDULER_MAX_QUEUE_BULK,
+    CACHE_DB_PATH,
+    CATALOG_DB_PATH,
+    GAZETTEER_PATH,
+    GAZETTEER_DB_PATH,
+    GAZETTEER_MIN_SIMILARITY,
+    GAZETTEER_FIRST_TYPES,
+    PHOTO_CACHE_DIR,
+    PHOTO_CACHE_MAX_BYTES,
+    PHOTO_WIDTHS,
+    PHOTO_DEFAULT_WIDTH,
+    TRANSCRIPT_DIR,
+    TRANSCRIPT_LANGUAGES,
+    TRANSCRIPT_MEMORY_ENTRIES,
+    TRANSCRIPT_CACHE_MAX_BYTES,
+    TRANSCRIPT_CACHE_TTL,
+    TRANSCRIPT_FALLBACK_TTL,
+    PLACES_CACHE_TTL,
+    PLACES_CACHE_NEGATIVE_TTL,
+    PLACES_CACHE_MEMORY_ENTRIES,
+    CACHE_MAX_DISK_ENTRIES,
+)
+
+# Bump when a change to the pipeline should invalidate stored analysis results
+PIPELINE_VERSION = "4"
+
+SYSTEM_PROMPT = "You are a helpful assistant that extracts tourist places from video transcripts. Always respond with valid JSON."
+
+EXTRACTION_PROMPT_TEMPLATE = """Your task is to extract places mentioned in the video transcript. Return output in JSON format:
+{{
+  "region": "the country or region the video is mostly about (e.g. \"Northern Italy\"), or null",
+  "places": [
+    {{
+      "name": "place name",
+      "description": "comprehensive description of what is worth seeing there (a few sentences)",
+      "type": "one of the types: park, mountains, sea, city, lake, monument, other"
+    }}
+  ]
+}}
+
+Extract tourist places from this video transcript: {transcript}"""
+
+# Places (New) fields requested by the single-lookup enrichment mode
+PLACES_LOOKUP_FIELD_MASK = ",".join(
+    [
+        "places.id",
+        "places.displayName",
+        "places.formattedAddress",
+        "places.location",
+        "places.rating",
+        "places.websiteUri",
+        "places.photos",
+    ]
 )
 
+# Places API accepts a location bias circle of at most 50 km
+MAX_BIAS_RADIUS_METERS = 50000.0
+
+# Language key under which a video description is stored when no transcript exists
+DESCRIPTION_LANGUAGE = "description"
+
+# Receives (stage, data) events while a video is being analyzed
+ProgressCallback = Callable[[str, Dict[str, Any]], None]
+
+
+class EnrichmentSession:
+    """Enriches places concurrently as they become known.
+
+    Places can be added one at a time while the model is still writing its
+    answer; a name matching an already added place reuses that lookup.
+    finish() takes the final, deduplicated list and returns the enriched
+    places in its order.
+    """
+
+    def __init__(
+        self,
+        analyzer: "YouTubeAnalyzer",
+        progress: Optional[ProgressCallback] = None,
+        total: Optional[int] = None,
+        mentions: Optional[MentionIndex] = None,
+    ):
+        self.analyzer = analyzer
+        self.progress = progress
+        self.total = total  # None while the number of places is not known yet
+        self.mentions = mentions
+        self._lock = threading.Lock()
+        self._futures: Dict[str, Future] = {}
+        self._keys: List[Tuple[str, Optional[str]]] = []
+        self._region: Optional[str] = None
+        self._bias: Optional[Dict[str, Any]] = None
+
+    def set_region(self, region: Optional[str]) -> None:
+        """Bias lookups towards region; the first region reported wins"""
+        with self._lock:
+            if not region or self._region:
+                return
+            self._region = region
+            if ENRICHMENT_MODE == "places":
+                self._bias = self.analyzer._location_bias(region)
+
+    def add(self, place: Dict[str, Any]) -> Future:
+        """Start enriching place, or return the lookup of a matching one"""
+        name = place.get("name") or ""
+        key = normalize_place_name(name)
+        with self._lock:
+            future = self._futures.get(key) if key else None
+            if future is None and key:
+                for other_key, other_type in self._keys:
+                    if names_match(
+                        key,
+                        other_key,
+                        place.get("type"),
+                        other_type,
+                        DEDUP_FUZZY_THRESHOLD,
+                    ):
+                        future = self._futures[other_key]
+                        break
+            if future is not None:
+                self._futures.setdefault(key, future)
+                return future
+
+            index = len(self._keys)
+            self._keys.append((key, place.get("type")))
+            place = dict(place)
+            if self.mentions and place.get("timestamp") is None:
+                place["timestamp"] = self.mentions.find(name)
+            future = self.analyzer.enrichment_executor.submit(
+                propagate(self.analyzer._enrich_place_or_fallback),
+                place,
+                index,
+                self._bias,
+            )
+            if key:
+                self._futures[key] = future
+
+        if self.progress:
+            # Report each place as soon as it is ready, in completion order
+            future.add_done_callback(
+                lambda f: self.progress(
+                    "place", {"index": index, "total": self.total, "place": f.result()}
+                )
+            )
+        return future
+
+    def finish(self, places: List[Dict[str, Any]]) -> List[Place]:
+        """Wait for every place in the final list and return them in order"""
+        futures = [self.add(place) for place in places]
+        enriched_places = []
+        seen = set()
+        for place, future in zip(places, futures):
+            enriched = future.result()
+            if id(enriched) in seen:
+                continue
+            seen.add(id(enriched))
+
+            # Chunk merging may have added details after the place was streamed
+            description = place.get("description") or ""
+            if len(description) > len(enriched.description or ""):
+                enriched.description = description
+            if enriched.type == "other" and place.get("type") not in (None, "other"):
+                enriched.type = place["type"]
+            enriched_places.append(enriched)
+        return enriched_places
+
 
 class YouTubeAnalyzer:
-    def __init__(self):
+    def __init__(self, rate_limit_processes: int = RATE_LIMIT_PROCESSES):
         self.youtube_api_key = YOUTUBE_API_KEY
         self.openai_api_key = OPENAI_API_KEY
         self.google_maps_api_key = GOOGLE_MAPS_API_KEY
 
-        # Initialize OpenAI client
-        if self.openai_api_key:
-            self.openai_client = OpenAI(api_key=self.openai_api_key)
-        else:
-            self.openai_client = None
+        # Pooled client with retries and circuit breakers for all outbound HTTP calls
+        self.http = HttpClient(
+            timeout=HTTP_TIMEOUT,
+            connect_timeout=HTTP_CONNECT_TIMEOUT,
+            max_retries=HTTP_MAX_RETRIES,
+            backoff_base=HTTP_BACKOFF_BASE,
+            backoff_max=HTTP_BACKOFF_MAX,
+            max_connections=HTTP_MAX_CONNECTIONS,
+            failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+            reset_timeout=CIRCUIT_RESET_TIMEOUT,
+        )
+        # Upstream budgets shared by interactive requests and bulk work
+        self.scheduler = Scheduler(
+            share=1 / max(1, rate_limit_processes),
+            reserve=SCHEDULER_INTERACTIVE_RESERVE,
+            max_in_flight={
+                INTERACTIVE: SCHEDULER_MAX_INTERACTIVE,
+                BULK: SCHEDULER_MAX_BULK,
+            },
+            max_queue_seconds={
+                INTERACTIVE: SCHEDULER_MAX_QUEUE_INTERACTIVE,
+                BULK: SCHEDULER_MAX_QUEUE_BULK,
+            },
+        )
+        self.http.register(
+            "geocoding",
+            GEOCODING_BASE_URL,
+            limiter=self.scheduler.budget(
+                "geocoding",
+                RATE_LIMIT_GEOCODING,
+                api_key=self.google_maps_api_key,
+                key_rate=RATE_LIMIT_GOOGLE_MAPS_KEY,
+            ),
+        )
+        self.http.register(
+            "places",
+            PLACES_BASE_URL,
+            limiter=self.scheduler.budget(
+                "places",
+                RATE_LIMIT_PLACES,
+                api_key=self.google_maps_api_key,
+                key_rate=RATE_LIMIT_GOOGLE_MAPS_KEY,
+            ),
+        )
+        self.http.register(
+            "youtube",
+            YOUTUBE_DATA_BASE_URL,
+            limiter=self.scheduler.budget("youtube", RATE_LIMIT_YOUTUBE),
+        )
+
+        # Budgets for upstreams not called through self.http
+        self.openai_limiter = self.scheduler.budget("openai", RATE_LIMIT_OPENAI)
+        self.transcript_limiter = self.scheduler.budget(
+            "transcripts", RATE_LIMIT_TRANSCRIPTS
+        )
+
+        # Place extraction backends, tried in LLM_BACKENDS order, behind a response cache
+        self.llm_cache = PersistentCache(
+            "llm",
+            CACHE_DB_PATH,
+            max_memory_entries=LLM_CACHE_MEMORY_ENTRIES,
+            ttl=LLM_CACHE_TTL,
+            max_disk_entries=CACHE_MAX_DISK_ENTRIES,
+        )
+        self.extractor = BackendChain(
+            [
+                CachedBackend(backend, self.llm_cache)
+                for backend in self._create_backends(LLM_BACKENDS)
+            ]
+        )
+
+        # Shared pool bounding the number of concurrent transcript chunk extractions
+        self.llm_executor = ThreadPoolExecutor(
+            max_workers=LLM_MAX_CONCURRENCY, thread_name_prefix="llm"
+        )
+
+        # Shared pool bounding the number of in-flight Google Maps requests
+        self.enrichment_executor = ThreadPoolExecutor(
+            max_workers=ENRICHMENT_MAX_WORKERS, thread_name_prefix="enrich"
+        )
+
+        # Geocoding and Places lookups are cached by normalized place name
+        self.geocode_cache = PersistentCache(
+            "geocode",
+            CACHE_DB_PATH,
+            max_memory_entries=PLACES_CACHE_MEMORY_ENTRIES,
+            ttl=PLACES_CACHE_TTL,
+            negative_ttl=PLACES_CACHE_NEGATIVE_TTL,
+            max_disk_entries=CACHE_MAX_DISK_ENTRIES,
+        )
+        self.places_cache = PersistentCache(
+            "places_search",
+            CACHE_DB_PATH,
+            max_memory_entries=PLACES_CACHE_MEMORY_ENTRIES,
+            ttl=PLACES_CACHE_TTL,
+            negative_ttl=PLACES_CACHE_NEGATIVE_TTL,
+            max_disk_entries=CACHE_MAX_DISK_ENTRIES,
+        )
+        # Single-lookup enrichment results (wider field mask, optionally region-biased)
+        self.place_lookup_cache = PersistentCache(
+            "places_lookup",
+            CACHE_DB_PATH,
+            max_memory_entries=PLACES_CACHE_MEMORY_ENTRIES,
+            ttl=PLACES_CACHE_TTL,
+            negative_ttl=PLACES_CACHE_NEGATIVE_TTL,
+            max_disk_entries=CACHE_MAX_DISK_ENTRIES,
+        )
+        self.lookup_flight = SingleFlight()
+
+        # Transcripts are fetched once per video and kept on disk with timestamps
+        self._transcript_api = None
+        self.transcript_store = TranscriptStore(
+            TRANSCRIPT_DIR,
+            max_memory_entries=TRANSCRIPT_MEMORY_ENTRIES,
+            max_bytes=TRANSCRIPT_CACHE_MAX_BYTES,
+            ttl=TRANSCRIPT_CACHE_TTL,
+        )
+
+        # Place photos, downloaded once and served to browsers by /api/photos
+        self.photo_store = PhotoStore(
+            PHOTO_CACHE_DIR,
+            self._fetch_photo,
+            PHOTO_WIDTHS,
+            max_bytes=PHOTO_CACHE_MAX_BYTES,
+        )
+
+        # Every enriched place, for proximity queries across videos
+        self.catalog = PlaceCatalog(CATALOG_DB_PATH)
+
+        # Well-known places resolved offline, before (or instead of) Google.
+        # The dump is imported by gazetteer.py (or serve.py / app.py on start),
+        # never here: requests only read the index
+        self.gazetteer = None
+        if GAZETTEER_PATH:
+            try:
+                self.gazetteer = Gazetteer.open_readonly(
+                    GAZETTEER_DB_PATH, min_similarity=GAZETTEER_MIN_SIMILARITY
+                )
+            except sqlite3.Error as e:
+                logger.warning(f"Gazetteer unavailable: {e}")
+            if self.gazetteer is None:
+                logger.warning(
+                    f"Gazetteer not imported into {GAZETTEER_DB_PATH} - "
+                    "run python gazetteer.py"
+                )
+
+        # Drops transcript chatter before it reaches the model
+        self.prefilter = (
+            Prefilter(
+                context=PREFILTER_CONTEXT_SENTENCES,
+                min_tokens=PREFILTER_MIN_TOKENS,
+                max_sentence_words=PREFILTER_MAX_SENTENCE_WORDS,
+                known_name=self.gazetteer.knows if self.gazetteer else None,
+            )
+            if PREFILTER_ENABLED
+            else None
+        )
+
+    @property
+    def transcript_api(self):
+        """youtube-transcript-api client, imported and created on first use"""
+        if self._transcript_api is None:
+            from youtube_transcript_api import YouTubeTranscriptApi
+
+            self._transcript_api = YouTubeTranscriptApi()
+        return self._transcript_api
+
+    @transcript_api.setter
+    def transcript_api(self, api) -> None:
+        self._transcript_api = api
+
+    def prewarm(self) -> None:
+        """Create the API clients and load hot cache entries ahead of the first analysis"""
+        self.transcript_api
+        self.extractor.prewarm()
+        for cache in (self.geocode_cache, self.places_cache, self.place_lookup_cache):
+            cache.preload()
+
+    @property
+    def pipeline_version(self) -> str:
+        """Fingerprint of everything that shapes an analysis result"""
+        fingerprint = "\n".join(
+            [
+                PIPELINE_VERSION,
+                self.extractor.fingerprint,
+                SYSTEM_PROMPT,
+                EXTRACTION_PROMPT_TEMPLATE,
+                f"chunks={LLM_CHUNK_TOKENS}/{LLM_CHUNK_OVERLAP_TOKENS}",
+                f"enrichment={ENRICHMENT_MODE}",
+                f"dedup={DEDUP_FUZZY_THRESHOLD}/{DEDUP_RADIUS_METERS}",
+                f"gazetteer={self.gazetteer.source if self.gazetteer else None}"
+                f"/{','.join(GAZETTEER_FIRST_TYPES)}",
+                f"prefilter={PREFILTER_ENABLED}/{PREFILTER_CONTEXT_SENTENCES}"
+                f"/{PREFILTER_MIN_TOKENS}/{PREFILTER_MAX_SENTENCE_WORDS}",
+            ]
+        )
+        return hashlib.sha256(fingerprint.encode()).hexdigest()[:16]
 
     def extract_video_id(self, url: str) -> Optional[str]:
         """Extract video ID from YouTube URL"""
@@ -42,238 +472,511 @@ class YouTubeAnalyzer:
                 return match.group(1)
         return None
 
+    def extract_playlist_id(self, url: str) -> Optional[str]:
+        """Extract playlist ID from a YouTube playlist (or video-in-playlist) URL"""
+        match = re.search(r"[?&]list=([A-Za-z0-9_-]+)", url)
+        return match.group(1) if match else None
+
     def get_youtube_transcript(self, video_id: str) -> Optional[str]:
         """Get YouTube video transcript"""
+        return self.get_transcript(video_id).text
+
+    def get_transcript(self, video_id: str) -> Transcript:
+        """Get YouTube video transcript with segment timestamps (cached on disk)"""
+        for language in TRANSCRIPT_LANGUAGES:
+            transcript = self.transcript_store.get(video_id, language)
+            if transcript:
+                logger.info(
+                    f"📦 Transcript for {video_id} ({language}) loaded from cache"
+                )
+                return transcript
+
+        transcript = self.transcript_store.get(
+            video_id, DESCRIPTION_LANGUAGE, max_age=TRANSCRIPT_FALLBACK_TTL
+        )
+        if transcript:
+            logger.info(f"📦 Description of {video_id} loaded from cache")
+            return transcript
+
+        # Concurrent requests for the same video share a single fetch
+        return self.lookup_flight.do(
+            f"transcript:{video_id}", self._fetch_transcript, video_id
+        )
+
+    def _fetch_transcript(self, video_id: str) -> Transcript:
+        """Fetch a transcript from YouTube (or the video description) and store it"""
         try:
             logger.info(f"🎬 Getting transcript for video: {video_id}")
 
             # Try to get transcript using youtube-transcript-api
             try:
-                ytt_api = YouTubeTranscriptApi()
-                transcript_list = ytt_api.list(video_id)
-                transcript = transcript_list.find_transcript(
-                    ["en", "pl"]
-                )  # Try English first, then Polish
-                transcript_data = transcript.fetch()
-                full_transcript = " ".join([item.text for item in transcript_data])
+                self.transcript_limiter.acquire()
+                with span("youtube_transcript"):
+                    transcript_list = self.transcript_api.list(video_id)
+                    found = transcript_list.find_transcript(
+                        TRANSCRIPT_LANGUAGES
+                    )  # Try English first, then Polish
+                    items = found.fetch()
+                transcript = Transcript(
+                    video_id=video_id,
+                    language=found.language_code,
+                    segments=[
+                        TranscriptSegment(
+                            text=item.text, start=item.start, duration=item.duration
+                        )
+                        for item in items
+                    ],
+                )
                 logger.info(
-                    f"✅ Transcript received: {len(full_transcript)} characters"
+                    f"✅ Transcript received: {len(transcript.text)} characters"
                 )
-                return full_transcript
             except Exception as e:
                 logger.warning(f"Could not get transcript via API: {e}")
+                FALLBACKS.inc(kind="transcript_description")
 
                 # Fallback: get video description via YouTube API
-                if self.youtube_api_key:
-                    return self._get_video_description(video_id)
-                else:
+                if not self.youtube_api_key:
                     raise Exception(
                         "No YouTube API key provided and transcript not available"
                     )
 
-        except Exception as e:
-            logger.error(f"Error getting transcript: {e}")
-            raise Exception(f"Nie można pobrać transkrypcji filmu: {str(e)}")
-
-    def analyze_with_ai(self, transcript: str) -> Dict[str, Any]:
-        """Analyze transcript with OpenAI"""
-        if not self.openai_client:
-            logger.error("OpenAI client not initialized - check OPENAI_API_KEY")
-            raise Exception("Brak klucza OpenAI API")
-
-        if not self.openai_api_key:
-            logger.error("OpenAI API key is empty or None")
-            raise Exception("OpenAI API key is not configured")
+                description = self._get_video_description(video_id)
+                if not description:
+                    raise Exception("Video description not available")
 
-        logger.info("🤖 Analyzing with AI...")
+                transcript = Transcript(
+                    video_id=video_id,
+                    language=DESCRIPTION_LANGUAGE,
+                    segments=[
+                        TranscriptSegment(text=description, start=0.0, duration=0.0)
+                    ],
+                )
 
-        prompt = f"""Your task is to extract places mentioned in the video transcript. Return output in JSON format:
-        {{
-          "places": [
-            {{
-              "name": "place name",
-              "description": "comprehensive description of what is worth seeing there (a few sentences)",
-              "type": "one of the types: park, mountains, sea, city, lake, monument, other"
-            }}
-          ]
-        }}
+            self.transcript_store.put(transcript)
+            return transcript
 
-        Extract tourist places from this video transcript: {transcript}"""
+        except Exception as e:
+            logger.error(f"Error getting transcript: {e}")
+            raise Exception(f"Nie można pobrać transkrypcji filmu: {str(e)}")
 
-        try:
-            response = self.openai_client.chat.completions.create(
-                model="gpt-5-nano",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a helpful assistant that extracts tourist places from video transcripts. Always respond with valid JSON.",
-                    },
-                    {"role": "user", "content": prompt},
-                ],
+    def analyze_with_ai(
+        self,
+        transcript: str,
+        on_place: Optional[PlaceCallback] = None,
+        on_region: Optional[RegionCallback] = None,
+    ) -> Dict[str, Any]:
+        """Analyze transcript with OpenAI.
+
+        With LLM_STREAMING, on_place and on_region are called while the
+        completion is still being generated.
+        """
+        if not self.extractor.available:
+            logger.error(
+                f"No extraction backend available ({','.join(LLM_BACKENDS)}) - check OPENAI_API_KEY"
             )
+            raise BackendUnavailable("Brak klucza OpenAI API")
 
-            # Log the full response for debugging
-            logger.debug(f"OpenAI response: {response}")
-
-            if not response.choices:
-                raise Exception("No choices in OpenAI response")
-
-            content = response.choices[0].message.content
-
-            if not content:
-                logger.error("Empty content received from OpenAI")
-                raise Exception("No content received from OpenAI")
-
-            logger.debug(f"OpenAI content: {content}")
-
-            # Try to clean the content if it has markdown formatting
-            if content.strip().startswith("```json"):
-                content = content.strip()[7:]  # Remove ```json
-            if content.strip().endswith("```"):
-                content = content.strip()[:-3]  # Remove ```
-            content = content.strip()
-
-            # Parse JSON response
-            analysis = json.loads(content)
+        logger.info("🤖 Analyzing with AI...")
 
-            # Ensure types are valid
-            if analysis.get("places"):
-                for place in analysis["places"]:
-                    if place.get("type") not in VALID_PLACE_TYPES:
-                        place["type"] = "other"
+        transcript = self._prefilter(transcript)
+        chunks = split_transcript(
+            transcript, LLM_CHUNK_TOKENS, LLM_CHUNK_OVERLAP_TOKENS
+        )
+        if len(chunks) == 1:
+            analysis = self._extract_places(transcript, on_place, on_region)
+            analysis["places"] = self._merge_extracted([analysis["places"]])
+        else:
+            analysis = self._extract_places_from_chunks(chunks, on_place, on_region)
 
+        logger.info(
+            f"✅ AI analysis completed: {len(analysis.get('places', []))} places found"
+        )
+        return analysis
+
+    def _prefilter(self, transcript: str) -> str:
+        """Keep only the passages that may mention places"""
+        if self.prefilter is None:
+            return transcript
+        with span("prefilter"):
+            result = self.prefilter.apply(transcript)
+        PREFILTER_KEPT_RATIO.observe(result.kept_ratio)
+        PREFILTER_CHARS.inc(result.original_chars, stage="input")
+        PREFILTER_CHARS.inc(result.kept_chars, stage="kept")
+        if result.kept_chars < result.original_chars:
             logger.info(
-                f"✅ AI analysis completed: {len(analysis.get('places', []))} places found"
+                f"🔎 Prefilter kept {result.kept_sentences}/{result.sentences} sentences, "
+                f"{result.kept_ratio:.0%} of the transcript "
+                f"({result.original_chars / max(result.kept_chars, 1):.1f}x smaller)"
             )
-            return analysis
-
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse OpenAI response: {e}")
-            logger.error(
-                f"Response content: {content if 'content' in locals() else 'No content'}"
+        return result.text
+
+    def _extract_places_from_chunks(
+        self,
+        chunks: List[str],
+        on_place: Optional[PlaceCallback] = None,
+        on_region: Optional[RegionCallback] = None,
+    ) -> Dict[str, Any]:
+        """Map-reduce extraction: run chunks concurrently, then merge the places"""
+        logger.info(f"✂️ Transcript split into {len(chunks)} chunks")
+
+        futures = [
+            self.llm_executor.submit(
+                propagate(self._extract_places), chunk, on_place, on_region
             )
-            raise Exception("Invalid response from OpenAI API")
+            for chunk in chunks
+        ]
+
+        place_lists = []
+        regions = Counter()
+        backends = set()
+        degraded = False
+        errors = []
+        for i, future in enumerate(futures):
+            try:
+                chunk_analysis = future.result()
+                place_lists.append(chunk_analysis["places"])
+                if chunk_analysis["region"]:
+                    regions[chunk_analysis["region"]] += 1
+                backends.add(chunk_analysis.get("backend"))
+                degraded = degraded or chunk_analysis.get("degraded", False)
+            except Exception as e:
+                logger.warning(f"Chunk {i + 1}/{len(chunks)} failed: {e}")
+                FALLBACKS.inc(kind="llm_chunk_failed")
+                errors.append(e)
+
+        # A partial result is still useful; only fail when every chunk failed
+        if not place_lists:
+            raise errors[0]
+
+        return {
+            "places": self._merge_extracted(place_lists),
+            "region": regions.most_common(1)[0][0] if regions else None,
+            "backend": ",".join(sorted(filter(None, backends))),
+            "degraded": degraded or bool(errors),
+        }
+
+    def _merge_extracted(
+        self, place_lists: List[List[Dict[str, Any]]]
+    ) -> List[Dict[str, Any]]:
+        """Merge extracted place lists, collapsing duplicate names"""
+        places = merge_places(place_lists)
+        merged = sum(len(place_list) for place_list in place_lists) - len(places)
+        if merged > 0:
+            PLACES_MERGED.inc(merged, stage="names")
+            logger.info(f"🧹 Merged {merged} duplicate place names")
+        return places
+
+    def _extract_places(
+        self,
+        transcript: str,
+        on_place: Optional[PlaceCallback] = None,
+        on_region: Optional[RegionCallback] = None,
+    ) -> Dict[str, Any]:
+        """Extract places (and the video's region) from a transcript, or a chunk
+        of one, with the first extraction backend that succeeds
+        """
+        prompt = EXTRACTION_PROMPT_TEMPLATE.format(transcript=transcript)
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt},
+        ]
+        try:
+            return self.extractor.extract(transcript, messages, on_place, on_region)
         except Exception as e:
             logger.error(f"Error in AI analysis: {e}")
             raise
 
-    def enrich_with_google_places(self, places: List[Dict[str, Any]]) -> List[Place]:
-        """Enrich places with Google Places data"""
+    def _create_backends(self, names: List[str]) -> List[ExtractionBackend]:
+        backends: List[ExtractionBackend] = []
+        for name in (name.strip() for name in names):
+            if name == "openai":
+                backends.append(
+                    OpenAIBackend(
+                        self.openai_api_key,
+                        OPENAI_MODEL,
+                        base_url=OPENAI_BASE_URL,
+                        timeout=LLM_TIMEOUT,
+                        limiter=self.openai_limiter,
+                        streaming=LLM_STREAMING,
+                    )
+                )
+            elif name == "local":
+                backends.append(
+                    LocalBackend(
+                        LOCAL_LLM_BASE_URL,
+                        LOCAL_LLM_MODEL,
+                        LOCAL_LLM_API_KEY,
+                        timeout=LLM_TIMEOUT,
+                        streaming=LLM_STREAMING,
+                    )
+                )
+            elif name == "rules":
+                backends.append(RuleBackend.from_file(LLM_RULES_GAZETTEER))
+            elif name:
+                logger.warning(f"Unknown extraction backend '{name}' - skipped")
+        return backends
+
+    def enrich_with_google_places(
+        self,
+        places: List[Dict[str, Any]],
+        progress: Optional[ProgressCallback] = None,
+        region: Optional[str] = None,
+        video_id: Optional[str] = None,
+    ) -> List[Place]:
+        """Enrich places with Google Places data, biased towards region if given.
+
+        Places found on the map are added to the catalog under video_id.
+        """
         if not self.google_maps_api_key:
             logger.warning(
                 "No Google Maps API key - returning places without coordinates"
             )
-            return [
-                self._create_place_without_coordinates(place, i)
-                for i, place in enumerate(places)
+            fallback_places = [
+                self._enrich_offline(place, i) for i, place in enumerate(places)
             ]
+            if progress:
+                for i, place in enumerate(fallback_places):
+                    progress(
+                        "place", {"index": i, "total": len(places), "place": place}
+                    )
+            return fallback_places
 
         logger.info("🗺️ Enriching with Google Places...")
-        enriched_places = []
 
-        for i, place in enumerate(places):
-            try:
-                enriched_place = self._enrich_single_place(place, i)
-                if enriched_place:
-                    enriched_places.append(enriched_place)
-                else:
-                    logger.warning(
-                        f"Failed to enrich place: {place.get('name', 'unknown')}"
-                    )
-                    # Add place without coordinates as fallback
-                    enriched_places.append(
-                        self._create_place_without_coordinates(place, i)
-                    )
-            except Exception as e:
-                logger.error(
-                    f"Error enriching place {place.get('name', 'unknown')}: {e}"
-                )
-                # Add place without coordinates as fallback
-                enriched_places.append(self._create_place_without_coordinates(place, i))
+        # Places are enriched concurrently; results keep the original order
+        session = EnrichmentSession(self, progress, total=len(places))
+        session.set_region(region)
+        return self._store_enriched(session.finish(places), video_id)
+
+    def _store_enriched(
+        self, enriched_places: List[Place], video_id: Optional[str]
+    ) -> List[Place]:
+        """Collapse places found at the same spot and add them to the catalog"""
+        # Different names can still resolve to the same place on the map
+        collapsed_places = collapse_places(enriched_places, DEDUP_RADIUS_METERS)
+        if len(collapsed_places) < len(enriched_places):
+            merged = len(enriched_places) - len(collapsed_places)
+            PLACES_MERGED.inc(merged, stage="map")
+            logger.info(f"🧹 Merged {merged} places found at the same location")
+        enriched_places = collapsed_places
 
         logger.info(f"✅ Places enriched: {len(enriched_places)} places ready")
+
+        try:
+            self.catalog.add_places(enriched_places, video_id)
+        except sqlite3.Error as e:
+            logger.warning(f"Could not add places to the catalog: {e}")
+
         return enriched_places
 
+    def _enrich_place_or_fallback(
+        self,
+        place: Dict[str, Any],
+        index: int,
+        bias: Optional[Dict[str, Any]] = None,
+    ) -> Place:
+        """Enrich a single place, falling back to a place without coordinates"""
+        try:
+            enriched_place = self._enrich_single_place(place, index, bias)
+            if enriched_place:
+                return enriched_place
+
+            logger.warning(f"Failed to enrich place: {place.get('name', 'unknown')}")
+        except Exception as e:
+            logger.error(f"Error enriching place {place.get('name', 'unknown')}: {e}")
+
+        # Google failed; the gazetteer may still know where the place is
+        match = self._resolve_locally(place, bias)
+        if match:
+            FALLBACKS.inc(kind="google_to_gazetteer")
+            return self._place_from_gazetteer(place, index, match, photos=False)
+
+        # Add place without coordinates as fallback
+        FALLBACKS.inc(kind="place_without_coordinates")
+        return self._create_place_without_coordinates(place, index)
+
+    def _enrich_offline(self, place: Dict[str, Any], index: int) -> Place:
+        """Enrich a place without Google Maps: gazetteer or no coordinates"""
+        match = self._resolve_locally(place)
+        if match:
+            return self._place_from_gazetteer(place, index, match, photos=False)
+        FALLBACKS.inc(kind="no_maps_key")
+        return self._create_place_without_coordinates(place, index)
+
     def _enrich_single_place(
-        self, place: Dict[str, Any], index: int
+        self,
+        place: Dict[str, Any],
+        index: int,
+        bias: Optional[Dict[str, Any]] = None,
     ) -> Optional[Place]:
         """Enrich a single place with Google Places data"""
         place_name = place.get("name", "")
         if not place_name:
             return None
 
-        # Use Geocoding API to get coordinates
-        geocoding_url = "https://maps.googleapis.com/maps/api/geocode/json"
-        params = {"address": place_name, "key": self.google_maps_api_key}
-
         try:
-            response = requests.get(geocoding_url, params=params, timeout=10)
-
-            # Log the response for debugging
-            logger.debug(
-                f"Geocoding response for '{place_name}': {response.status_code}"
-            )
-
-            if response.ok:
-                data = response.json()
-
-                # Check for API errors
-                if data.get("status") != "OK":
-                    logger.warning(
-                        f"Geocoding API error for '{place_name}': {data.get('status')} - {data.get('error_message', 'No error message')}"
-                    )
-                    return None
+            # A confident gazetteer match replaces Geocoding, and for common
+            # types (cities, lakes, ...) the Places lookup as well. Only exact
+            # names count: a fuzzy match ("Santa Monica" for "Santa Monica
+            # Pier") is left to the APIs and used when they find nothing
+            match = self._resolve_locally(place, bias)
+            if match and not match.exact:
+                match = None
+            if match and (
+                ENRICHMENT_MODE != "places"
+                or place.get("type") in GAZETTEER_FIRST_TYPES
+            ):
+                return self._place_from_gazetteer(place, index, match)
+
+            if ENRICHMENT_MODE == "places":
+                place_result = self._lookup_place(place_name, bias)
+                if place_result and place_result.get("location"):
+                    return self._place_from_lookup(place, index, place_result)
+                if match:
+                    return self._place_from_gazetteer(place, index, match)
+                # Geocoding still knows regions and addresses Places may not
+                FALLBACKS.inc(kind="places_lookup_to_geocode")
+
+            result = self._geocode(place_name)
+            if not result:
+                return None
 
-                if data.get("results"):
-                    result = data["results"][0]
-                    location = result["geometry"]["location"]
+            location = result["geometry"]["location"]
 
-                    logger.info(
-                        f"✅ Found coordinates for '{place_name}': {location['lat']}, {location['lng']}"
-                    )
+            logger.info(
+                f"✅ Found coordinates for '{place_name}': {location['lat']}, {location['lng']}"
+            )
 
-                    google_place_id = result.get("place_id")
+            google_place_id = result.get("place_id")
 
-                    # Get photos using Places API
-                    photos = self._get_place_photos(place_name, location)
+            # Get photos using Places API (a lookup in "places" mode already found none)
+            photos = (
+                self._get_place_photos(place_name, location)
+                if ENRICHMENT_MODE != "places"
+                else []
+            )
 
-                    place_id_for_frontend = (
-                        google_place_id
-                        or f"place_{index}_{int(location['lat'] * 1000)}"
-                    )
+            place_id_for_frontend = (
+                google_place_id or f"place_{index}_{int(location['lat'] * 1000)}"
+            )
 
-                    return Place(
-                        id=place_id_for_frontend,
-                        name=place_name,
-                        description=place.get("description", ""),
-                        type=place.get("type", "other"),
-                        coordinates=Coordinates(
-                            lat=location["lat"], lng=location["lng"]
-                        ),
-                        google_place_id=google_place_id,
-                        address=result.get("formatted_address"),
-                        photos=photos,
-                        photo_url=photos[0] if photos else None,
-                    )
-                else:
-                    logger.warning(f"No geocoding results found for '{place_name}'")
-                    return None
-            else:
-                logger.error(
-                    f"HTTP error {response.status_code} for geocoding '{place_name}': {response.text}"
-                )
-                return None
+            return Place(
+                id=place_id_for_frontend,
+                name=place_name,
+                description=place.get("description", ""),
+                type=place.get("type", "other"),
+                coordinates=Coordinates(lat=location["lat"], lng=location["lng"]),
+                google_place_id=google_place_id,
+                address=result.get("formatted_address"),
+                photos=photos,
+                photo_url=photos[0] if photos else None,
+                timestamp=place.get("timestamp"),
+            )
 
-        except requests.exceptions.Timeout:
+        except httpx.TimeoutException:
             logger.error(f"Timeout while geocoding '{place_name}'")
             return None
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"Request error while geocoding '{place_name}': {e}")
             return None
         except Exception as e:
             logger.error(f"Unexpected error while geocoding '{place_name}': {e}")
             return None
 
+    def _resolve_locally(
+        self, place: Dict[str, Any], bias: Optional[Dict[str, Any]] = None
+    ) -> Optional[GazetteerMatch]:
+        """Unambiguous gazetteer match for a place, if a gazetteer is loaded"""
+        if not self.gazetteer or not place.get("name"):
+            return None
+        try:
+            return self.gazetteer.resolve(place["name"], place.get("type"), bias)
+        except sqlite3.Error as e:
+            logger.warning(f"Gazetteer lookup failed for '{place['name']}': {e}")
+            return None
+
+    def _place_from_gazetteer(
+        self,
+        place: Dict[str, Any],
+        index: int,
+        match: GazetteerMatch,
+        photos: bool = True,
+    ) -> Place:
+        """Build a Place from a gazetteer match (photos only in geocode mode,
+        where they come from a separate Places search anyway)
+        """
+        place_name = place.get("name", "")
+        logger.info(
+            f"📖 Gazetteer match for '{place_name}': {match.name} ({match.lat}, {match.lng})"
+        )
+        location = {"lat": match.lat, "lng": match.lng}
+        photo_urls = (
+            self._get_place_photos(place_name, location)
+            if photos and ENRICHMENT_MODE != "places" and self.google_maps_api_key
+            else []
+        )
+        return Place(
+            id=f"geonames_{match.id}",
+            name=place_name,
+            description=place.get("description", ""),
+            type=place.get("type", "other"),
+            coordinates=Coordinates(lat=match.lat, lng=match.lng),
+            address=", ".join(filter(None, [match.name, match.country])),
+            photos=photo_urls,
+            photo_url=photo_urls[0] if photo_urls else None,
+            timestamp=place.get("timestamp"),
+        )
+
+    def _geocode(self, place_name: str) -> Optional[Dict[str, Any]]:
+        """Get the first Geocoding API result for a place name (cached)"""
+        cache_key = normalize_cache_key(place_name)
+        cached = self.geocode_cache.get(cache_key)
+        if cached is not MISSING:
+            logger.debug(f"Geocoding cache hit for '{place_name}'")
+            return cached
+
+        # Concurrent lookups of the same name share a single request
+        return self.lookup_flight.do(
+            f"geocode:{cache_key}", self._fetch_geocode, place_name, cache_key
+        )
+
+    def _fetch_geocode(
+        self, place_name: str, cache_key: str
+    ) -> Optional[Dict[str, Any]]:
+        """Call the Geocoding API and cache the outcome"""
+        # Use Geocoding API to get coordinates
+        params = {"address": place_name, "key": self.google_maps_api_key}
+
+        response = self.http.get("geocoding", "/maps/api/geocode/json", params=params)
+
+        # Log the response for debugging
+        logger.debug(f"Geocoding response for '{place_name}': {response.status_code}")
+
+        if not response.is_success:
+            logger.error(
+                f"HTTP error {response.status_code} for geocoding '{place_name}': {response.text}"
+            )
+            return None
+
+        data = response.json()
+        status = data.get("status")
+
+        if status == "ZERO_RESULTS" or (status == "OK" and not data.get("results")):
+            logger.warning(f"No geocoding results found for '{place_name}'")
+            self.geocode_cache.set(cache_key, None)
+            return None
+
+        # Check for API errors (not cached, they are usually transient)
+        if status != "OK":
+            logger.warning(
+                f"Geocoding API error for '{place_name}': {status} - {data.get('error_message', 'No error message')}"
+            )
+            return None
+
+        result = data["results"][0]
+        self.geocode_cache.set(cache_key, result)
+        return result
+
     def _get_place_photos(
         self, place_name: str, location: Dict[str, float]
     ) -> List[str]:
@@ -283,66 +986,227 @@ class YouTubeAnalyzer:
             return []
 
         try:
-            # Use Places API (New) Text Search
-            places_url = "https://places.googleapis.com/v1/places:searchText"
-            headers = {
-                "Content-Type": "application/json",
-                "X-Goog-Api-Key": self.google_maps_api_key,
-                "X-Goog-FieldMask": "places.id,places.displayName,places.photos",
+            place_result = self._search_place(place_name)
+            if not place_result:
+                return []
+
+            photos = place_result.get("photos", [])
+
+            logger.info(f"Found {len(photos)} photo references for '{place_name}'")
+
+            if not photos:
+                logger.info(f"No photos found for '{place_name}'")
+                return []
+
+            return self._photo_urls(place_name, photos)
+
+        except Exception as e:
+            logger.error(f"Error fetching photos for '{place_name}': {e}")
+            return []
+
+    def _photo_urls(self, place_name: str, photos: List[Dict[str, Any]]) -> List[str]:
+        """Build proxy URLs for up to 10 Places API (New) photo references"""
+        width = self.photo_store.width_for(PHOTO_DEFAULT_WIDTH)
+        photo_urls = []
+        for photo in photos[:10]:
+            photo_name = photo.get("name")
+            if photo_name:
+                # Served by /api/photos, which keeps the API key server-side
+                photo_urls.append(photo_url(photo_name, width))
+
+        logger.info(f"✅ Generated {len(photo_urls)} photo URLs for '{place_name}'")
+        return photo_urls
+
+    def _fetch_photo(self, photo_name: str, width: int) -> Optional[bytes]:
+        """Download a photo from the Places API (New) media endpoint"""
+        if not self.google_maps_api_key:
+            return None
+
+        # The media endpoint redirects to the image itself; the key stays in
+        # the first request and is not forwarded to the image host
+        params = {"maxWidthPx": width, "key": self.google_maps_api_key}
+        response = self.http.get(
+            "places", f"/v1/{photo_name}/media", params=params, follow_redirects=True
+        )
+        if response.status_code in (400, 404):
+            logger.warning(f"Photo not found: {photo_name}")
+            return None
+        response.raise_for_status()
+        logger.info(f"📷 Downloaded photo {photo_name} ({len(response.content)} bytes)")
+        return response.content
+
+    def _place_from_lookup(
+        self, place: Dict[str, Any], index: int, result: Dict[str, Any]
+    ) -> Place:
+        """Build a Place from a single Places API (New) Text Search result"""
+        place_name = place.get("name", "")
+        location = result["location"]
+        lat, lng = location["latitude"], location["longitude"]
+        logger.info(f"✅ Found coordinates for '{place_name}': {lat}, {lng}")
+
+        photos = self._photo_urls(place_name, result.get("photos", []))
+        google_place_id = result.get("id")
+
+        return Place(
+            id=google_place_id or f"place_{index}_{int(lat * 1000)}",
+            name=place_name,
+            description=place.get("description", ""),
+            type=place.get("type", "other"),
+            coordinates=Coordinates(lat=lat, lng=lng),
+            google_place_id=google_place_id,
+            address=result.get("formattedAddress"),
+            rating=result.get("rating"),
+            photos=photos,
+            photo_url=photos[0] if photos else None,
+            website=result.get("websiteUri"),
+            timestamp=place.get("timestamp"),
+        )
+
+    def _location_bias(self, region: str) -> Optional[Dict[str, Any]]:
+        """Places API locationBias covering a region, from its (cached) geocode"""
+        try:
+            result = self._geocode(region)
+        except httpx.HTTPError as e:
+            logger.warning(f"Could not geocode region '{region}': {e}")
+            return None
+        if not result:
+            return None
+
+        geometry = result["geometry"]
+        viewport = geometry.get("viewport")
+        if viewport:
+            southwest, northeast = viewport["southwest"], viewport["northeast"]
+            logger.info(f"🧭 Biasing place lookups towards '{region}'")
+            return {
+                "rectangle": {
+                    "low": {
+                        "latitude": southwest["lat"],
+                        "longitude": southwest["lng"],
+                    },
+                    "high": {
+                        "latitude": northeast["lat"],
+                        "longitude": northeast["lng"],
+                    },
+                }
             }
 
-            payload = {"textQuery": place_name, "maxResultCount": 1}
+        location = geometry["location"]
+        return {
+            "circle": {
+                "center": {"latitude": location["lat"], "longitude": location["lng"]},
+                "radius": MAX_BIAS_RADIUS_METERS,
+            }
+        }
+
+    def _lookup_place(
+        self, place_name: str, bias: Optional[Dict[str, Any]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Get coordinates, address, rating, website and photos of a place with
+        one Places API (New) Text Search (cached per name and bias)
+        """
+        cache_key = normalize_cache_key(place_name)
+        if bias:
+            bias_hash = hashlib.sha1(
+                json.dumps(bias, sort_keys=True).encode()
+            ).hexdigest()[:12]
+            cache_key = f"{cache_key}|{bias_hash}"
+
+        cached = self.place_lookup_cache.get(cache_key)
+        if cached is not MISSING:
+            logger.debug(f"Places lookup cache hit for '{place_name}'")
+            return cached
+
+        # Concurrent lookups of the same name share a single request
+        return self.lookup_flight.do(
+            f"lookup:{cache_key}",
+            self._fetch_place_lookup,
+            place_name,
+            cache_key,
+            bias,
+        )
 
-            logger.debug(
-                f"Searching for photos for '{place_name}' using Places API (New)"
-            )
-            response = requests.post(
-                places_url, headers=headers, json=payload, timeout=10
+    def _fetch_place_lookup(
+        self, place_name: str, cache_key: str, bias: Optional[Dict[str, Any]]
+    ) -> Optional[Dict[str, Any]]:
+        """Call Places API (New) Text Search with the wide field mask and cache the outcome"""
+        headers = {
+            "Content-Type": "application/json",
+            "X-Goog-Api-Key": self.google_maps_api_key,
+            "X-Goog-FieldMask": PLACES_LOOKUP_FIELD_MASK,
+        }
+        payload: Dict[str, Any] = {"textQuery": place_name, "maxResultCount": 1}
+        if bias:
+            payload["locationBias"] = bias
+
+        response = self.http.post(
+            "places", "/v1/places:searchText", headers=headers, json=payload
+        )
+        if not response.is_success:
+            logger.error(
+                f"Places API HTTP error for '{place_name}': {response.status_code} - {response.text}"
             )
+            return None
 
-            logger.debug(f"Places API response status: {response.status_code}")
+        data = response.json()
+        if not data.get("places"):
+            logger.warning(f"No Places API results for '{place_name}'")
+            self.place_lookup_cache.set(cache_key, None)
+            return None
 
-            if response.ok:
-                data = response.json()
-                logger.debug(f"Places API response data: {data}")
+        place_result = data["places"][0]
+        self.place_lookup_cache.set(cache_key, place_result)
+        return place_result
+
+    def _search_place(self, place_name: str) -> Optional[Dict[str, Any]]:
+        """Get the first Places API (New) Text Search result for a place name (cached)"""
+        cache_key = normalize_cache_key(place_name)
+        cached = self.places_cache.get(cache_key)
+        if cached is not MISSING:
+            logger.debug(f"Places cache hit for '{place_name}'")
+            return cached
+
+        # Concurrent lookups of the same name share a single request
+        return self.lookup_flight.do(
+            f"places:{cache_key}", self._fetch_place_search, place_name, cache_key
+        )
 
-                if data.get("places"):
-                    place_result = data["places"][0]
-                    photos = place_result.get("photos", [])
+    def _fetch_place_search(
+        self, place_name: str, cache_key: str
+    ) -> Optional[Dict[str, Any]]:
+        """Call Places API (New) Text Search and cache the outcome"""
+        # Use Places API (New) Text Search
+        headers = {
+            "Content-Type": "application/json",
+            "X-Goog-Api-Key": self.google_maps_api_key,
+            "X-Goog-FieldMask": "places.id,places.displayName,places.photos",
+        }
+
+        payload = {"textQuery": place_name, "maxResultCount": 1}
+
+        logger.debug(f"Searching for photos for '{place_name}' using Places API (New)")
+        response = self.http.post(
+            "places", "/v1/places:searchText", headers=headers, json=payload
+        )
 
-                    logger.info(
-                        f"Found {len(photos)} photo references for '{place_name}'"
-                    )
+        logger.debug(f"Places API response status: {response.status_code}")
 
-                    if photos:
-                        # Get up to 10 photos
-                        photo_urls = []
-                        for photo in photos[:10]:
-                            photo_name = photo.get("name")
-                            if photo_name:
-                                # Use the new photo URL format
-                                photo_url = f"https://places.googleapis.com/v1/{photo_name}/media?maxWidthPx=400&key={self.google_maps_api_key}"
-                                photo_urls.append(photo_url)
-
-                        logger.info(
-                            f"✅ Generated {len(photo_urls)} photo URLs for '{place_name}'"
-                        )
-                        return photo_urls
-                    else:
-                        logger.info(f"No photos found for '{place_name}'")
-                        return []
-                else:
-                    logger.warning(f"No Places API results for '{place_name}'")
-                    return []
-            else:
-                logger.error(
-                    f"Places API HTTP error for '{place_name}': {response.status_code} - {response.text}"
-                )
-                return []
+        if not response.is_success:
+            logger.error(
+                f"Places API HTTP error for '{place_name}': {response.status_code} - {response.text}"
+            )
+            return None
 
-        except Exception as e:
-            logger.error(f"Error fetching photos for '{place_name}': {e}")
-            return []
+        data = response.json()
+        logger.debug(f"Places API response data: {data}")
+
+        if not data.get("places"):
+            logger.warning(f"No Places API results for '{place_name}'")
+            self.places_cache.set(cache_key, None)
+            return None
+
+        place_result = data["places"][0]
+        self.places_cache.set(cache_key, place_result)
+        return place_result
 
     def _create_place_without_coordinates(
         self, place: Dict[str, Any], index: int
@@ -356,25 +1220,77 @@ class YouTubeAnalyzer:
             coordinates=Coordinates(lat=0.0, lng=0.0),  # Default coordinates
             photos=[],
             photo_url=None,
+            timestamp=place.get("timestamp"),
         )
 
-    def analyze_youtube_video(self, video_id: str) -> List[Place]:
+    def analyze_youtube_video(
+        self, video_id: str, progress: Optional[ProgressCallback] = None
+    ) -> List[Place]:
         """Main method to analyze YouTube video and extract places"""
         logger.info(f"🎬 Analyzing YouTube video: {video_id}")
 
         # Step 1: Get video transcript
         logger.info("📝 Step 1: Getting video transcript...")
-        transcript = self.get_youtube_transcript(video_id)
-        if not transcript:
+        with span("transcript"):
+            transcript = self.get_transcript(video_id)
+        transcript_text = transcript.text
+        if not transcript_text:
             raise Exception("Nie można pobrać transkrypcji filmu")
+        if progress:
+            progress(
+                "transcript",
+                {"characters": len(transcript_text), "language": transcript.language},
+            )
+
+        # Link each place to the moment in the video where it is first mentioned
+        mentions = (
+            MentionIndex(transcript)
+            if transcript.language != DESCRIPTION_LANGUAGE
+            else None
+        )
+
+        # With a streamed completion, enrichment starts with the first place
+        session = None
+        if LLM_STREAMING and self.google_maps_api_key:
+            session = EnrichmentSession(self, progress, mentions=mentions)
 
         # Step 2: Analyze transcript with AI
         logger.info("🤖 Step 2: Analyzing with AI...")
-        analysis = self.analyze_with_ai(transcript)
+        with span("ai"):
+            analysis = self.analyze_with_ai(
+                transcript_text,
+                on_place=session.add if session else None,
+                on_region=session.set_region if session else None,
+            )
+        extracted_places = analysis.get("places", [])
+        region = analysis.get("region")
+        if progress:
+            progress(
+                "ai",
+                {
+                    "places_found": len(extracted_places),
+                    "region": region,
+                    "backend": analysis.get("backend"),
+                    "degraded": analysis.get("degraded", False),
+                },
+            )
+
+        if mentions:
+            for place in extracted_places:
+                place["timestamp"] = mentions.find(place.get("name", ""))
 
         # Step 3: Enrich places with Google Places data
         logger.info("🗺️ Step 3: Enriching with Google Places...")
-        places = self.enrich_with_google_places(analysis.get("places", []))
+        with span("enrichment"):
+            if session:
+                session.set_region(region)
+                places = self._store_enriched(
+                    session.finish(extracted_places), video_id
+                )
+            else:
+                places = self.enrich_with_google_places(
+                    extracted_places, progress, region=region, video_id=video_id
+                )
 
         return places
 
@@ -384,11 +1300,10 @@ class YouTubeAnalyzer:
             return None
 
         try:
-            url = f"https://www.googleapis.com/youtube/v3/videos"
             params = {"part": "snippet", "id": video_id, "key": self.youtube_api_key}
 
-            response = requests.get(url, params=params)
-            if response.ok:
+            response = self.http.get("youtube", "/youtube/v3/videos", params=params)
+            if response.is_success:
                 data = response.json()
                 if data.get("items"):
                     return data["items"][0]["snippet"].get("description", "")
@@ -396,3 +1311,49 @@ class YouTubeAnalyzer:
             logger.error(f"Error getting video description: {e}")
 
         return None
+
+    def get_playlist_video_ids(
+        self, playlist_id: str, limit: Optional[int] = None
+    ) -> List[str]:
+        """List the video IDs of a playlist via YouTube API"""
+        if not self.youtube_api_key:
+            raise Exception("YouTube API key is required to read playlists")
+
+        video_ids = []
+        page_token = None
+        while limit is None or len(video_ids) < limit:
+            params = {
+                "part": "contentDetails",
+                "playlistId": playlist_id,
+                "maxResults": 50,
+                "key": self.youtube_api_key,
+            }
+            if page_token:
+                params["pageToken"] = page_token
+
+            response = self.http.get(
+                "youtube", "/youtube/v3/playlistItems", params=params
+            )
+            if not response.is_success:
+                raise Exception(
+                    f"Could not read playlist {playlist_id}: {response.status_code} - {response.text}"
+                )
+
+            data = response.json()
+            for item in data.get("items", []):
+                video_ids.append(item["contentDetails"]["videoId"])
+
+            page_token = data.get("nextPageToken")
+            if not page_token:
+                break
+
+        logger.info(f"📃 Playlist {playlist_id}: {len(video_ids)} videos")
+        return video_ids[:limit] if limit is not None else video_ids
+
+    def get_channel_video_ids(
+        self, channel_id: str, limit: Optional[int] = None
+    ) -> List[str]:
+        """List the uploads of a channel (its "UU..." uploads playlist)"""
+        if not channel_id.startswith("UC"):
+            raise Exception(f"Invalid YouTube channel ID: {channel_id}")
+        return self.get_playlist_video_ids("UU" + channel_id[2:], limit)
@@ -1,18 +1,50 @@
 from flask import Flask
 from flask_cors import CORS
 
-from config import logger, DEBUG, HOST, PORT
+from config import (
+    logger,
+    configure_logging,
+    DEBUG,
+    GAZETTEER_PATH,
+    HOST,
+    PORT,
+    PREWARM,
+)
 from routes import register_routes
+from service import prewarm as prewarm_service
 
-# Create Flask app
-app = Flask(__name__)
-CORS(app)  # Enable CORS for frontend
 
-# Register all routes
-register_routes(app)
+def create_app(prewarm: bool = PREWARM) -> Flask:
+    """Build the Flask app. The analyzer and API clients are created on the
+    first request unless prewarm is set.
+    """
+    configure_logging()
+
+    app = Flask(__name__)
+    CORS(app)  # Enable CORS for frontend
+
+    # Compact UTF-8 JSON without key sorting: smaller and cheaper to encode
+    app.json.compact = True
+    app.json.sort_keys = False
+    app.json.ensure_ascii = False
+
+    # Register all routes
+    register_routes(app)
+
+    if prewarm:
+        prewarm_service()
+    return app
+
+
+# Create Flask app
+app = create_app()
 
 
 if __name__ == "__main__":
+    if GAZETTEER_PATH:
+        from gazetteer import prepare
+
+        prepare()
     logger.info("Starting Python Trip Advisor backend...")
-    logger.info("Server will run on http://localhost:5000")
+    logger.info(f"Server will run on http://localhost:{PORT}")
     app.run(debug=DEBUG, host=HOST, port=PORT)
@@ -0,0 +1,136 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional
+
+from service import get_analyzer, get_stored_result, result_key, run_analysis
+from scheduler import BULK, priority
+from config import logger, BATCH_MAX_WORKERS, BATCH_MAX_VIDEOS
+
+
+class BatchInputError(Exception):
+    """The batch request does not describe any valid videos"""
+
+
+def parse_limit(value: Any) -> Optional[int]:
+    """A batch limit from user input: None or a positive integer"""
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise BatchInputError("limit must be a positive integer")
+    try:
+        limit = int(value)
+    except ValueError:
+        raise BatchInputError("limit must be a positive integer")
+    if limit < 1:
+        raise BatchInputError("limit must be a positive integer")
+    return limit
+
+
+def resolve_video_ids(
+    video_urls: List[str],
+    playlist_url: Optional[str] = None,
+    channel_id: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> List[str]:
+    """Turn video URLs, a playlist URL and/or a channel ID into unique video IDs"""
+    analyzer = get_analyzer()
+    video_ids = []
+    for url in video_urls:
+        video_id = analyzer.extract_video_id(url) if isinstance(url, str) else None
+        if not video_id:
+            raise BatchInputError(f"Invalid YouTube URL: {url}")
+        video_ids.append(video_id)
+
+    if playlist_url:
+        playlist_id = analyzer.extract_playlist_id(playlist_url) or playlist_url
+        video_ids.extend(analyzer.get_playlist_video_ids(playlist_id, limit))
+
+    if channel_id:
+        video_ids.extend(analyzer.get_channel_video_ids(channel_id, limit))
+
+    # Keep the first occurrence of every video
+    video_ids = list(dict.fromkeys(video_ids))
+    if limit is not None:
+        video_ids = video_ids[:limit]
+
+    if not video_ids:
+        raise BatchInputError("No videos to analyze")
+    if len(video_ids) > BATCH_MAX_VIDEOS:
+        raise BatchInputError(
+            f"Too many videos in one batch: {len(video_ids)} (max {BATCH_MAX_VIDEOS})"
+        )
+    return video_ids
+
+
+def run_batch(
+    video_urls: List[str],
+    playlist_url: Optional[str] = None,
+    channel_id: Optional[str] = None,
+    skip_cached: bool = True,
+    force_refresh: bool = False,
+    limit: Optional[int] = None,
+    workers: int = BATCH_MAX_WORKERS,
+) -> Iterator[Dict[str, Any]]:
+    """Analyze many videos concurrently, yielding one JSON-serializable line each.
+
+    The first line ({"type": "start"}) is yielded once the inputs are resolved,
+    then one {"type": "result"} line per video in completion order, and finally
+    a {"type": "summary"} line. Videos run as bulk work: at most
+    SCHEDULER_MAX_BULK at a time, and their upstream calls yield to
+    interactive requests, so throughput follows what is left of the API quota.
+    """
+    with priority(BULK):
+        video_ids = resolve_video_ids(video_urls, playlist_url, channel_id, limit)
+    started = time.perf_counter()
+    yield {"type": "start", "total": len(video_ids)}
+
+    counts = {"ok": 0, "cached": 0, "error": 0}
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch")
+    try:
+        futures = [
+            executor.submit(_analyze_one, video_id, skip_cached, force_refresh)
+            for video_id in video_ids
+        ]
+        for future in as_completed(futures):
+            line = future.result()
+            counts[line["status"]] += 1
+            yield line
+    finally:
+        # Stop queued work if the consumer goes away (e.g. client disconnect)
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    seconds = time.perf_counter() - started
+    logger.info(
+        f"📦 Batch finished: {len(video_ids)} videos in {seconds:.1f}s ({counts})"
+    )
+    yield {
+        "type": "summary",
+        "total": len(video_ids),
+        **counts,
+        "seconds": round(seconds, 3),
+    }
+
+
+def _analyze_one(
+    video_id: str, skip_cached: bool, force_refresh: bool
+) -> Dict[str, Any]:
+    started = time.perf_counter()
+    line: Dict[str, Any] = {"type": "result", "video_id": video_id}
+    try:
+        stored = None if force_refresh else get_stored_result(video_id)
+        if stored:
+            line["status"] = "cached"
+            if not skip_cached:
+                line["places"] = stored.places
+        else:
+            line["status"] = "ok"
+            line["places"] = get_analyzer().scheduler.run(
+                BULK, run_analysis, video_id, result_key(video_id)
+            )
+    except Exception as e:
+        logger.error(f"Batch analysis of {video_id} failed: {e}")
+        line["status"] = "error"
+        line["error"] = str(e)
+
+    line["seconds"] = round(time.perf_counter() - started, 3)
+    return line
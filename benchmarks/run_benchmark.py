@@ -0,0 +1,338 @@
+"""Offline benchmark of the analysis pipeline against recorded upstream fixtures.
+
+Measures end-to-end and per-stage latency of analyze_youtube_video (cold and
+warm caches), throughput of POST /api/analyze under concurrent load and peak
+memory, and writes a JSON report that can be compared against a baseline:
+
+    python benchmarks/run_benchmark.py -o baseline.json
+    python benchmarks/run_benchmark.py -o after.json --compare baseline.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from stub_server import (  # noqa: E402 - benchmarks/ is on sys.path when run as a script
+    DEFAULT_FIXTURE,
+    FixtureTranscriptApi,
+    StubServer,
+    load_fixture,
+    parse_latency,
+)
+
+REPORT_VERSION = 1
+
+
+def configure_environment(stub_url: str, cache_dir: str) -> None:
+    """Point every upstream at the stub and isolate caches before app imports"""
+    os.environ.update(
+        {
+            "YOUTUBE_API_KEY": "bench",
+            "OPENAI_API_KEY": "bench",
+            "GOOGLE_MAPS_API_KEY": "bench",
+            "OPENAI_BASE_URL": f"{stub_url}/v1",
+            "GEOCODING_BASE_URL": stub_url,
+            "PLACES_BASE_URL": stub_url,
+            "YOUTUBE_DATA_BASE_URL": stub_url,
+            "CACHE_DIR": cache_dir,
+        }
+    )
+    for name in ("CACHE_DB_PATH", "TRANSCRIPT_DIR"):
+        os.environ.pop(name, None)
+
+
+def summarize(seconds: List[float]) -> Dict[str, Any]:
+    """Count, mean and percentiles of a list of durations, in milliseconds"""
+    if not seconds:
+        return {"count": 0}
+    ordered = sorted(seconds)
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 1),
+        "p50_ms": round(ordered[len(ordered) // 2] * 1000, 1),
+        "p95_ms": round(
+            ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)] * 1000, 1
+        ),
+        "max_ms": round(ordered[-1] * 1000, 1),
+    }
+
+
+def reset_caches(analyzer) -> None:
+    analyzer.geocode_cache.clear()
+    analyzer.places_cache.clear()
+    analyzer.place_lookup_cache.clear()
+    analyzer.transcript_store.clear()
+    analyzer.llm_cache.clear()
+
+
+def timed_analysis(analyzer, video_id: str) -> Dict[str, float]:
+    """Run the pipeline once, splitting its duration into stages via progress events"""
+    marks: Dict[str, float] = {}
+
+    def progress(stage: str, data: Dict[str, Any]) -> None:
+        marks.setdefault(stage, time.perf_counter())
+
+    started = time.perf_counter()
+    analyzer.analyze_youtube_video(video_id, progress=progress)
+    finished = time.perf_counter()
+
+    transcript_at = marks.get("transcript", started)
+    ai_at = marks.get("ai", transcript_at)
+    return {
+        "total": finished - started,
+        "transcript": transcript_at - started,
+        "ai": ai_at - transcript_at,
+        "enrichment": finished - ai_at,
+        # With a streamed completion places arrive before the AI stage ends
+        "first_place": marks.get("place", finished) - started,
+    }
+
+
+def bench_pipeline(analyzer, iterations: int, cold: bool) -> Dict[str, Any]:
+    """Repeated analyses with empty caches, or of one video whose transcript
+    and place lookups are already cached
+    """
+    if not cold:
+        timed_analysis(analyzer, "bench-warm")
+
+    runs = []
+    for i in range(iterations):
+        if cold:
+            reset_caches(analyzer)
+            runs.append(timed_analysis(analyzer, f"bench-cold-{i}"))
+        else:
+            runs.append(timed_analysis(analyzer, "bench-warm"))
+
+    return {
+        "iterations": iterations,
+        "latency": {
+            stage: summarize([run[stage] for run in runs]) for stage in runs[0]
+        },
+    }
+
+
+def bench_memory(analyzer) -> Dict[str, Any]:
+    """Peak Python heap allocated by one cold analysis"""
+    reset_caches(analyzer)
+    tracemalloc.start()
+    try:
+        analyzer.analyze_youtube_video("bench-memory")
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "peak_traced_kb": round(peak / 1024, 1),
+        "retained_traced_kb": round(current / 1024, 1),
+    }
+
+
+def bench_http(app, analyzer, requests: int, concurrency: int) -> Dict[str, Any]:
+    """Concurrent POST /api/analyze calls for distinct videos through the Flask app"""
+    reset_caches(analyzer)
+    client = app.test_client()
+    run_id = int(time.time())
+    statuses: Dict[str, int] = {}
+    lock = threading.Lock()
+
+    def call(i: int) -> float:
+        started = time.perf_counter()
+        response = client.post(
+            "/api/analyze",
+            json={
+                "video_url": f"https://youtu.be/bench-http-{run_id}-{i}",
+                "force_refresh": True,
+            },
+        )
+        elapsed = time.perf_counter() - started
+        with lock:
+            key = str(response.status_code)
+            statuses[key] = statuses.get(key, 0) + 1
+        return elapsed
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(call, range(requests)))
+    wall = time.perf_counter() - started
+
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(requests / wall, 3) if wall else 0.0,
+        "statuses": statuses,
+        "latency": summarize(latencies),
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten(report: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    """Numeric leaves of a report as dotted keys"""
+    values: Dict[str, float] = {}
+    for key, value in report.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            values.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[name] = value
+    return values
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Relative change of every latency/memory/throughput metric in both reports"""
+    before = flatten(baseline.get("scenarios", {}))
+    after = flatten(current.get("scenarios", {}))
+    rows = []
+    for name in sorted(before.keys() & after.keys()):
+        if not name.endswith(("_ms", "_kb", "_rps")) or not before[name]:
+            continue
+        change = (after[name] - before[name]) / before[name] * 100
+        # Lower is better except for throughput
+        regression = -change if name.endswith("_rps") else change
+        rows.append(
+            {
+                "metric": name,
+                "baseline": before[name],
+                "current": after[name],
+                "change_pct": round(change, 1),
+                "regression_pct": round(regression, 1),
+            }
+        )
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the analysis pipeline offline"
+    )
+    parser.add_argument("--fixture", default=DEFAULT_FIXTURE)
+    parser.add_argument(
+        "--latency",
+        default="",
+        help='Injected seconds per upstream, e.g. "llm=1.5,places=0.1,transcript=0.3"',
+    )
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument(
+        "--transcript-repeat",
+        type=int,
+        default=1,
+        help="Repeat the recorded transcript to simulate longer videos",
+    )
+    parser.add_argument(
+        "--label", default="", help="Free-form name stored in the report"
+    )
+    parser.add_argument(
+        "-o", "--output", help="Write the JSON report here (default: stdout)"
+    )
+    parser.add_argument("--compare", help="Baseline report to compare against")
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        help="Exit with status 1 if any metric regresses by more than this percentage",
+    )
+    parser.add_argument("-v", "--verbose", action="store_true", help="Keep app logging")
+    args = parser.parse_args(argv)
+
+    fixture = load_fixture(args.fixture)
+    latency = parse_latency(args.latency)
+    stub = StubServer(fixture, latency).start()
+
+    with tempfile.TemporaryDirectory(prefix="trip-advisor-bench-") as cache_dir:
+        configure_environment(stub.url, cache_dir)
+
+        from app import app
+        from service import get_analyzer
+
+        analyzer = get_analyzer()
+
+        if not args.verbose:
+            logging.getLogger().setLevel(logging.WARNING)
+        analyzer.transcript_api = FixtureTranscriptApi(
+            fixture, latency["transcript"], repeat=args.transcript_repeat
+        )
+
+        scenarios = {
+            "pipeline_cold": bench_pipeline(analyzer, args.iterations, cold=True),
+            "pipeline_warm": bench_pipeline(analyzer, args.iterations, cold=False),
+            "memory": bench_memory(analyzer),
+            "http_analyze": bench_http(app, analyzer, args.requests, args.concurrency),
+        }
+        scenarios["memory"]["max_rss_kb"] = resource.getrusage(
+            resource.RUSAGE_SELF
+        ).ru_maxrss
+
+        report = {
+            "version": REPORT_VERSION,
+            "label": args.label,
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "settings": {
+                "fixture": os.path.basename(args.fixture),
+                "latency": latency,
+                "iterations": args.iterations,
+                "requests": args.requests,
+                "concurrency": args.concurrency,
+                "transcript_repeat": args.transcript_repeat,
+                "pipeline_version": analyzer.pipeline_version,
+            },
+            "scenarios": scenarios,
+            "upstream_requests": dict(stub.requests),
+        }
+    stub.stop()
+
+    exit_code = 0
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            rows = compare(json.load(f), report)
+        report["comparison"] = {"baseline": args.compare, "metrics": rows}
+        for row in rows:
+            print(
+                f"{row['metric']:<45} {row['baseline']:>10} -> {row['current']:>10} "
+                f"({row['change_pct']:+.1f}%)",
+                file=sys.stderr,
+            )
+        if args.max_regression is not None and any(
+            row["regression_pct"] > args.max_regression for row in rows
+        ):
+            exit_code = 1
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
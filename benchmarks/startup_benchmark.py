@@ -0,0 +1,190 @@
+"""Cold start benchmark: import and initialization cost of the entry points.
+
+Every measurement runs in a fresh interpreter. Imports are timed with
+``python -X importtime`` and reported per entry module together with its
+heaviest direct imports; initialization is timed stage by stage (app import,
+analyzer creation, prewarm, first request). No network access is needed:
+
+    python benchmarks/startup_benchmark.py -o startup.json
+    python benchmarks/startup_benchmark.py --modules app,cli --runs 10
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+from run_benchmark import (  # noqa: E402 - benchmarks/ is on sys.path when run as a script
+    ROOT,
+    configure_environment,
+    git_commit,
+)
+
+REPORT_VERSION = 1
+
+DEFAULT_MODULES = "config,check_api_keys,cli,serve,service,routes,app"
+
+# Runs in a fresh interpreter and prints the duration of each startup stage.
+# Importing the app must not open databases or start threads: that happens on
+# first use, after a server has forked its workers.
+INIT_SCRIPT = """
+import json, os, sys, threading, time
+cache_dir = os.environ["CACHE_DIR"]
+files = set(os.listdir(cache_dir))
+threads = threading.active_count()
+stages = {}
+started = time.perf_counter()
+from app import app
+stages["import_app"] = time.perf_counter() - started
+created = sorted(set(os.listdir(cache_dir)) - files)
+if created:
+    sys.exit(f"Importing the app created {', '.join(created)}")
+if threading.active_count() != threads:
+    sys.exit(f"Importing the app started {threading.active_count() - threads} thread(s)")
+import service
+started = time.perf_counter()
+analyzer = service.get_analyzer()
+stages["create_analyzer"] = time.perf_counter() - started
+started = time.perf_counter()
+analyzer.prewarm()
+stages["prewarm"] = time.perf_counter() - started
+started = time.perf_counter()
+app.test_client().get("/api/health")
+stages["first_request"] = time.perf_counter() - started
+print(json.dumps(stages))
+"""
+
+
+def parse_importtime(stderr: str, module: str) -> Dict[str, Any]:
+    """Total import time of module and the cumulative time of each direct import"""
+    total_us = 0
+    direct: Dict[str, float] = {}
+    children: Dict[str, float] = {}
+    # Lines look like "import time:  self [us] | cumulative | name", nested
+    # imports indented by two spaces and printed before their parent
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:") :].split("|")
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        if level == 0:
+            if name.strip() == module:
+                total_us = int(cumulative_us)
+                direct = children
+            children = {}
+        elif level == 1:
+            children[name.strip()] = int(cumulative_us) / 1000
+    return {"total_ms": total_us / 1000, "imports_ms": direct}
+
+
+def measure_imports(module: str, env: Dict[str, str]) -> Dict[str, Any]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return parse_importtime(result.stderr, module)
+
+
+def measure_initialization(env: Dict[str, str]) -> Dict[str, float]:
+    result = subprocess.run(
+        [sys.executable, "-c", INIT_SCRIPT],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def median_ms(values: List[float]) -> float:
+    return round(statistics.median(values), 1)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--modules", default=DEFAULT_MODULES, help="comma-separated entry modules"
+    )
+    parser.add_argument("--runs", type=int, default=5, help="fresh processes per test")
+    parser.add_argument(
+        "--top", type=int, default=8, help="direct imports listed per module"
+    )
+    parser.add_argument("--label", default="", help="Free-form label for the report")
+    parser.add_argument("-o", "--output", help="Write the JSON report to this file")
+    args = parser.parse_args(argv)
+    modules = [name.strip() for name in args.modules.split(",") if name.strip()]
+
+    with tempfile.TemporaryDirectory(prefix="trip-advisor-startup-") as cache_dir:
+        # No upstream is contacted while starting up
+        configure_environment("http://127.0.0.1:9", cache_dir)
+        # Without prewarm, so importing the app is measured on its own
+        env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1", PREWARM="False")
+
+        imports = {}
+        for module in modules:
+            runs = [measure_imports(module, env) for _ in range(args.runs)]
+            children = {name for run in runs for name in run["imports_ms"]}
+            heaviest = sorted(
+                (
+                    {
+                        "module": name,
+                        "cumulative_ms": median_ms(
+                            [run["imports_ms"].get(name, 0.0) for run in runs]
+                        ),
+                    }
+                    for name in children
+                ),
+                key=lambda row: row["cumulative_ms"],
+                reverse=True,
+            )
+            imports[module] = {
+                "total_ms": median_ms([run["total_ms"] for run in runs]),
+                "heaviest_imports": heaviest[: args.top],
+            }
+            print(f"{module:<20} {imports[module]['total_ms']:>8} ms", file=sys.stderr)
+
+        # The first run creates the cache databases, later runs reopen them
+        init_runs = [measure_initialization(env) for _ in range(args.runs)]
+        initialization = {
+            stage: {
+                "first_ms": round(init_runs[0][stage] * 1000, 1),
+                "median_ms": median_ms([run[stage] * 1000 for run in init_runs]),
+            }
+            for stage in init_runs[0]
+        }
+        for stage, timing in initialization.items():
+            print(f"{stage:<20} {timing['median_ms']:>8} ms", file=sys.stderr)
+
+    report = {
+        "version": REPORT_VERSION,
+        "label": args.label,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "settings": {"runs": args.runs, "modules": modules},
+        "imports": imports,
+        "initialization": initialization,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
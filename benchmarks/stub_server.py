@@ -0,0 +1,358 @@
+"""Local stand-ins for the upstream APIs, replaying recorded fixtures.
+
+Serves the Geocoding, Places (New) search and photo media, YouTube Data and
+OpenAI chat completion endpoints the analyzer calls, sleeping for a configurable latency per
+upstream. Transcripts are not fetched over a configurable URL, so
+FixtureTranscriptApi replaces YouTubeTranscriptApi in-process instead.
+
+Run standalone with:
+    python benchmarks/stub_server.py --port 8765 --latency llm=1.5,geocoding=0.05
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+DEFAULT_FIXTURE = os.path.join(FIXTURES_DIR, "italy_trip.json")
+
+# Streamed completions: characters per chunk, and the share of the LLM
+# latency spent before the first chunk (the rest is spread over the chunks)
+STREAM_CHARS_PER_CHUNK = 16
+STREAM_FIRST_TOKEN_SHARE = 0.1
+
+# Body of every stub photo: a JPEG signature padded to a typical thumbnail size
+STUB_PHOTO = b"\xff\xd8\xff\xe0" + bytes(24 * 1024)
+
+# Injected latency in seconds per upstream, roughly matching production medians
+DEFAULT_LATENCY = {
+    "geocoding": 0.08,
+    "places": 0.15,
+    "photos": 0.05,
+    "youtube": 0.1,
+    "llm": 2.0,
+    "transcript": 0.4,
+}
+
+
+def fixture_key(name: str) -> str:
+    """Fixture lookup key; matches cache.normalize_cache_key without importing
+    the app (which would read its configuration too early)
+    """
+    return " ".join(name.split()).casefold()
+
+
+def load_fixture(path: str = DEFAULT_FIXTURE) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def parse_latency(spec: str) -> Dict[str, float]:
+    """Parse "llm=1.5,geocoding=0.05" on top of DEFAULT_LATENCY"""
+    latency = dict(DEFAULT_LATENCY)
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, value = item.partition("=")
+        if name not in latency:
+            raise ValueError(f"Unknown upstream '{name}'")
+        latency[name] = float(value)
+    return latency
+
+
+class StubServer:
+    """Threaded HTTP server answering upstream API calls from a fixture"""
+
+    def __init__(
+        self,
+        fixture: Dict[str, Any],
+        latency: Dict[str, float],
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.fixture = fixture
+        self.latency = latency
+        self.requests: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubServer":
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="stub-server", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        self._server.serve_forever()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def count(self, upstream: str) -> None:
+        with self._lock:
+            self.requests[upstream] = self.requests.get(upstream, 0) + 1
+
+    def geocode(self, address: str) -> Dict[str, Any]:
+        result = self.fixture["geocoding"].get(fixture_key(address))
+        if result is None:
+            return {"status": "ZERO_RESULTS", "results": []}
+        return {"status": "OK", "results": [result]}
+
+    def search_text(self, query: str) -> Dict[str, Any]:
+        place = self.fixture["places"].get(fixture_key(query))
+        return {"places": [place]} if place else {}
+
+    def video(self, video_id: str) -> Dict[str, Any]:
+        snippet = {"title": video_id, "description": self.fixture["description"]}
+        return {"items": [{"id": video_id, "snippet": snippet}]}
+
+    def completion_content(self) -> str:
+        llm = self.fixture["llm"]
+        return json.dumps(
+            {"region": llm.get("region"), "places": llm["places"]},
+            ensure_ascii=False,
+        )
+
+    def completion_usage(self) -> Dict[str, int]:
+        usage = dict(self.fixture["llm"]["usage"])
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        return usage
+
+    def chat_completion(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "id": "chatcmpl-bench",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "bench"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {
+                        "role": "assistant",
+                        "content": self.completion_content(),
+                    },
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": self.completion_usage(),
+        }
+
+    def chat_completion_chunks(self, request: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """The completion split into stream chunks of a few tokens each"""
+        content = self.completion_content()
+        step = STREAM_CHARS_PER_CHUNK
+        chunks = []
+        for start in range(0, len(content), step):
+            chunks.append(
+                {
+                    "id": "chatcmpl-bench",
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": request.get("model", "bench"),
+                    "choices": [
+                        {
+                            "index": 0,
+                            "delta": {"content": content[start : start + step]},
+                            "finish_reason": None,
+                        }
+                    ],
+                }
+            )
+        chunks[-1]["choices"][0]["finish_reason"] = "stop"
+        if (request.get("stream_options") or {}).get("include_usage"):
+            chunks.append(
+                {
+                    "id": "chatcmpl-bench",
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": request.get("model", "bench"),
+                    "choices": [],
+                    "usage": self.completion_usage(),
+                }
+            )
+        return chunks
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                if url.path == "/maps/api/geocode/json":
+                    self._reply("geocoding", stub.geocode(query.get("address", "")))
+                elif url.path == "/youtube/v3/videos":
+                    self._reply("youtube", stub.video(query.get("id", "")))
+                elif url.path.startswith("/v1/places/") and url.path.endswith("/media"):
+                    # Like Google: redirect to the image host, without the key
+                    self._redirect(f"/photo-content{url.path[3:-6]}")
+                elif url.path.startswith("/photo-content/"):
+                    self._image("photos", STUB_PHOTO)
+                else:
+                    self._reply(None, {"error": "not found"}, status=404)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                path = urlparse(self.path).path
+                if path == "/v1/places:searchText":
+                    self._reply("places", stub.search_text(body.get("textQuery", "")))
+                elif path.endswith("/chat/completions") and body.get("stream"):
+                    self._stream("llm", stub.chat_completion_chunks(body))
+                elif path.endswith("/chat/completions"):
+                    self._reply("llm", stub.chat_completion(body))
+                else:
+                    self._reply(None, {"error": "not found"}, status=404)
+
+            def _reply(self, upstream: Optional[str], payload: Any, status: int = 200):
+                if upstream:
+                    stub.count(upstream)
+                    time.sleep(stub.latency.get(upstream, 0))
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _redirect(self, location: str):
+                self.send_response(302)
+                self.send_header("Location", location)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def _image(self, upstream: str, data: bytes):
+                stub.count(upstream)
+                time.sleep(stub.latency.get(upstream, 0))
+                self.send_response(200)
+                self.send_header("Content-Type", "image/jpeg")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _stream(self, upstream: str, chunks: List[Dict[str, Any]]):
+                """Send chunks as server-sent events, spreading the upstream
+                latency over them like a model generating tokens
+                """
+                stub.count(upstream)
+                latency = stub.latency.get(upstream, 0)
+                time.sleep(latency * STREAM_FIRST_TOKEN_SHARE)
+                delay = latency * (1 - STREAM_FIRST_TOKEN_SHARE) / len(chunks)
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for chunk in chunks:
+                    time.sleep(delay)
+                    self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self._write_chunk(b"data: [DONE]\n\n")
+                self._write_chunk(b"")
+
+            def _write_chunk(self, data: bytes):
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+@dataclass
+class _Snippet:
+    text: str
+    start: float
+    duration: float
+
+
+class _FixtureTranscript:
+    def __init__(self, api: "FixtureTranscriptApi"):
+        self.api = api
+        self.language_code = api.fixture["transcript"]["language"]
+
+    def fetch(self) -> List[_Snippet]:
+        time.sleep(self.api.latency)
+        self.api.fetches += 1
+        return [
+            _Snippet(s["text"], s["start"], s["duration"]) for s in self.api.segments()
+        ]
+
+
+class _FixtureTranscriptList:
+    def __init__(self, api: "FixtureTranscriptApi"):
+        self.api = api
+
+    def find_transcript(self, languages: List[str]) -> _FixtureTranscript:
+        return _FixtureTranscript(self.api)
+
+
+class FixtureTranscriptApi:
+    """Drop-in for YouTubeTranscriptApi returning the fixture transcript.
+
+    ``repeat`` concatenates the recorded segments that many times to simulate
+    long videos (and exercise chunked extraction).
+    """
+
+    def __init__(self, fixture: Dict[str, Any], latency: float, repeat: int = 1):
+        self.fixture = fixture
+        self.latency = latency
+        self.repeat = max(repeat, 1)
+        self.fetches = 0
+
+    def list(self, video_id: str) -> _FixtureTranscriptList:
+        return _FixtureTranscriptList(self)
+
+    def segments(self) -> List[Dict[str, Any]]:
+        recorded = self.fixture["transcript"]["segments"]
+        if not recorded:
+            return []
+        last = recorded[-1]
+        length = last["start"] + last["duration"]
+        return [
+            dict(s, start=round(s["start"] + i * length, 2))
+            for i in range(self.repeat)
+            for s in recorded
+        ]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Serve recorded upstream responses")
+    parser.add_argument("--fixture", default=DEFAULT_FIXTURE)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--latency", default="", help='Per-upstream seconds, e.g. "llm=1.5,places=0.1"'
+    )
+    args = parser.parse_args(argv)
+
+    server = StubServer(
+        load_fixture(args.fixture), parse_latency(args.latency), args.host, args.port
+    )
+    print(f"Stub server listening on {server.url}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,232 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from config import logger
+from metrics import CACHE_LOOKUPS
+
+# Sentinel returned by PersistentCache.get on a miss (None is a valid cached value)
+MISSING = object()
+
+# The disk tier is purged once on open and again after this many writes
+PURGE_EVERY_WRITES = 1000
+
+
+def normalize_cache_key(value: str) -> str:
+    """Normalize a free-text lookup (e.g. a place name) into a cache key"""
+    return re.sub(r"\s+", " ", value).strip().casefold()
+
+
+class PersistentCache:
+    """Two-tier cache: an in-process LRU in front of a shared SQLite table.
+
+    Values must be JSON serializable. ``None`` is stored as a negative entry
+    (e.g. ZERO_RESULTS) and expires after ``negative_ttl`` instead of ``ttl``.
+    Expired rows are deleted from disk periodically, and with
+    ``max_disk_entries`` the rows closest to expiry go first beyond that size.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        db_path: str,
+        max_memory_entries: int = 1024,
+        ttl: float = 30 * 24 * 3600,
+        negative_ttl: float = 24 * 3600,
+        max_disk_entries: int = 0,
+    ):
+        self.namespace = namespace
+        self.db_path = db_path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+
+        self._memory: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "negative_hits": 0,
+            "misses": 0,
+            "writes": 0,
+            "purged": 0,
+        }
+        self._writes_since_purge = 0
+        self._conn = self._connect()
+        self.purge()
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        """Open the SQLite store, degrading to memory-only on failure"""
+        try:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""CREATE TABLE IF NOT EXISTS cache (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT,
+                    expires_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )""")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS cache_expiry ON cache (namespace, expires_at)"
+            )
+            conn.commit()
+            return conn
+        except sqlite3.Error as e:
+            logger.warning(
+                f"Could not open cache database {self.db_path}: {e} - using memory only"
+            )
+            return None
+
+    def get(self, key: str) -> Any:
+        """Return the cached value for key, or MISSING"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._record_hit("memory_hits", value)
+                    return value
+                del self._memory[key]
+
+            if self._conn is not None:
+                try:
+                    row = self._conn.execute(
+                        "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+                        (self.namespace, key),
+                    ).fetchone()
+                except sqlite3.Error as e:
+                    logger.warning(f"Cache read failed for '{key}': {e}")
+                    row = None
+
+                if row is not None and row[1] > now:
+                    value = json.loads(row[0])
+                    self._remember(key, value, row[1])
+                    self._record_hit("disk_hits", value)
+                    return value
+
+            self._stats["misses"] += 1
+            CACHE_LOOKUPS.inc(cache=self.namespace, result="miss")
+            return MISSING
+
+    def set(self, key: str, value: Any) -> None:
+        """Store value under key; None is cached as a negative entry"""
+        ttl = self.negative_ttl if value is None else self.ttl
+        expires_at = time.time() + ttl
+        with self._lock:
+            self._remember(key, value, expires_at)
+            self._stats["writes"] += 1
+
+            if self._conn is not None:
+                try:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                        (self.namespace, key, json.dumps(value), expires_at),
+                    )
+                    self._conn.commit()
+                except sqlite3.Error as e:
+                    logger.warning(f"Cache write failed for '{key}': {e}")
+            self._writes_since_purge += 1
+            if self._writes_since_purge < PURGE_EVERY_WRITES:
+                return
+        self.purge()
+
+    def clear(self) -> None:
+        """Drop every entry of this namespace from both tiers"""
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute(
+                    "DELETE FROM cache WHERE namespace = ?", (self.namespace,)
+                )
+                self._conn.commit()
+
+    def preload(self) -> int:
+        """Fill the memory tier with the most recently written disk entries"""
+        if self._conn is None:
+            return 0
+        with self._lock:
+            try:
+                rows = self._conn.execute(
+                    "SELECT key, value, expires_at FROM cache "
+                    "WHERE namespace = ? AND expires_at > ? "
+                    "ORDER BY expires_at DESC LIMIT ?",
+                    (self.namespace, time.time(), self.max_memory_entries),
+                ).fetchall()
+            except sqlite3.Error as e:
+                logger.warning(f"Cache preload failed for '{self.namespace}': {e}")
+                return 0
+            for key, value, expires_at in reversed(rows):
+                if key not in self._memory:
+                    self._remember(key, json.loads(value), expires_at)
+            return len(rows)
+
+    def purge(self) -> int:
+        """Delete expired rows from the disk tier, then the rows beyond
+        max_disk_entries that expire first; returns the number removed
+        """
+        if self._conn is None:
+            return 0
+        with self._lock:
+            self._writes_since_purge = 0
+            try:
+                removed = self._conn.execute(
+                    "DELETE FROM cache WHERE namespace = ? AND expires_at <= ?",
+                    (self.namespace, time.time()),
+                ).rowcount
+                if self.max_disk_entries > 0:
+                    removed += self._conn.execute(
+                        "DELETE FROM cache WHERE namespace = ? AND key IN ("
+                        "SELECT key FROM cache WHERE namespace = ? "
+                        "ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                        (self.namespace, self.namespace, self.max_disk_entries),
+                    ).rowcount
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Cache purge failed for '{self.namespace}': {e}")
+                return 0
+            self._stats["purged"] += removed
+        if removed:
+            logger.info(
+                f"🧹 Purged {removed} entries from the '{self.namespace}' cache"
+            )
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for the health endpoint"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_ratio"] = (
+            round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 3)
+            if lookups
+            else 0.0
+        )
+        return stats
+
+    def _remember(self, key: str, value: Any, expires_at: float) -> None:
+        """Insert into the LRU tier, evicting the least recently used entry"""
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _record_hit(self, counter: str, value: Any) -> None:
+        self._stats[counter] += 1
+        if value is None:
+            self._stats["negative_hits"] += 1
+        CACHE_LOOKUPS.inc(
+            cache=self.namespace, result="hit" if value is not None else "negative_hit"
+        )
@@ -0,0 +1,403 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from models import Place
+from photos import proxy_photo_url
+from config import logger
+
+EARTH_RADIUS_METERS = 6371008.8
+METERS_PER_DEGREE = 111320.0
+# nearby() searches a box of this radius first and grows it 4x at a time
+# until enough places are found or the requested radius is reached
+NEARBY_FIRST_RADIUS = 2000.0
+
+
+def haversine_meters(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance between two points in meters"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lng2 - lng1)
+    a = (
+        math.sin(dphi / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_METERS * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _has_rtree(conn: sqlite3.Connection) -> bool:
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp._rtree_probe USING rtree(id, a, b)")
+        conn.execute("DROP TABLE temp._rtree_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+class PlaceCatalog:
+    """Persistent catalog of every enriched place, keyed by google_place_id.
+
+    Coordinates are indexed with SQLite's R*Tree module (or a plain lat/lng
+    B-tree index where SQLite was built without it), so bounding-box and
+    radius queries stay in the millisecond range with millions of places.
+    Each place also records the videos that mentioned it.
+    """
+
+    def __init__(self, db_path: str, max_videos_per_place: int = 20):
+        self.db_path = db_path
+        self.max_videos_per_place = max_videos_per_place
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS catalog_places (
+                id INTEGER PRIMARY KEY,
+                google_place_id TEXT NOT NULL UNIQUE,
+                name TEXT NOT NULL,
+                type TEXT,
+                lat REAL NOT NULL,
+                lng REAL NOT NULL,
+                address TEXT,
+                rating REAL,
+                website TEXT,
+                photo_url TEXT,
+                updated_at REAL NOT NULL
+            )""")
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS catalog_mentions (
+                place_id INTEGER NOT NULL,
+                video_id TEXT NOT NULL,
+                description TEXT,
+                timestamp REAL,
+                seen_at REAL NOT NULL,
+                PRIMARY KEY (place_id, video_id)
+            )""")
+
+        self.rtree = _has_rtree(self._conn)
+        if self.rtree:
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS catalog_place_index "
+                "USING rtree(id, min_lat, max_lat, min_lng, max_lng)"
+            )
+        else:
+            logger.warning("SQLite R*Tree unavailable - using a B-tree place index")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_catalog_places_lat_lng ON catalog_places (lat, lng)"
+            )
+        self._remove_photo_keys()
+        self._conn.commit()
+
+    def _remove_photo_keys(self) -> None:
+        """Rewrite photo URLs stored before the photo proxy, which embedded the
+        Google Maps API key, into proxy URLs (once per database)
+        """
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] >= 1:
+            return
+        rows = self._conn.execute(
+            "SELECT id, photo_url FROM catalog_places WHERE photo_url LIKE '%key=%'"
+        ).fetchall()
+        for place_id, url in rows:
+            rewritten = proxy_photo_url(url)
+            # Drop anything unrecognized rather than keep serving the key
+            self._conn.execute(
+                "UPDATE catalog_places SET photo_url = ? WHERE id = ?",
+                (rewritten if rewritten != url else None, place_id),
+            )
+        self._conn.execute("PRAGMA user_version = 1")
+        if rows:
+            logger.info(f"🔒 Rewrote {len(rows)} catalog photo URLs to the photo proxy")
+
+    def add_places(self, places: Iterable[Place], video_id: Optional[str]) -> int:
+        """Upsert places with coordinates and a Google place id; returns how many"""
+        now = time.time()
+        added = 0
+        with self._lock:
+            try:
+                for place in places:
+                    if not place.google_place_id or (
+                        place.coordinates.lat == 0 and place.coordinates.lng == 0
+                    ):
+                        continue
+                    place_id = self._upsert(place, now)
+                    if video_id:
+                        self._conn.execute(
+                            "INSERT OR REPLACE INTO catalog_mentions (place_id, video_id, description, timestamp, seen_at) VALUES (?, ?, ?, ?, ?)",
+                            (
+                                place_id,
+                                video_id,
+                                place.description,
+                                place.timestamp,
+                                now,
+                            ),
+                        )
+                    added += 1
+                self._conn.commit()
+            except sqlite3.Error:
+                self._conn.rollback()
+                raise
+        return added
+
+    def nearby(
+        self,
+        lat: float,
+        lng: float,
+        radius: float,
+        limit: int = 100,
+        exclude_video_id: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Places within radius meters of a point, nearest first.
+
+        Each step asks SQLite for the candidates in a box around the point,
+        nearest first and capped, so dense areas never load every place in
+        the radius; exact distances are computed for those candidates only.
+        """
+        # Fetch a little more than needed so excluded places can be skipped
+        fetch = limit * 4 + 100
+        step = min(radius, NEARBY_FIRST_RADIUS)
+        while True:
+            results = []
+            for row in self._nearest_in_box(lat, lng, step, fetch):
+                distance = haversine_meters(lat, lng, row[4], row[5])
+                if distance <= step:
+                    results.append((distance, row))
+            # Everything closer than the hits found is inside this box
+            if len(results) >= fetch or step >= radius:
+                break
+            step = min(radius, step * 4)
+        results.sort(key=lambda item: item[0])
+
+        places = self._with_videos([row for _, row in results], exclude_video_id, limit)
+        distances = {row[0]: distance for distance, row in results}
+        for place in places:
+            place["distance_m"] = round(distances[place["_rowid"]], 1)
+            del place["_rowid"]
+        return places
+
+    def within_bbox(
+        self,
+        south: float,
+        west: float,
+        north: float,
+        east: float,
+        limit: int = 100,
+        exclude_video_id: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Places inside a bounding box; west > east crosses the antimeridian"""
+        if west > east:
+            boxes = [(west, 180.0), (-180.0, east)]
+        else:
+            boxes = [(west, east)]
+
+        rows = []
+        for west_part, east_part in boxes:
+            # Fetch a little more than needed so excluded places can be skipped
+            rows.extend(
+                self._query_box(south, west_part, north, east_part, limit * 4 + 100)
+            )
+
+        places = self._with_videos(rows, exclude_video_id, limit)
+        for place in places:
+            del place["_rowid"]
+        return places
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            places = self._conn.execute(
+                "SELECT COUNT(*) FROM catalog_places"
+            ).fetchone()[0]
+            mentions = self._conn.execute(
+                "SELECT COUNT(*) FROM catalog_mentions"
+            ).fetchone()[0]
+        return {
+            "places": places,
+            "mentions": mentions,
+            "index": "rtree" if self.rtree else "btree",
+        }
+
+    def _upsert(self, place: Place, now: float) -> int:
+        self._conn.execute(
+            """INSERT INTO catalog_places (google_place_id, name, type, lat, lng, address, rating, website, photo_url, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (google_place_id) DO UPDATE SET
+                name = excluded.name,
+                type = excluded.type,
+                lat = excluded.lat,
+                lng = excluded.lng,
+                address = COALESCE(excluded.address, address),
+                rating = COALESCE(excluded.rating, rating),
+                website = COALESCE(excluded.website, website),
+                photo_url = COALESCE(excluded.photo_url, photo_url),
+                updated_at = excluded.updated_at""",
+            (
+                place.google_place_id,
+                place.name,
+                place.type,
+                place.coordinates.lat,
+                place.coordinates.lng,
+                place.address,
+                place.rating,
+                place.website,
+                place.photo_url,
+                now,
+            ),
+        )
+        place_id = self._conn.execute(
+            "SELECT id FROM catalog_places WHERE google_place_id = ?",
+            (place.google_place_id,),
+        ).fetchone()[0]
+        if self.rtree:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO catalog_place_index (id, min_lat, max_lat, min_lng, max_lng) VALUES (?, ?, ?, ?, ?)",
+                (
+                    place_id,
+                    place.coordinates.lat,
+                    place.coordinates.lat,
+                    place.coordinates.lng,
+                    place.coordinates.lng,
+                ),
+            )
+        return place_id
+
+    def _nearest_in_box(
+        self, lat: float, lng: float, radius: float, limit: int
+    ) -> List[Tuple]:
+        """Up to limit places in the box around a circle, roughly nearest first"""
+        dlat = radius / METERS_PER_DEGREE
+        cos_lat = math.cos(math.radians(lat))
+        dlng = (
+            180.0
+            if cos_lat < 1e-6
+            else min(radius / (METERS_PER_DEGREE * cos_lat), 180.0)
+        )
+        south, north = max(lat - dlat, -90.0), min(lat + dlat, 90.0)
+
+        rows = []
+        for west, east in self._split_longitudes(lng - dlng, lng + dlng):
+            # Across the antimeridian the point is measured from the shifted side
+            center = min(
+                (lng, lng + 360, lng - 360), key=lambda c: abs(c - (west + east) / 2)
+            )
+            rows.extend(
+                self._query_box(
+                    south, west, north, east, limit, nearest_to=(lat, center, cos_lat)
+                )
+            )
+        return rows
+
+    @staticmethod
+    def _split_longitudes(west: float, east: float) -> List[Tuple[float, float]]:
+        """Longitude ranges of a box that may extend past +/-180"""
+        if east - west >= 360:
+            return [(-180.0, 180.0)]
+        if west < -180:
+            return [(west + 360, 180.0), (-180.0, east)]
+        if east > 180:
+            return [(west, 180.0), (-180.0, east - 360)]
+        return [(west, east)]
+
+    def _query_box(
+        self,
+        south: float,
+        west: float,
+        north: float,
+        east: float,
+        limit: Optional[int],
+        nearest_to: Optional[Tuple[float, float, float]] = None,
+    ) -> List[Tuple]:
+        """Places in a box; with nearest_to (lat, lng, cos(lat)) the closest first"""
+        columns = (
+            "p.id, p.google_place_id, p.name, p.type, p.lat, p.lng, "
+            "p.address, p.rating, p.website, p.photo_url"
+        )
+        if self.rtree:
+            # The R*Tree stores 32-bit bounds, so recheck the exact coordinates
+            sql = (
+                f"SELECT {columns} FROM catalog_place_index i "
+                "JOIN catalog_places p ON p.id = i.id "
+                "WHERE i.max_lat >= ? AND i.min_lat <= ? AND i.max_lng >= ? AND i.min_lng <= ? "
+                "AND p.lat BETWEEN ? AND ? AND p.lng BETWEEN ? AND ?"
+            )
+            params = [south, north, west, east, south, north, west, east]
+        else:
+            sql = (
+                f"SELECT {columns} FROM catalog_places p "
+                "WHERE p.lat BETWEEN ? AND ? AND p.lng BETWEEN ? AND ?"
+            )
+            params = [south, north, west, east]
+        if nearest_to is not None:
+            # Squared equirectangular distance in degrees: computed by SQLite,
+            # and close enough to great-circle order to pick the candidates
+            center_lat, center_lng, cos_lat = nearest_to
+            sql += (
+                " ORDER BY (p.lat - ?) * (p.lat - ?)" " + (p.lng - ?) * (p.lng - ?) * ?"
+            )
+            params += [center_lat, center_lat, center_lng, center_lng, cos_lat**2]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _with_videos(
+        self, rows: List[Tuple], exclude_video_id: Optional[str], limit: int
+    ) -> List[Dict[str, Any]]:
+        """Attach the mentioning videos to each row, dropping places only
+        mentioned by exclude_video_id, up to limit places
+        """
+        if not rows:
+            return []
+
+        # Ask for mentions in slices to respect SQLite's parameter limit
+        mentions: Dict[int, List[Dict[str, Any]]] = {}
+        ids = [row[0] for row in rows[: limit * 4 + 100]]
+        with self._lock:
+            for start in range(0, len(ids), 500):
+                chunk = ids[start : start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                for place_id, video_id, description, timestamp in self._conn.execute(
+                    f"SELECT place_id, video_id, description, timestamp FROM catalog_mentions "
+                    f"WHERE place_id IN ({placeholders}) ORDER BY seen_at DESC",
+                    chunk,
+                ):
+                    mentions.setdefault(place_id, []).append(
+                        {
+                            "video_id": video_id,
+                            "description": description,
+                            "timestamp": timestamp,
+                        }
+                    )
+
+        places = []
+        for row in rows[: len(ids)]:
+            videos = mentions.get(row[0], [])
+            if (
+                exclude_video_id
+                and videos
+                and all(video["video_id"] == exclude_video_id for video in videos)
+            ):
+                continue
+            places.append(
+                {
+                    "_rowid": row[0],
+                    "id": row[1],
+                    "google_place_id": row[1],
+                    "name": row[2],
+                    "type": row[3],
+                    "coordinates": {"lat": row[4], "lng": row[5]},
+                    "address": row[6],
+                    "rating": row[7],
+                    "website": row[8],
+                    "photo_url": row[9],
+                    "videos": videos[: self.max_videos_per_place],
+                    "video_count": len(videos),
+                }
+            )
+            if len(places) >= limit:
+                break
+        return places
@@ -0,0 +1,80 @@
+import argparse
+import json
+import sys
+
+from serialization import to_columnar
+from config import configure_logging, BATCH_MAX_WORKERS
+
+
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError("must be a positive integer")
+    return number
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Analyze YouTube videos in bulk and print the places as JSON Lines"
+    )
+    parser.add_argument("video_urls", nargs="*", help="YouTube video URLs")
+    parser.add_argument("--file", help="file with one video URL per line ('-' = stdin)")
+    parser.add_argument("--playlist", help="YouTube playlist URL or ID")
+    parser.add_argument("--channel", help="YouTube channel ID (UC...) to backfill")
+    parser.add_argument(
+        "--limit", type=positive_int, help="analyze at most this many videos"
+    )
+    parser.add_argument("--workers", type=int, default=BATCH_MAX_WORKERS)
+    parser.add_argument(
+        "--include-cached",
+        action="store_true",
+        help="print stored places for already analyzed videos instead of skipping them",
+    )
+    parser.add_argument(
+        "--force-refresh", action="store_true", help="reanalyze cached videos"
+    )
+    parser.add_argument(
+        "--columnar",
+        action="store_true",
+        help="write places in the compact columnar layout",
+    )
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    # The pipeline is imported only once there is work to do
+    from batch import run_batch, BatchInputError
+
+    video_urls = list(args.video_urls)
+    if args.file:
+        if args.file == "-":
+            video_urls.extend(line.strip() for line in sys.stdin if line.strip())
+        else:
+            with open(args.file, encoding="utf-8") as source:
+                video_urls.extend(line.strip() for line in source if line.strip())
+
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for line in run_batch(
+            video_urls,
+            playlist_url=args.playlist,
+            channel_id=args.channel,
+            skip_cached=not args.include_cached,
+            force_refresh=args.force_refresh,
+            limit=args.limit,
+            workers=args.workers,
+        ):
+            if args.columnar and "places" in line:
+                line["places"] = to_columnar(line["places"])
+            output.write(json.dumps(line, ensure_ascii=False) + "\n")
+            output.flush()
+    except BatchInputError as e:
+        parser.error(str(e))
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
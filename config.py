@@ -5,10 +5,7 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
+# Log handlers are installed by the entry points (configure_logging), not on import
 logger = logging.getLogger(__name__)
 
 # API Keys
@@ -16,15 +13,216 @@ YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 GOOGLE_MAPS_API_KEY = os.getenv("GOOGLE_MAPS_API_KEY")
 
-# Log API key status (without exposing the actual keys)
-logger.info(
-    f"API Keys loaded - YouTube: {'✓' if YOUTUBE_API_KEY else '✗'}, OpenAI: {'✓' if OPENAI_API_KEY else '✗'}, Google Maps: {'✓' if GOOGLE_MAPS_API_KEY else '✗'}"
-)
+
+def configure_logging(level: int = logging.INFO) -> None:
+    """Set up log output and report which API keys are set (never the keys)"""
+    if logging.getLogger().handlers:
+        return
+    logging.basicConfig(
+        level=level, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+    logger.info(
+        f"API Keys loaded - YouTube: {'✓' if YOUTUBE_API_KEY else '✗'}, OpenAI: {'✓' if OPENAI_API_KEY else '✗'}, Google Maps: {'✓' if GOOGLE_MAPS_API_KEY else '✗'}"
+    )
+
+
+# OpenAI Configuration
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-5-nano")
+# OpenAI-compatible endpoint; unset uses the official API (benchmarks point it at a stub)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+# Long transcripts are split into chunks of about this many tokens and
+# extracted concurrently (map-reduce); consecutive chunks overlap slightly
+LLM_CHUNK_TOKENS = int(os.getenv("LLM_CHUNK_TOKENS", "6000"))
+LLM_CHUNK_OVERLAP_TOKENS = int(os.getenv("LLM_CHUNK_OVERLAP_TOKENS", "200"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+# Stream completions and start enriching each place as soon as the model has
+# finished writing it, instead of waiting for the whole answer
+LLM_STREAMING = os.getenv("LLM_STREAMING", "True").lower() == "true"
+# Extraction backends tried in order until one succeeds: "openai", "local"
+# (an OpenAI-compatible server such as llama.cpp, Ollama or vLLM) and "rules"
+# (offline keyword/gazetteer extractor, much less accurate; opt in with e.g.
+# "openai,rules")
+LLM_BACKENDS = os.getenv("LLM_BACKENDS", "openai").split(",")
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "120"))
+# Before extraction, drop transcript sentences with no sign of a place (no
+# place keyword, capitalized name or gazetteer name), keeping
+# PREFILTER_CONTEXT_SENTENCES around each candidate; transcripts shorter than
+# PREFILTER_MIN_TOKENS are sent whole
+PREFILTER_ENABLED = os.getenv("PREFILTER_ENABLED", "True").lower() == "true"
+PREFILTER_CONTEXT_SENTENCES = int(os.getenv("PREFILTER_CONTEXT_SENTENCES", "1"))
+PREFILTER_MIN_TOKENS = int(os.getenv("PREFILTER_MIN_TOKENS", "1500"))
+# Unpunctuated auto-captions are cut into "sentences" of this many words
+PREFILTER_MAX_SENTENCE_WORDS = int(os.getenv("PREFILTER_MAX_SENTENCE_WORDS", "40"))
+LOCAL_LLM_BASE_URL = os.getenv("LOCAL_LLM_BASE_URL") or None
+LOCAL_LLM_MODEL = os.getenv("LOCAL_LLM_MODEL", "llama3.1")
+LOCAL_LLM_API_KEY = os.getenv("LOCAL_LLM_API_KEY", "local")
+# Optional "name<TAB>type" list of known places for the rules backend
+LLM_RULES_GAZETTEER = os.getenv("LLM_RULES_GAZETTEER") or None
+# Model answers are cached by a hash of the backend and prompt
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(30 * 24 * 3600)))
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "256"))
 
 # Flask Configuration
-DEBUG = True
-HOST = "0.0.0.0"
-PORT = 5000
+DEBUG = os.getenv("FLASK_DEBUG", "False").lower() == "true"
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "5000"))
+# gunicorn worker processes started by serve.py, and request threads in each
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", str(min(os.cpu_count() or 1, 4))))
+WEB_THREADS = int(os.getenv("WEB_THREADS", "200"))
+
+# Outbound HTTP Configuration
+# Base URLs can point at a local stub server for testing and benchmarks
+GEOCODING_BASE_URL = os.getenv("GEOCODING_BASE_URL", "https://maps.googleapis.com")
+PLACES_BASE_URL = os.getenv("PLACES_BASE_URL", "https://places.googleapis.com")
+YOUTUBE_DATA_BASE_URL = os.getenv("YOUTUBE_DATA_BASE_URL", "https://www.googleapis.com")
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "2"))
+HTTP_BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", "0.25"))
+HTTP_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "4"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "50"))
+# Consecutive failures before an upstream is short-circuited, and for how long
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))
+
+# Global rate limits per upstream API in requests per second (0 = unlimited)
+RATE_LIMIT_GEOCODING = float(os.getenv("RATE_LIMIT_GEOCODING", "40"))
+RATE_LIMIT_PLACES = float(os.getenv("RATE_LIMIT_PLACES", "10"))
+RATE_LIMIT_YOUTUBE = float(os.getenv("RATE_LIMIT_YOUTUBE", "10"))
+RATE_LIMIT_TRANSCRIPTS = float(os.getenv("RATE_LIMIT_TRANSCRIPTS", "2"))
+RATE_LIMIT_OPENAI = float(os.getenv("RATE_LIMIT_OPENAI", "0"))
+# Requests per second for one Google Maps API key across geocoding and places (0 = per-upstream limits only)
+RATE_LIMIT_GOOGLE_MAPS_KEY = float(os.getenv("RATE_LIMIT_GOOGLE_MAPS_KEY", "0"))
+# Processes sharing the limits above; each uses 1/RATE_LIMIT_PROCESSES of them
+# (serve.py sets this to its worker count, also under `gunicorn -c serve.py`)
+RATE_LIMIT_PROCESSES = max(1, int(os.getenv("RATE_LIMIT_PROCESSES", "1")))
+
+# Admission control: interactive /api/analyze requests vs batch and background refreshes
+# Share of each rate limit's burst that bulk work leaves for interactive requests
+SCHEDULER_INTERACTIVE_RESERVE = float(
+    os.getenv("SCHEDULER_INTERACTIVE_RESERVE", "0.25")
+)
+# Analyses running at once; beyond this interactive requests get 429, bulk work waits
+SCHEDULER_MAX_INTERACTIVE = int(os.getenv("SCHEDULER_MAX_INTERACTIVE", "64"))
+SCHEDULER_MAX_BULK = int(os.getenv("SCHEDULER_MAX_BULK", "8"))
+# Reject new work when the upstream queues ahead of it would take longer (seconds)
+SCHEDULER_MAX_QUEUE_INTERACTIVE = float(
+    os.getenv("SCHEDULER_MAX_QUEUE_INTERACTIVE", "15")
+)
+SCHEDULER_MAX_QUEUE_BULK = float(os.getenv("SCHEDULER_MAX_QUEUE_BULK", "300"))
+
+# Enrichment Configuration
+# Maximum number of Google Maps requests in flight at once (shared by all analyses)
+ENRICHMENT_MAX_WORKERS = int(os.getenv("ENRICHMENT_MAX_WORKERS", "8"))
+# "places": one Places Text Search per place (coordinates, address, rating,
+# website and photos), biased towards the video's region, with Geocoding only
+# as a fallback. "geocode": Geocoding plus a separate photo search per place.
+ENRICHMENT_MODE = os.getenv("ENRICHMENT_MODE", "places")
+
+# Place deduplication: names at least this similar (0-1) are merged before
+# enrichment; enriched places closer than DEDUP_RADIUS_METERS with related
+# names are merged after it (0 disables)
+DEDUP_FUZZY_THRESHOLD = float(os.getenv("DEDUP_FUZZY_THRESHOLD", "0.88"))
+DEDUP_RADIUS_METERS = float(os.getenv("DEDUP_RADIUS_METERS", "50"))
+
+# Cache Configuration
+CACHE_DIR = os.getenv(
+    "CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+)
+CACHE_DB_PATH = os.getenv("CACHE_DB_PATH", os.path.join(CACHE_DIR, "cache.sqlite3"))
+# Geocoding / Places lookups, keyed on the normalized place name
+PLACES_CACHE_TTL = int(os.getenv("PLACES_CACHE_TTL", str(30 * 24 * 3600)))
+PLACES_CACHE_NEGATIVE_TTL = int(os.getenv("PLACES_CACHE_NEGATIVE_TTL", str(24 * 3600)))
+PLACES_CACHE_MEMORY_ENTRIES = int(os.getenv("PLACES_CACHE_MEMORY_ENTRIES", "2048"))
+# Rows kept on disk per cache (lookups, model answers); expired rows are always
+# deleted, beyond this the ones expiring first go too (0 = no limit)
+CACHE_MAX_DISK_ENTRIES = int(os.getenv("CACHE_MAX_DISK_ENTRIES", "200000"))
+
+# Transcripts, keyed by video_id and language (tried in this order)
+TRANSCRIPT_DIR = os.getenv("TRANSCRIPT_DIR", os.path.join(CACHE_DIR, "transcripts"))
+TRANSCRIPT_LANGUAGES = os.getenv("TRANSCRIPT_LANGUAGES", "en,pl").split(",")
+TRANSCRIPT_MEMORY_ENTRIES = int(os.getenv("TRANSCRIPT_MEMORY_ENTRIES", "64"))
+# Transcripts on disk are refetched after this many seconds; beyond the size
+# bound the oldest are deleted
+TRANSCRIPT_CACHE_TTL = int(os.getenv("TRANSCRIPT_CACHE_TTL", str(30 * 24 * 3600)))
+TRANSCRIPT_CACHE_MAX_BYTES = int(
+    os.getenv("TRANSCRIPT_CACHE_MAX_BYTES", str(256 * 1024 * 1024))
+)
+# Video descriptions used when a video has no transcript are refetched after this
+TRANSCRIPT_FALLBACK_TTL = int(os.getenv("TRANSCRIPT_FALLBACK_TTL", str(24 * 3600)))
+
+# Analysis results, keyed by video_id and pipeline version
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", str(24 * 3600)))
+# Extra window during which an expired result is served while it is refreshed
+RESULT_CACHE_STALE_TTL = int(os.getenv("RESULT_CACHE_STALE_TTL", str(7 * 24 * 3600)))
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "1000"))
+
+# Catalog of every enriched place, queried by /api/places/nearby and /bbox
+CATALOG_DB_PATH = os.getenv(
+    "CATALOG_DB_PATH", os.path.join(CACHE_DIR, "catalog.sqlite3")
+)
+CATALOG_MAX_RADIUS = float(os.getenv("CATALOG_MAX_RADIUS", "200000"))  # meters
+CATALOG_MAX_RESULTS = int(os.getenv("CATALOG_MAX_RESULTS", "500"))
+
+# Place photos served by /api/photos from a size-bounded disk cache, so each
+# photo is downloaded from Google once and the API key never reaches browsers
+PHOTO_CACHE_DIR = os.getenv("PHOTO_CACHE_DIR", os.path.join(CACHE_DIR, "photos"))
+PHOTO_CACHE_MAX_BYTES = int(os.getenv("PHOTO_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+# Widths (pixels) photos are stored in; requests are rounded up to one of them
+PHOTO_WIDTHS = [int(w) for w in os.getenv("PHOTO_WIDTHS", "200,400,800").split(",")]
+PHOTO_DEFAULT_WIDTH = int(os.getenv("PHOTO_DEFAULT_WIDTH", "400"))
+# Browser cache lifetime of a served photo (seconds)
+PHOTO_MAX_AGE = int(os.getenv("PHOTO_MAX_AGE", str(30 * 24 * 3600)))
+
+# Local gazetteer (GeoNames dump, e.g. cities15000.txt or allCountries.zip)
+# resolving well-known places without the Geocoding API
+GAZETTEER_PATH = os.getenv("GAZETTEER_PATH") or None
+GAZETTEER_DB_PATH = os.getenv(
+    "GAZETTEER_DB_PATH", os.path.join(CACHE_DIR, "gazetteer.sqlite3")
+)
+GAZETTEER_MIN_SIMILARITY = float(os.getenv("GAZETTEER_MIN_SIMILARITY", "0.7"))
+# Types resolved from the gazetteer before asking Google at all; other types
+# only use it when Google has no answer (or no key is configured)
+GAZETTEER_FIRST_TYPES = os.getenv(
+    "GAZETTEER_FIRST_TYPES", "city,lake,mountains,sea"
+).split(",")
+
+# Background analysis jobs. Job threads mostly wait on upstream APIs, whose
+# concurrency is bounded by the enrichment/LLM pools and rate limits instead
+JOB_MAX_WORKERS = int(os.getenv("JOB_MAX_WORKERS", "32"))
+# Seconds a finished job stays available to /api/jobs
+JOB_RETENTION = int(os.getenv("JOB_RETENTION", "3600"))
+# Seconds between keep-alive comments on an idle progress stream
+JOB_STREAM_KEEPALIVE = float(os.getenv("JOB_STREAM_KEEPALIVE", "15"))
+
+# State shared by worker processes: background jobs and their progress, and
+# leases that stop two processes from analyzing the same video at once
+SHARED_STATE_DB_PATH = os.getenv(
+    "SHARED_STATE_DB_PATH", os.path.join(CACHE_DIR, "state.sqlite3")
+)
+# A lease is renewed while its analysis runs and expires this long after a
+# worker dies; other workers poll for the result every SHARED_POLL_INTERVAL
+ANALYSIS_LEASE_TTL = float(os.getenv("ANALYSIS_LEASE_TTL", "30"))
+SHARED_POLL_INTERVAL = float(os.getenv("SHARED_POLL_INTERVAL", "0.5"))
+
+# Itinerary planning (/api/itinerary)
+ITINERARY_MAX_PLACES = int(os.getenv("ITINERARY_MAX_PLACES", "3000"))
+ITINERARY_MAX_DAYS = int(os.getenv("ITINERARY_MAX_DAYS", "30"))
+# Seconds spent improving the route order; the greedy route is returned on time
+ITINERARY_TIME_BUDGET = float(os.getenv("ITINERARY_TIME_BUDGET", "0.5"))
+
+# Create the analyzer, API clients and hot cache entries when the app starts
+# instead of on the first request (serve.py workers always prewarm after forking)
+PREWARM = os.getenv("PREWARM", "False").lower() == "true"
+
+# Batch analysis (/api/analyze/batch and cli.py)
+BATCH_MAX_WORKERS = int(os.getenv("BATCH_MAX_WORKERS", "8"))
+BATCH_MAX_VIDEOS = int(os.getenv("BATCH_MAX_VIDEOS", "5000"))
+
+# Tracing: recent request traces kept for /api/traces, and the duration above
+# which a request's slowest spans are logged (0 disables)
+TRACE_RETENTION = int(os.getenv("TRACE_RETENTION", "500"))
+TRACE_SLOW_SECONDS = float(os.getenv("TRACE_SLOW_SECONDS", "20"))
 
 # Valid place types
 VALID_PLACE_TYPES = [
@@ -0,0 +1,192 @@
+import json
+from typing import Any, Dict, Iterable, List, Optional
+
+from config import DEDUP_FUZZY_THRESHOLD
+from normalization import dedupe_places
+
+# Rough characters-per-token ratio for English/Polish text with OpenAI tokenizers
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token count estimate, good enough for budgeting prompts"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def split_transcript(
+    transcript: str, chunk_tokens: int, overlap_tokens: int = 0
+) -> List[str]:
+    """Split a transcript into overlapping chunks of roughly chunk_tokens each.
+
+    Chunks are cut on word boundaries; each chunk repeats the last
+    ``overlap_tokens`` of the previous one so a place mentioned across a
+    boundary is still seen whole by at least one chunk.
+    """
+    words = transcript.split()
+    if estimate_tokens(transcript) <= chunk_tokens or not words:
+        return [transcript]
+
+    chunk_chars = chunk_tokens * CHARS_PER_TOKEN
+    overlap_chars = min(overlap_tokens * CHARS_PER_TOKEN, chunk_chars // 2)
+
+    chunks = []
+    start = 0
+    while start < len(words):
+        end = start
+        size = 0
+        while end < len(words) and (
+            end == start or size + len(words[end]) + 1 <= chunk_chars
+        ):
+            size += len(words[end]) + 1
+            end += 1
+        chunks.append(" ".join(words[start:end]))
+        if end >= len(words):
+            break
+
+        # Step back far enough to repeat overlap_chars of text in the next chunk
+        next_start = end
+        overlap = 0
+        while (
+            next_start - 1 > start
+            and overlap + len(words[next_start - 1]) + 1 <= overlap_chars
+        ):
+            next_start -= 1
+            overlap += len(words[next_start]) + 1
+        start = next_start
+
+    return chunks
+
+
+def merge_places(place_lists: Iterable[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Merge places extracted from several chunks (or one), deduplicating
+    names that refer to the same place (see normalization.dedupe_places)
+    """
+    return dedupe_places(
+        (place for places in place_lists for place in places), DEDUP_FUZZY_THRESHOLD
+    )
+
+
+class PlaceStreamParser:
+    """Incremental parser for the extraction JSON as it streams from the model.
+
+    feed() takes the next piece of the completion and returns the place
+    objects that became complete, so they can be enriched while the model is
+    still generating. Top-level scalar fields (e.g. "region") are available in
+    ``fields`` as soon as their value ends. Text around the JSON object, such
+    as markdown fences, is ignored.
+    """
+
+    def __init__(self, array_key: str = "places"):
+        self.array_key = array_key
+        self.fields: Dict[str, Any] = {}
+        self.places: List[Dict[str, Any]] = []
+        self.complete = False
+        self.invalid = 0
+
+        self._text = ""
+        self._position = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._expect_key = False
+        self._key: Optional[str] = None
+        self._value_start: Optional[int] = None
+        self._array_depth: Optional[int] = None
+        self._object_start: Optional[int] = None
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        self._text += text
+        found = []
+        text, i = self._text, self._position
+        while i < len(text) and not self.complete:
+            char = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if len(self._stack) == 1 and self._expect_key:
+                        self._key = json.loads(text[self._string_start : i + 1])
+                        self._expect_key = False
+            elif not self._stack:
+                if char == "{":
+                    self._stack.append("{")
+                    self._expect_key = True
+            elif char == '"':
+                self._in_string = True
+                self._string_start = i
+            elif char in "{[":
+                if (
+                    len(self._stack) == 1
+                    and char == "["
+                    and self._key == self.array_key
+                ):
+                    self._array_depth = 2
+                    self._value_start = None
+                elif char == "{" and len(self._stack) == self._array_depth:
+                    self._object_start = i
+                self._stack.append(char)
+            elif char in "}]":
+                self._stack.pop()
+                if char == "}" and len(self._stack) == self._array_depth:
+                    place = self._parse(text[self._object_start : i + 1])
+                    self._object_start = None
+                    if place is not None:
+                        self.places.append(place)
+                        found.append(place)
+                elif char == "]" and len(self._stack) == 1 and self._array_depth:
+                    self._array_depth = None
+                elif not self._stack:
+                    self._end_value(text, i)
+                    self.complete = True
+            elif len(self._stack) == 1:
+                if char == ":":
+                    self._value_start = i + 1
+                elif char == ",":
+                    self._end_value(text, i)
+                    self._expect_key = True
+            i += 1
+
+        # Keep only the text an unfinished place object or value may still need
+        keep = min(
+            (
+                start
+                for start in (
+                    self._object_start,
+                    self._value_start,
+                    self._string_start if self._in_string else None,
+                )
+                if start is not None
+            ),
+            default=i,
+        )
+        self._text = text[keep:]
+        self._position = i - keep
+        self._string_start -= keep
+        if self._object_start is not None:
+            self._object_start -= keep
+        if self._value_start is not None:
+            self._value_start -= keep
+        return found
+
+    def _end_value(self, text: str, end: int) -> None:
+        """Record the scalar value of the current top-level key, if any"""
+        if self._value_start is not None and self._key is not None:
+            raw = text[self._value_start : end].strip()
+            try:
+                self.fields[self._key] = json.loads(raw)
+            except json.JSONDecodeError:
+                self.invalid += 1
+        self._value_start = None
+        self._key = None
+
+    def _parse(self, raw: str) -> Optional[Dict[str, Any]]:
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError:
+            self.invalid += 1
+            return None
+        return value if isinstance(value, dict) else None
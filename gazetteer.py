@@ -0,0 +1,495 @@
+import argparse
+import io
+import math
+import os
+import sqlite3
+import sys
+import threading
+import time
+import zipfile
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from catalog import haversine_meters
+from normalization import normalize_place_name
+from config import logger, configure_logging, GAZETTEER_DB_PATH, GAZETTEER_PATH
+from metrics import CACHE_LOOKUPS
+
+# GeoNames feature class/code -> VALID_PLACE_TYPES. Codes not listed fall back
+# to their class; classes not listed are not imported.
+FEATURE_CODE_TYPES = {
+    **dict.fromkeys(["H.LK", "H.LKS", "H.LKI", "H.LKN", "H.RSV"], "lake"),
+    **dict.fromkeys(
+        ["H.SEA", "H.BAY", "H.BAYS", "H.GULF", "H.OCN", "H.LGN", "H.CHN", "H.STRT"],
+        "sea",
+    ),
+    **dict.fromkeys(["T.ISL", "T.ISLS", "T.BCH", "T.CAPE", "T.PEN"], "sea"),
+    **dict.fromkeys(
+        ["T.MT", "T.MTS", "T.PK", "T.PKS", "T.VLC", "T.PASS", "T.RDGE", "T.GLCR"],
+        "mountains",
+    ),
+    **dict.fromkeys(["L.PRK", "L.RESN", "L.RESF", "L.RESW", "V.FRST"], "park"),
+    **dict.fromkeys(
+        [
+            "S.MNMT",
+            "S.CSTL",
+            "S.CH",
+            "S.CTHSE",
+            "S.MSQE",
+            "S.TMPL",
+            "S.PAL",
+            "S.RUIN",
+            "S.TOWR",
+            "S.ANS",
+            "S.MUS",
+            "S.AMTH",
+            "S.HSTS",
+            "S.MSTY",
+            "S.BDG",
+        ],
+        "monument",
+    ),
+    **dict.fromkeys(["A.PCLI", "A.PCLD", "A.PCLS", "A.ADM1"], "other"),
+}
+FEATURE_CLASS_TYPES = {"P": "city"}
+
+# Columns of the GeoNames "geoname" table dump (allCountries.txt, cities15000.txt, ...)
+GEONAMES_COLUMNS = 19
+
+TRIGRAM_MAX_POSTINGS = 5000  # skip trigrams this common when matching fuzzily
+
+
+def trigrams(key: str) -> List[str]:
+    padded = f"  {key} "
+    return sorted({padded[i : i + 3] for i in range(len(padded) - 2)})
+
+
+@dataclass(slots=True)
+class GazetteerMatch:
+    id: int
+    name: str
+    lat: float
+    lng: float
+    type: str
+    country: str
+    population: int
+    exact: bool
+    score: float
+
+
+class Gazetteer:
+    """Local place-name index built from a GeoNames-style dump.
+
+    The dump is imported once into SQLite (memory-mapped for reads) with an
+    index on normalized names, including alternate names, and a trigram
+    index on primary names for misspellings. resolve() only returns a match
+    when it is unambiguous, so callers can skip the Geocoding API for it.
+
+    The import is an explicit step (``python gazetteer.py``, or serve.py and
+    app.py before they start serving); request paths open the index
+    read-only with open_readonly().
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        min_similarity: float = 0.7,
+        max_memory_entries: int = 4096,
+        readonly: bool = False,
+    ):
+        self.db_path = db_path
+        self.min_similarity = min_similarity
+        self.max_memory_entries = max_memory_entries
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, Tuple[Tuple, ...]]" = OrderedDict()
+        self._stats = {"hit": 0, "ambiguous": 0, "miss": 0}
+
+        if readonly:
+            self._conn = sqlite3.connect(
+                f"file:{db_path}?mode=ro", uri=True, check_same_thread=False
+            )
+            self._conn.execute("PRAGMA mmap_size=268435456")
+            return
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA mmap_size=268435456")
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS gazetteer_places (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                lat REAL NOT NULL,
+                lng REAL NOT NULL,
+                type TEXT NOT NULL,
+                country TEXT,
+                population INTEGER NOT NULL
+            )""")
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS gazetteer_names (
+                key TEXT NOT NULL,
+                place_id INTEGER NOT NULL,
+                is_primary INTEGER NOT NULL,
+                PRIMARY KEY (key, place_id)
+            ) WITHOUT ROWID""")
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS gazetteer_trigrams (
+                trigram TEXT NOT NULL,
+                key TEXT NOT NULL,
+                PRIMARY KEY (trigram, key)
+            ) WITHOUT ROWID""")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS gazetteer_meta (name TEXT PRIMARY KEY, value TEXT)"
+        )
+        self._conn.commit()
+
+    @classmethod
+    def open(cls, db_path: str, dump_path: Optional[str], **kwargs) -> "Gazetteer":
+        """Open the index for writing, (re)importing dump_path when it changed
+        since the last import. Processes starting together import it once.
+        """
+        gazetteer = cls(db_path, **kwargs)
+        if dump_path and os.path.exists(dump_path):
+            stat = os.stat(dump_path)
+            source = f"{os.path.abspath(dump_path)}:{stat.st_size}:{int(stat.st_mtime)}"
+            with _import_lock(db_path):
+                if gazetteer._meta("source") != source:
+                    gazetteer.load(dump_path)
+                    gazetteer._set_meta("source", source)
+        elif dump_path:
+            logger.warning(f"Gazetteer dump not found: {dump_path}")
+        return gazetteer
+
+    @classmethod
+    def open_readonly(cls, db_path: str, **kwargs) -> Optional["Gazetteer"]:
+        """Open an imported index for lookups only; None when nothing was imported"""
+        if not os.path.exists(db_path):
+            return None
+        gazetteer = cls(db_path, readonly=True, **kwargs)
+        try:
+            imported = gazetteer.source is not None
+        except sqlite3.OperationalError:
+            # Created but never imported into (no tables yet)
+            imported = False
+        if not imported:
+            gazetteer.close()
+            return None
+        return gazetteer
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def load(self, dump_path: str) -> int:
+        """Replace the index with the places in a GeoNames dump (.txt or .zip)"""
+        started = time.perf_counter()
+        logger.info(f"📖 Importing gazetteer from {dump_path}...")
+        with self._lock:
+            self._memory.clear()
+            conn = self._conn
+            # A failed import is simply redone on the next start
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute("DELETE FROM gazetteer_places")
+            conn.execute("DELETE FROM gazetteer_names")
+            conn.execute("DELETE FROM gazetteer_trigrams")
+
+            places, names, grams = [], [], []
+            count = 0
+            for row in self._read_dump(dump_path):
+                place_id = row[0]
+                places.append(row[:7])
+                primary = normalize_place_name(row[1])
+                keys = {primary: 1}
+                for alias in row[7]:
+                    keys.setdefault(normalize_place_name(alias), 0)
+                for key, is_primary in keys.items():
+                    if key:
+                        names.append((key, place_id, is_primary))
+                if primary:
+                    grams.extend((gram, primary) for gram in trigrams(primary))
+                count += 1
+                if len(names) >= 50000:
+                    self._flush(places, names, grams)
+            self._flush(places, names, grams)
+            conn.commit()
+            conn.execute("PRAGMA synchronous=NORMAL")
+
+        logger.info(
+            f"✅ Gazetteer ready: {count} places in {time.perf_counter() - started:.1f}s"
+        )
+        return count
+
+    def resolve(
+        self,
+        name: str,
+        place_type: Optional[str] = None,
+        bias: Optional[Dict[str, Any]] = None,
+    ) -> Optional[GazetteerMatch]:
+        """The place a name most likely refers to, or None when unknown or
+        ambiguous. bias is a Places API locationBias (rectangle or circle).
+        """
+        key = normalize_place_name(name)
+        if not key:
+            return None
+
+        candidates = [
+            self._score(row, bias)
+            for row in self._candidates(key)
+            if not place_type or "other" in (place_type, row[4]) or place_type == row[4]
+        ]
+        candidates.sort(key=lambda match: match.score, reverse=True)
+
+        match = None
+        if not candidates:
+            result = "miss"
+        elif len(candidates) == 1 or candidates[0].score - candidates[1].score >= 1:
+            # A clear winner: in the region, or 10x the population of the next namesake
+            match, result = candidates[0], "hit"
+        else:
+            result = "ambiguous"
+
+        with self._lock:
+            self._stats[result] += 1
+        CACHE_LOOKUPS.inc(cache="gazetteer", result=result)
+        return match
+
+    def knows(self, name: str) -> bool:
+        """Whether name is exactly a known place name (no fuzzy matching)"""
+        key = normalize_place_name(name)
+        if not key:
+            return False
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM gazetteer_names WHERE key = ? LIMIT 1", (key,)
+            ).fetchone()
+        return row is not None
+
+    @property
+    def source(self) -> Optional[str]:
+        """Path, size and mtime of the imported dump"""
+        return self._meta("source")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            places = self._conn.execute(
+                "SELECT COUNT(*) FROM gazetteer_places"
+            ).fetchone()[0]
+            return {"places": places, **self._stats}
+
+    def _candidates(self, key: str) -> Tuple[Tuple, ...]:
+        """Places whose name or alternate name is key, else fuzzy matches of it"""
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None:
+                self._memory.move_to_end(key)
+                return cached
+
+            rows = self._conn.execute(
+                "SELECT p.id, p.name, p.lat, p.lng, p.type, p.country, p.population, 1, n.is_primary "
+                "FROM gazetteer_names n JOIN gazetteer_places p ON p.id = n.place_id "
+                "WHERE n.key = ?",
+                (key,),
+            ).fetchall()
+            if not rows:
+                rows = self._fuzzy(key)
+
+            result = tuple(rows)
+            self._memory[key] = result
+            if len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+            return result
+
+    def _fuzzy(self, key: str) -> List[Tuple]:
+        """Primary names sharing enough trigrams with key (Jaccard similarity)"""
+        grams = trigrams(key)
+        counts: Dict[str, int] = {}
+        for gram in grams:
+            postings = self._conn.execute(
+                "SELECT key FROM gazetteer_trigrams WHERE trigram = ? LIMIT ?",
+                (gram, TRIGRAM_MAX_POSTINGS + 1),
+            ).fetchall()
+            # Very common trigrams say little and would dominate the cost
+            if len(postings) > TRIGRAM_MAX_POSTINGS:
+                continue
+            for (other,) in postings:
+                counts[other] = counts.get(other, 0) + 1
+
+        rows = []
+        for other, shared in counts.items():
+            other_grams = len(trigrams(other))
+            similarity = shared / (len(grams) + other_grams - shared)
+            if similarity >= self.min_similarity:
+                rows.extend(
+                    self._conn.execute(
+                        "SELECT p.id, p.name, p.lat, p.lng, p.type, p.country, p.population, 0, 1 "
+                        "FROM gazetteer_names n JOIN gazetteer_places p ON p.id = n.place_id "
+                        "WHERE n.key = ? AND n.is_primary = 1",
+                        (other,),
+                    ).fetchall()
+                )
+        return rows
+
+    @staticmethod
+    def _score(row: Tuple, bias: Optional[Dict[str, Any]]) -> GazetteerMatch:
+        place_id, name, lat, lng, place_type, country, population, exact, primary = row
+        score = math.log10(population + 1) + (0.5 if primary else 0.0)
+        if bias and _inside(bias, lat, lng):
+            score += 3.0
+        return GazetteerMatch(
+            id=place_id,
+            name=name,
+            lat=lat,
+            lng=lng,
+            type=place_type,
+            country=country,
+            population=population,
+            exact=bool(exact),
+            score=score,
+        )
+
+    def _flush(self, places: List, names: List, grams: List) -> None:
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO gazetteer_places (id, name, lat, lng, type, country, population) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            places,
+        )
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO gazetteer_names (key, place_id, is_primary) VALUES (?, ?, ?)",
+            names,
+        )
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO gazetteer_trigrams (trigram, key) VALUES (?, ?)",
+            grams,
+        )
+        places.clear()
+        names.clear()
+        grams.clear()
+
+    @staticmethod
+    def _read_dump(dump_path: str) -> Iterator[Tuple]:
+        """(id, name, lat, lng, type, country, population, alternate names)
+        for every importable row of a GeoNames dump
+        """
+        if zipfile.is_zipfile(dump_path):
+            archive = zipfile.ZipFile(dump_path)
+            member = next(name for name in archive.namelist() if name.endswith(".txt"))
+            lines = io.TextIOWrapper(archive.open(member), encoding="utf-8")
+        else:
+            lines = open(dump_path, encoding="utf-8")
+
+        with lines:
+            for line in lines:
+                fields = line.rstrip("\n").split("\t")
+                if len(fields) < GEONAMES_COLUMNS:
+                    continue
+                feature = f"{fields[6]}.{fields[7]}"
+                place_type = FEATURE_CODE_TYPES.get(
+                    feature, FEATURE_CLASS_TYPES.get(fields[6])
+                )
+                if place_type is None:
+                    continue
+                try:
+                    row = (
+                        int(fields[0]),
+                        fields[1],
+                        float(fields[4]),
+                        float(fields[5]),
+                        place_type,
+                        fields[8] or None,
+                        int(fields[14] or 0),
+                    )
+                except ValueError:
+                    continue
+                aliases = [
+                    alias
+                    for alias in [fields[2], *fields[3].split(",")]
+                    if alias and not alias.startswith("http")
+                ]
+                yield (*row, aliases)
+
+    def _meta(self, name: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM gazetteer_meta WHERE name = ?", (name,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, name: str, value: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO gazetteer_meta (name, value) VALUES (?, ?)",
+                (name, value),
+            )
+            self._conn.commit()
+
+
+@contextmanager
+def _import_lock(db_path: str) -> Iterator[None]:
+    """Exclusive lock next to the index, held while (re)importing it"""
+    try:
+        import fcntl
+    except ImportError:  # Windows: one process imports at a time anyway
+        yield
+        return
+    with open(f"{db_path}.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def prepare(
+    db_path: str = GAZETTEER_DB_PATH, dump_path: Optional[str] = GAZETTEER_PATH
+) -> None:
+    """Import the configured dump if it changed; run before serving requests"""
+    if not dump_path:
+        return
+    try:
+        Gazetteer.open(db_path, dump_path).close()
+    except (OSError, sqlite3.Error) as e:
+        logger.warning(f"Gazetteer import failed: {e}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Import a GeoNames dump into the local gazetteer index"
+    )
+    parser.add_argument(
+        "dump",
+        nargs="?",
+        default=GAZETTEER_PATH,
+        help="GeoNames dump (.txt or .zip); defaults to GAZETTEER_PATH",
+    )
+    parser.add_argument("--db", default=GAZETTEER_DB_PATH, help="index database")
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    if not args.dump:
+        parser.error("no dump given and GAZETTEER_PATH is not set")
+    if not os.path.exists(args.dump):
+        parser.error(f"dump not found: {args.dump}")
+    gazetteer = Gazetteer.open(args.db, args.dump)
+    logger.info(f"📖 Gazetteer index {args.db}: {gazetteer.stats()['places']} places")
+    gazetteer.close()
+    return 0
+
+
+def _inside(bias: Dict[str, Any], lat: float, lng: float) -> bool:
+    """Whether a point lies inside a Places API locationBias"""
+    if "rectangle" in bias:
+        low, high = bias["rectangle"]["low"], bias["rectangle"]["high"]
+        if not low["latitude"] <= lat <= high["latitude"]:
+            return False
+        if low["longitude"] <= high["longitude"]:
+            return low["longitude"] <= lng <= high["longitude"]
+        return lng >= low["longitude"] or lng <= high["longitude"]
+    if "circle" in bias:
+        center = bias["circle"]["center"]
+        distance = haversine_meters(center["latitude"], center["longitude"], lat, lng)
+        return distance <= bias["circle"]["radius"]
+    return False
+
+
+if __name__ == "__main__":
+    sys.exit(main())
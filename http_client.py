@@ -0,0 +1,261 @@
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+import httpx
+
+from config import logger
+from metrics import UPSTREAM_ERRORS, span
+from rate_limit import RateLimiter
+
+try:
+    import h2  # noqa: F401 - only needed to enable HTTP/2 in httpx
+
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Statuses worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(httpx.HTTPError):
+    """Raised without calling the upstream while its circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures and lets one trial call through later"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+            # Half-open: a single trial call decides whether to close again
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class Upstream:
+    """An external API with its own base URL, circuit breaker and metrics"""
+
+    def __init__(
+        self,
+        name: str,
+        base_url: str,
+        breaker: CircuitBreaker,
+        limiter: RateLimiter,
+    ):
+        self.name = name
+        self.base_url = base_url.rstrip("/")
+        self.breaker = breaker
+        self.limiter = limiter
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=1000)
+        self._counters = {
+            "requests": 0,
+            "errors": 0,
+            "retries": 0,
+            "rejected": 0,
+        }
+
+    def count(self, counter: str) -> None:
+        with self._lock:
+            self._counters[counter] += 1
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._counters)
+            latencies = sorted(self._latencies)
+        stats["circuit"] = self.breaker.state
+        stats["rate_limit"] = self.limiter.stats()
+        if latencies:
+            stats["latency_ms"] = {
+                "p50": round(latencies[len(latencies) // 2] * 1000, 1),
+                "p95": round(latencies[int(len(latencies) * 0.95)] * 1000, 1),
+                "max": round(latencies[-1] * 1000, 1),
+            }
+        return stats
+
+
+class HttpClient:
+    """Shared outbound HTTP client: pooled keep-alive connections (HTTP/2 when
+    available), uniform timeouts, jittered exponential backoff on 429/5xx and a
+    circuit breaker per upstream.
+    """
+
+    def __init__(
+        self,
+        timeout: float = 10,
+        connect_timeout: float = 5,
+        max_retries: int = 2,
+        backoff_base: float = 0.25,
+        backoff_max: float = 4,
+        max_connections: int = 50,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30,
+    ):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.upstreams: Dict[str, Upstream] = {}
+        self._client = httpx.Client(
+            http2=HTTP2_AVAILABLE,
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+        )
+
+    def register(
+        self,
+        name: str,
+        base_url: str,
+        rate_limit: float = 0,
+        limiter: Optional[RateLimiter] = None,
+    ) -> Upstream:
+        """Add an upstream; rate_limit caps its requests per second (0 = no cap)
+        unless a shared limiter is given
+        """
+        upstream = Upstream(
+            name,
+            base_url,
+            CircuitBreaker(self.failure_threshold, self.reset_timeout),
+            limiter or RateLimiter(rate_limit, burst=int(rate_limit)),
+        )
+        self.upstreams[name] = upstream
+        return upstream
+
+    def get(self, upstream: str, path: str, **kwargs) -> httpx.Response:
+        return self.request(upstream, "GET", path, **kwargs)
+
+    def post(self, upstream: str, path: str, **kwargs) -> httpx.Response:
+        return self.request(upstream, "POST", path, **kwargs)
+
+    def request(
+        self, upstream: str, method: str, path: str, **kwargs
+    ) -> httpx.Response:
+        """Send a request to a registered upstream, retrying transient failures.
+
+        Returns the last response (which may still be an error status) or
+        raises httpx.HTTPError when the upstream could not be reached.
+        """
+        target = self.upstreams[upstream]
+        if not target.breaker.allow():
+            target.count("rejected")
+            UPSTREAM_ERRORS.inc(upstream=upstream, kind="circuit_open")
+            raise CircuitOpenError(f"Circuit open for upstream '{upstream}'")
+
+        # Every outcome is reported, so a half-open trial that raises anything
+        # (not only a transport error) cannot leave the breaker stuck
+        succeeded = False
+        try:
+            with span(f"http.{upstream}"):
+                response = self._send(
+                    target, method, f"{target.base_url}{path}", **kwargs
+                )
+            succeeded = response.status_code not in RETRYABLE_STATUSES
+            return response
+        finally:
+            if succeeded:
+                target.breaker.record_success()
+            else:
+                target.breaker.record_failure()
+
+    def _send(
+        self, target: Upstream, method: str, url: str, **kwargs
+    ) -> httpx.Response:
+        """Send one request with retries and backoff; the caller records the
+        outcome on the circuit breaker
+        """
+        upstream = target.name
+        attempt = 0
+        while True:
+            target.limiter.acquire()
+            target.count("requests")
+            started = time.perf_counter()
+            try:
+                response = self._client.request(method, url, **kwargs)
+                error = None
+            except httpx.TransportError as e:
+                response = None
+                error = e
+            target.observe(time.perf_counter() - started)
+
+            retryable = error is not None or response.status_code in RETRYABLE_STATUSES
+            if not retryable:
+                return response
+
+            target.count("errors")
+            UPSTREAM_ERRORS.inc(
+                upstream=upstream,
+                kind="transport" if error is not None else str(response.status_code),
+            )
+            if attempt >= self.max_retries:
+                if error is not None:
+                    raise error
+                return response
+
+            delay = self._backoff(attempt, response)
+            attempt += 1
+            target.count("retries")
+            logger.warning(
+                f"Retrying {upstream} request in {delay:.2f}s (attempt {attempt}/{self.max_retries}): "
+                f"{error or response.status_code}"
+            )
+            time.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: upstream.stats() for name, upstream in self.upstreams.items()}
+
+    def close(self) -> None:
+        self._client.close()
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        """Full-jitter exponential backoff, honouring a short Retry-After"""
+        if response is not None:
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                return min(float(retry_after), self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
@@ -0,0 +1,272 @@
+import time
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from catalog import EARTH_RADIUS_METERS
+
+# Reversals gaining less than this many meters are not worth another pass
+MIN_GAIN_METERS = 1.0
+
+
+def coordinates_of(place: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+    """(lat, lng) of a place, or None without a location or with the (0, 0)
+    fallback. Raises ValueError for coordinates that are not valid degrees.
+    """
+    coordinates = place.get("coordinates") or {}
+    label = place.get("name") or place.get("id")
+    label = repr(label) if label else "a place"
+    if not isinstance(coordinates, dict):
+        raise ValueError(f"Invalid coordinates for {label}: expected lat and lng")
+    lat, lng = coordinates.get("lat"), coordinates.get("lng")
+    if lat is None or lng is None:
+        return None
+    for value in (lat, lng):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(
+                f"Invalid coordinates for {label}: lat and lng must be numbers"
+            )
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise ValueError(
+            f"Invalid coordinates for {label}: lat must be within [-90, 90] "
+            "and lng within [-180, 180]"
+        )
+    if lat == 0 and lng == 0:
+        return None
+    return float(lat), float(lng)
+
+
+def place_key(place: Dict[str, Any]) -> Hashable:
+    """Identity of a place when merging lists: its id, or without one its
+    name and location
+    """
+    if place.get("id"):
+        return str(place["id"])
+    coordinates = place.get("coordinates") or {}
+    return (
+        str(place.get("name") or ""),
+        coordinates.get("lat"),
+        coordinates.get("lng"),
+    )
+
+
+def _haversine(phi1, lam1, phi2, lam2) -> np.ndarray:
+    """Great-circle distance in meters between radian coordinates (broadcasting)"""
+    a = (
+        np.sin((phi2 - phi1) / 2) ** 2
+        + np.cos(phi1) * np.cos(phi2) * np.sin((lam2 - lam1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_METERS * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def _radians(values) -> np.ndarray:
+    # float32 halves the memory of large matrices and is accurate to about a meter
+    return np.radians(np.asarray(values, dtype=np.float64)).astype(np.float32)
+
+
+def distance_matrix(lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+    """Great-circle distances in meters between every pair of points"""
+    phi, lam = _radians(lats), _radians(lngs)
+    return _haversine(phi[:, None], lam[:, None], phi[None, :], lam[None, :]).astype(
+        np.float32
+    )
+
+
+def distances_from(
+    lat: float, lng: float, lats: np.ndarray, lngs: np.ndarray
+) -> np.ndarray:
+    """Great-circle distances in meters from one point to each of the others"""
+    return _haversine(_radians(lat), _radians(lng), _radians(lats), _radians(lngs))
+
+
+def nearest_neighbor_path(dist: np.ndarray, start: int) -> np.ndarray:
+    """Greedy path from start, always moving to the closest unvisited point"""
+    n = len(dist)
+    path = np.empty(n, dtype=np.int64)
+    visited = np.zeros(n, dtype=bool)
+    current = start
+    for step in range(n):
+        path[step] = current
+        visited[current] = True
+        if step == n - 1:
+            break
+        row = np.where(visited, np.inf, dist[current])
+        current = int(np.argmin(row))
+    return path
+
+
+def two_opt(
+    path: np.ndarray, dist: np.ndarray, fixed_start: bool, deadline: float
+) -> np.ndarray:
+    """Improve an open path by reversing segments until no reversal shortens
+    it or the deadline passes. For each edge all reversals ending anywhere
+    later in the path are scored at once.
+    """
+    path = path.copy()
+    n = len(path)
+    if n < 3:
+        return path
+
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+
+        if not fixed_start:
+            # Reversing a prefix moves the start: drops (j, j+1), adds (0, j+1)
+            c, d = path[1:-1], path[2:]
+            gain = dist[c, d] - dist[path[0], d]
+            k = int(np.argmax(gain))
+            if gain[k] > MIN_GAIN_METERS:
+                path[: k + 2] = path[: k + 2][::-1].copy()
+                improved = True
+
+        for i in range(n - 2):
+            # Reverse path[i+1 : j+1]: drops (i, i+1) and (j, j+1), adds
+            # (i, j) and (i+1, j+1); reversing the tail only drops (i, i+1)
+            a, b = path[i], path[i + 1]
+            c = path[i + 2 :]
+            d = path[i + 3 :]
+            gain = np.empty(len(c), dtype=np.float32)
+            gain[:-1] = dist[a, b] + dist[c[:-1], d] - dist[a, c[:-1]] - dist[b, d]
+            gain[-1] = dist[a, b] - dist[a, c[-1]]
+            k = int(np.argmax(gain))
+            if gain[k] > MIN_GAIN_METERS:
+                j = i + 2 + k
+                path[i + 1 : j + 1] = path[i + 1 : j + 1][::-1].copy()
+                improved = True
+            if time.perf_counter() >= deadline:
+                break
+    return path
+
+
+def cluster_days(
+    lats: np.ndarray, lngs: np.ndarray, days: int, iterations: int = 50
+) -> np.ndarray:
+    """Split points into ``days`` geographic groups with k-means on the unit
+    sphere (so groups across the antimeridian stay together)
+    """
+    phi, lam = np.radians(lats), np.radians(lngs)
+    points = np.column_stack(
+        (np.cos(phi) * np.cos(lam), np.cos(phi) * np.sin(lam), np.sin(phi))
+    )
+    n = len(points)
+    days = min(days, n)
+
+    # k-means++ seeding, deterministic so the same places give the same plan
+    rng = np.random.default_rng(0)
+    centers = [points[rng.integers(n)]]
+    closest = ((points - centers[0]) ** 2).sum(axis=1)
+    for _ in range(1, days):
+        if closest.sum() == 0:
+            centers.append(points[rng.integers(n)])
+            continue
+        centers.append(points[rng.choice(n, p=closest / closest.sum())])
+        closest = np.minimum(closest, ((points - centers[-1]) ** 2).sum(axis=1))
+    centers = np.array(centers)
+
+    labels = np.zeros(n, dtype=np.int64)
+    for iteration in range(iterations):
+        squared = ((points[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+        new_labels = squared.argmin(axis=1)
+        if iteration and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        for day in range(days):
+            members = points[labels == day]
+            if len(members):
+                centers[day] = members.mean(axis=0)
+            else:
+                # An empty day takes the point farthest from its own center
+                farthest = int(squared[np.arange(n), labels].argmax())
+                centers[day] = points[farthest]
+                labels[farthest] = day
+    return labels
+
+
+def plan_itinerary(
+    places: List[Dict[str, Any]],
+    days: int = 1,
+    start: Optional[Tuple[float, float]] = None,
+    time_budget: float = 0.5,
+) -> Dict[str, Any]:
+    """Order places into a short visiting route, optionally split into days.
+
+    Each day is a path starting at the place closest to where the previous
+    day ended (or to start, when given). Places without coordinates are
+    listed under "skipped"; invalid coordinates raise ValueError.
+    """
+    if days < 1:
+        raise ValueError("days must be at least 1")
+    deadline = time.perf_counter() + time_budget
+    located, points, skipped = [], [], []
+    for place in places:
+        point = coordinates_of(place)
+        if point is None:
+            skipped.append({"id": place.get("id"), "name": place.get("name")})
+        else:
+            located.append(place)
+            points.append(point)
+    plan: Dict[str, Any] = {
+        "days": [],
+        "distance_meters": 0,
+        "count": len(located),
+        "skipped": skipped,
+    }
+    if not located:
+        return plan
+
+    lats, lngs = np.array(points, dtype=float).T
+    labels = cluster_days(lats, lngs, days) if days > 1 else np.zeros(len(located), int)
+    groups = [np.flatnonzero(labels == day) for day in range(labels.max() + 1)]
+    groups = [group for group in groups if len(group)]
+    group_centers = np.array(
+        [(lats[group].mean(), lngs[group].mean()) for group in groups]
+    )
+
+    anchor = start
+    if anchor is None:
+        # Start at the edge of the trip rather than in the middle of it
+        first = int(distances_from(lats.mean(), lngs.mean(), lats, lngs).argmax())
+        anchor = (lats[first], lngs[first])
+
+    remaining = list(range(len(groups)))
+    total_size = len(located)
+    for day_number in range(1, len(groups) + 1):
+        # Next day: the group whose center is closest to where we are
+        to_groups = distances_from(
+            anchor[0],
+            anchor[1],
+            group_centers[remaining, 0],
+            group_centers[remaining, 1],
+        )
+        group = groups[remaining.pop(int(to_groups.argmin()))]
+
+        to_places = distances_from(anchor[0], anchor[1], lats[group], lngs[group])
+        first = int(to_places.argmin())
+
+        dist = distance_matrix(lats[group], lngs[group])
+        path = nearest_neighbor_path(dist, first)
+        # Every day gets a share of the remaining time proportional to its size
+        share = len(group) / total_size
+        total_size -= len(group)
+        day_deadline = time.perf_counter() + max(
+            0.0, (deadline - time.perf_counter()) * share
+        )
+        # Without a start point the first day may begin at either end
+        fixed_start = start is not None or day_number > 1
+        path = two_opt(path, dist, fixed_start, day_deadline)
+
+        legs = np.concatenate(([to_places[first]], dist[path[:-1], path[1:]]))
+        if not fixed_start:
+            legs[0] = 0.0
+        stops = []
+        for index, leg in zip(path, legs):
+            stops.append({**located[group[index]], "leg_meters": round(float(leg))})
+        distance = round(float(legs.sum()))
+        plan["days"].append(
+            {"day": day_number, "places": stops, "distance_meters": distance}
+        )
+        plan["distance_meters"] += distance
+        last = group[path[-1]]
+        anchor = (lats[last], lngs[last])
+    return plan
@@ -0,0 +1,364 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import logger
+from metrics import propagate
+
+# Job lifecycle states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+ERROR = "error"
+
+
+class Job:
+    """A single background analysis and the progress events it produced"""
+
+    def __init__(self, video_id: str, key: str, store: Optional["JobStore"] = None):
+        self.id = uuid.uuid4().hex
+        self.video_id = video_id
+        self.key = key
+        self.status = QUEUED
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.events: List[Dict[str, Any]] = []
+        self.result: Optional[List[Dict[str, Any]]] = None
+        self.error: Optional[str] = None
+        self.store = store
+        self._condition = threading.Condition()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, ERROR)
+
+    def emit(self, stage: str, data: Optional[Dict[str, Any]] = None) -> None:
+        """Record a progress event and wake up stream readers"""
+        with self._condition:
+            event = {"id": len(self.events), "stage": stage, **(data or {})}
+            self.events.append(event)
+            if self.store:
+                self.store.add_event(self.id, event)
+            self._condition.notify_all()
+
+    def start(self) -> None:
+        self.status = RUNNING
+        if self.store:
+            self.store.save(self)
+        self.emit(RUNNING)
+
+    def finish(
+        self, result: Optional[List[Dict[str, Any]]] = None, error: Optional[str] = None
+    ) -> None:
+        with self._condition:
+            self.result = result
+            self.error = error
+            self.status = ERROR if error is not None else DONE
+            self.finished_at = time.time()
+            if error is not None:
+                event = {"id": len(self.events), "stage": ERROR, "error": error}
+            else:
+                event = {"id": len(self.events), "stage": DONE, "places": result}
+            self.events.append(event)
+            if self.store:
+                self.store.save(self)
+                self.store.add_event(self.id, event)
+            self._condition.notify_all()
+
+    def wait_for_events(
+        self, after: int, timeout: float
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        """Return events with id >= after, blocking up to timeout for new ones"""
+        with self._condition:
+            if len(self.events) <= after and not self.finished:
+                self._condition.wait(timeout)
+            return self.events[after:], self.finished
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._condition:
+            places_done = sum(1 for event in self.events if event["stage"] == "place")
+            places_total = next(
+                (
+                    event.get("places_found")
+                    for event in reversed(self.events)
+                    if event["stage"] == "ai"
+                ),
+                None,
+            )
+            return {
+                "job_id": self.id,
+                "video_id": self.video_id,
+                "status": self.status,
+                "stage": self.events[-1]["stage"] if self.events else self.status,
+                "places_done": places_done,
+                "places_total": places_total,
+                "places": self.result,
+                "error": self.error,
+            }
+
+
+class StoredJob(Job):
+    """A job read from the shared store, typically running in another worker
+    process; waiting for events polls the store
+    """
+
+    def __init__(self, store: "JobStore", row: Tuple[Any, ...]):
+        super().__init__(row[1], row[2])
+        self.id = row[0]
+        self.reader = store
+        self._apply(row)
+
+    def wait_for_events(
+        self, after: int, timeout: float
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        deadline = time.monotonic() + timeout
+        while True:
+            self.refresh()
+            remaining = deadline - time.monotonic()
+            if len(self.events) > after or self.finished or remaining <= 0:
+                return self.events[after:], self.finished
+            time.sleep(min(self.reader.poll_interval, remaining))
+
+    def refresh(self) -> None:
+        """Load the current status and any new events"""
+        row = self.reader.row(self.id)
+        if row is not None:
+            self._apply(row)
+        self.events.extend(self.reader.events(self.id, len(self.events)))
+
+    def _apply(self, row: Tuple[Any, ...]) -> None:
+        _, _, _, self.status, self.created_at, self.finished_at, result, self.error = (
+            row
+        )
+        self.result = json.loads(result) if result is not None else None
+
+
+class JobStore:
+    """Jobs and their progress events in SQLite, so any worker process can
+    report on a job started by another
+    """
+
+    def __init__(self, db_path: str, poll_interval: float = 0.5):
+        self.db_path = db_path
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                video_id TEXT NOT NULL,
+                key TEXT NOT NULL,
+                status TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                finished_at REAL,
+                result TEXT,
+                error TEXT
+            )""")
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS job_events (
+                job_id TEXT NOT NULL,
+                id INTEGER NOT NULL,
+                event TEXT NOT NULL,
+                PRIMARY KEY (job_id, id)
+            )""")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_jobs_finished_at ON jobs (finished_at)"
+        )
+        self._conn.commit()
+
+    def save(self, job: Job) -> None:
+        self._write(
+            "INSERT OR REPLACE INTO jobs (id, video_id, key, status, created_at, finished_at, result, error) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                job.id,
+                job.video_id,
+                job.key,
+                job.status,
+                job.created_at,
+                job.finished_at,
+                (
+                    json.dumps(job.result, ensure_ascii=False)
+                    if job.result is not None
+                    else None
+                ),
+                job.error,
+            ),
+        )
+
+    def add_event(self, job_id: str, event: Dict[str, Any]) -> None:
+        self._write(
+            "INSERT OR REPLACE INTO job_events (job_id, id, event) VALUES (?, ?, ?)",
+            (job_id, event["id"], json.dumps(event, ensure_ascii=False, default=str)),
+        )
+
+    def row(self, job_id: str) -> Optional[Tuple[Any, ...]]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, video_id, key, status, created_at, finished_at, result, error FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+
+    def load(self, job_id: str) -> Optional[StoredJob]:
+        row = self.row(job_id)
+        if row is None:
+            return None
+        job = StoredJob(self, row)
+        job.events = self.events(job_id, 0)
+        return job
+
+    def events(self, job_id: str, after: int) -> List[Dict[str, Any]]:
+        """Events with id >= after, in order"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT event FROM job_events WHERE job_id = ? AND id >= ? ORDER BY id",
+                (job_id, after),
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def purge(self, finished_before: float) -> int:
+        """Delete jobs finished before the given time; returns how many"""
+        with self._lock:
+            expired = [
+                row[0]
+                for row in self._conn.execute(
+                    "SELECT id FROM jobs WHERE finished_at < ?", (finished_before,)
+                )
+            ]
+            for job_id in expired:
+                self._conn.execute("DELETE FROM job_events WHERE job_id = ?", (job_id,))
+                self._conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+            self._conn.commit()
+        return len(expired)
+
+    def _write(self, sql: str, params: Tuple[Any, ...]) -> None:
+        """Write through to the store; jobs keep running locally if it fails"""
+        with self._lock:
+            try:
+                self._conn.execute(sql, params)
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Could not write job state: {e}")
+
+
+class JobManager:
+    """Runs analyses on a local worker pool and tracks their progress.
+
+    Submitting a key that already has a queued or running job returns that
+    job, so duplicate submissions share one stream of progress events. With
+    a db_path, jobs are also written to a JobStore so that every worker
+    process can serve their status and events.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        retention: float = 3600,
+        db_path: Optional[str] = None,
+        poll_interval: float = 0.5,
+    ):
+        self.retention = retention
+        self.store: Optional[JobStore] = None
+        if db_path:
+            try:
+                self.store = JobStore(db_path, poll_interval)
+            except sqlite3.Error as e:
+                logger.warning(
+                    f"Could not open job database {db_path}: {e} - jobs are per process"
+                )
+        self._purged_at = 0.0
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="job"
+        )
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Job] = {}
+        self._active: Dict[str, Job] = {}
+
+    def submit(
+        self,
+        video_id: str,
+        key: str,
+        fn: Callable[[Callable[[str, Dict[str, Any]], None]], List[Dict[str, Any]]],
+    ) -> Job:
+        """Schedule fn(progress) for key, or return the job already running it"""
+        with self._lock:
+            self._prune()
+            job = self._active.get(key)
+            if job is not None:
+                return job
+
+            job = Job(video_id, key, self.store)
+            self._jobs[job.id] = job
+            self._active[key] = job
+
+        if self.store:
+            self.store.save(job)
+        self._executor.submit(propagate(self._run), job, fn)
+        return job
+
+    def completed(self, video_id: str, key: str, places: List[Dict[str, Any]]) -> Job:
+        """Create an already finished job for a result that needs no work"""
+        job = Job(video_id, key, self.store)
+        if self.store:
+            self.store.save(job)
+        for index, place in enumerate(places):
+            job.emit("place", {"index": index, "total": len(places), "place": place})
+        job.finish(result=places)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """A job of this process, or one started by another worker process"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None and self.store:
+            try:
+                job = self.store.load(job_id)
+            except sqlite3.Error as e:
+                logger.warning(f"Could not load job {job_id}: {e}")
+        return job
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"tracked": len(self._jobs), "active": len(self._active)}
+
+    def _run(self, job: Job, fn) -> None:
+        job.start()
+        try:
+            job.finish(result=fn(job.emit))
+        except Exception as e:
+            logger.error(f"Job {job.id} for video {job.video_id} failed: {e}")
+            job.finish(error=str(e))
+        finally:
+            with self._lock:
+                if self._active.get(job.key) is job:
+                    del self._active[job.key]
+
+    def _prune(self) -> None:
+        """Forget finished jobs older than the retention period"""
+        cutoff = time.time() - self.retention
+        expired = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.finished and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+        # Other processes' finished jobs, at most once a minute
+        if self.store and time.time() - self._purged_at > 60:
+            self._purged_at = time.time()
+            try:
+                self.store.purge(cutoff)
+            except sqlite3.Error as e:
+                logger.warning(f"Could not purge finished jobs: {e}")
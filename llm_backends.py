@@ -0,0 +1,530 @@
+import copy
+import hashlib
+import json
+import os
+import re
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional
+
+from cache import MISSING, PersistentCache
+from extraction import PlaceStreamParser
+from metrics import FALLBACKS, LLM_TOKENS, span
+from normalization import normalize_place_name
+from rate_limit import RateLimiter
+from config import VALID_PLACE_TYPES, logger
+
+# Receive each extracted place / the video's region as soon as it is known
+PlaceCallback = Callable[[Dict[str, Any]], Any]
+RegionCallback = Callable[[Optional[str]], None]
+
+Messages = List[Dict[str, str]]
+
+
+class BackendUnavailable(Exception):
+    """Raised when no configured extraction backend can be used"""
+
+
+def validate_place_type(place: Dict[str, Any]) -> None:
+    """Fall back to "other" for types outside VALID_PLACE_TYPES"""
+    if place.get("type") not in VALID_PLACE_TYPES:
+        place["type"] = "other"
+
+
+def clean_region(region: Any) -> Optional[str]:
+    if not isinstance(region, str) or not region.strip():
+        return None
+    return region
+
+
+def parse_extraction(content: str) -> Dict[str, Any]:
+    """Parse a complete model answer into {"places": [...], "region": ...}"""
+    # Try to clean the content if it has markdown formatting
+    if content.strip().startswith("```json"):
+        content = content.strip()[7:]  # Remove ```json
+    if content.strip().endswith("```"):
+        content = content.strip()[:-3]  # Remove ```
+    content = content.strip()
+
+    analysis = json.loads(content)
+    places = analysis.get("places") or []
+    for place in places:
+        validate_place_type(place)
+    return {"places": places, "region": clean_region(analysis.get("region"))}
+
+
+class ExtractionBackend(ABC):
+    """Turns a transcript (and the prompt built from it) into places"""
+
+    name = "base"
+
+    @property
+    def available(self) -> bool:
+        return True
+
+    @property
+    def fingerprint(self) -> str:
+        """Identifies everything about the backend that shapes its answers"""
+        return self.name
+
+    def prewarm(self) -> None:
+        """Create clients ahead of the first extraction"""
+
+    @abstractmethod
+    def extract(
+        self,
+        transcript: str,
+        messages: Messages,
+        on_place: Optional[PlaceCallback] = None,
+        on_region: Optional[RegionCallback] = None,
+    ) -> Dict[str, Any]:
+        """Return {"places": [...], "region": ...}, calling on_place and
+        on_region as soon as each becomes known. "truncated" is set when the
+        answer was cut short.
+        """
+
+
+class OpenAIBackend(ExtractionBackend):
+    """Chat completions from the OpenAI API, optionally streamed"""
+
+    name = "openai"
+
+    def __init__(
+        self,
+        api_key: Optional[str],
+        model: str,
+        base_url: Optional[str] = None,
+        timeout: float = 120,
+        limiter: Optional[RateLimiter] = None,
+        streaming: bool = True,
+    ):
+        self.model = model
+        self.base_url = base_url
+        self.streaming = streaming
+        self.limiter = limiter or RateLimiter(0)
+        self.api_key = api_key
+        self.timeout = timeout
+        self._client = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        return bool(self.api_key)
+
+    @property
+    def client(self):
+        """OpenAI client, created on first use: importing openai is slow"""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    from openai import OpenAI
+
+                    self._client = OpenAI(
+                        api_key=self.api_key,
+                        base_url=self.base_url,
+                        timeout=self.timeout,
+                    )
+        return self._client
+
+    def prewarm(self) -> None:
+        if self.available:
+            self.client
+
+    @property
+    def fingerprint(self) -> str:
+        if self.base_url:
+            return f"{self.name}:{self.model}@{self.base_url}"
+        return f"{self.name}:{self.model}"
+
+    def extract(
+        self,
+        transcript: str,
+        messages: Messages,
+        on_place: Optional[PlaceCallback] = None,
+        on_region: Optional[RegionCallback] = None,
+    ) -> Dict[str, Any]:
+        if self.streaming:
+            return self._extract_streaming(messages, on_place, on_region)
+
+        self.limiter.acquire()
+        with span("openai"):
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+            )
+        if response.usage:
+            LLM_TOKENS.observe(response.usage.prompt_tokens, kind="prompt")
+            LLM_TOKENS.observe(response.usage.completion_tokens, kind="completion")
+
+        # Log the full response for debugging
+        logger.debug(f"OpenAI response: {response}")
+
+        if not response.choices:
+            raise Exception("No choices in OpenAI response")
+
+        content = response.choices[0].message.content
+
+        if not content:
+            logger.error("Empty content received from OpenAI")
+            raise Exception("No content received from OpenAI")
+
+        logger.debug(f"OpenAI content: {content}")
+
+        try:
+            analysis = parse_extraction(content)
+        except json.JSONDecodeError as e:
+            logger.error(f"Failed to parse OpenAI response: {e}")
+            logger.error(f"Response content: {content}")
+            raise Exception("Invalid response from OpenAI API")
+
+        if on_region and analysis["region"]:
+            on_region(analysis["region"])
+        if on_place:
+            for place in analysis["places"]:
+                on_place(place)
+        return analysis
+
+    def _extract_streaming(
+        self,
+        messages: Messages,
+        on_place: Optional[PlaceCallback] = None,
+        on_region: Optional[RegionCallback] = None,
+    ) -> Dict[str, Any]:
+        """Stream the completion through an incremental JSON parser, handing
+        each place to on_place as soon as its object is complete
+        """
+        parser = PlaceStreamParser()
+        region_reported = False
+
+        self.limiter.acquire()
+        with span("openai"):
+            stream = self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+            for chunk in stream:
+                if chunk.usage:
+                    LLM_TOKENS.observe(chunk.usage.prompt_tokens, kind="prompt")
+                    LLM_TOKENS.observe(chunk.usage.completion_tokens, kind="completion")
+                if not chunk.choices or not chunk.choices[0].delta.content:
+                    continue
+
+                for place in parser.feed(chunk.choices[0].delta.content):
+                    validate_place_type(place)
+                    if on_place:
+                        on_place(place)
+                if not region_reported and "region" in parser.fields:
+                    region_reported = True
+                    if on_region:
+                        on_region(clean_region(parser.fields["region"]))
+
+        if parser.invalid:
+            logger.warning(f"Skipped {parser.invalid} malformed values in the response")
+        analysis = {
+            "places": parser.places,
+            "region": clean_region(parser.fields.get("region")),
+        }
+        if not parser.complete:
+            # Places handed out before the stream broke off are still valid
+            if not parser.places:
+                logger.error("OpenAI response ended before a complete JSON object")
+                raise Exception("Invalid response from OpenAI API")
+            logger.warning(
+                f"OpenAI response was cut short - keeping {len(parser.places)} places"
+            )
+            analysis["truncated"] = True
+        return analysis
+
+
+class LocalBackend(OpenAIBackend):
+    """A local server speaking the OpenAI chat completions API
+    (llama.cpp, Ollama, vLLM, ...)
+    """
+
+    name = "local"
+
+    def __init__(self, base_url: Optional[str], model: str, api_key: str, **kwargs):
+        super().__init__(api_key if base_url else None, model, base_url, **kwargs)
+
+
+# Words that mark a capitalized span as a place, with the place type they imply
+KEYWORD_TYPES = {
+    **dict.fromkeys(
+        "lake lago lac see jezioro loch lagoon".split(),
+        "lake",
+    ),
+    **dict.fromkeys(
+        "mount mt monte mountain mountains alps peak pass glacier valley "
+        "volcano góra gory góry dolomites".split(),
+        "mountains",
+    ),
+    **dict.fromkeys(
+        "park gardens garden forest reserve canyon gorge waterfall falls".split(),
+        "park",
+    ),
+    **dict.fromkeys(
+        "beach bay coast sea island islands cove riviera cape harbour harbor "
+        "spiaggia plaża morze".split(),
+        "sea",
+    ),
+    **dict.fromkeys(
+        "cathedral basilica church chapel castle palace palazzo tower fountain "
+        "bridge monument abbey monastery temple colosseum amphitheatre arena "
+        "museum gallery fort fortress duomo zamek katedra".split(),
+        "monument",
+    ),
+    **dict.fromkeys("city town village".split(), "city"),
+    **dict.fromkeys(
+        "piazza square market street station district quarter".split(),
+        "other",
+    ),
+}
+
+# Lowercase words allowed inside a place name ("Lake of Garda", "Piazza della Signoria")
+NAME_CONNECTORS = frozenset(
+    "of di del della dei degli de la le du des von van da dos das".split()
+)
+# Capitalized at the start of a sentence, but not part of the name
+SPAN_ARTICLES = frozenset("the a an".split())
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_WORD = re.compile(r"[^\W\d_][\w'’-]*")
+
+
+def capitalized_spans(sentence: str) -> List[str]:
+    """Runs of capitalized words, allowing connectors like "of" inside and
+    a trailing lowercase keyword ("Trevi fountain")
+    """
+    spans = []
+    words: List[re.Match] = []
+
+    def flush():
+        while words and words[-1].group().casefold() in NAME_CONNECTORS:
+            words.pop()
+        if words and words[0].group().casefold() in SPAN_ARTICLES:
+            words.pop(0)
+        if words:
+            spans.append(sentence[words[0].start() : words[-1].end()])
+        words.clear()
+
+    for match in _WORD.finditer(sentence):
+        word = match.group()
+        gap = sentence[words[-1].end() : match.start()] if words else " "
+        if words and gap.strip():
+            flush()
+        if word[0].isupper():
+            words.append(match)
+        elif words and word.casefold() in NAME_CONNECTORS:
+            words.append(match)
+        elif (
+            words
+            and word.casefold() in KEYWORD_TYPES
+            and words[-1].group().casefold() not in NAME_CONNECTORS
+        ):
+            words.append(match)
+            flush()
+        else:
+            flush()
+    flush()
+    return spans
+
+
+class RuleBackend(ExtractionBackend):
+    """Deterministic extractor that needs no network.
+
+    Runs of capitalized words are kept when they contain a place keyword
+    ("Lake Como", "Sforza Castle") or appear in the gazetteer. The sentence
+    a place first appears in becomes its description. Recall is far below a
+    language model; it exists so an analysis still returns something when
+    no model can be reached.
+    """
+
+    name = "rules"
+    version = "1"
+
+    def __init__(
+        self, gazetteer: Optional[Dict[str, str]] = None, max_places: int = 50
+    ):
+        self.gazetteer = gazetteer or {}
+        self.max_places = max_places
+
+    @property
+    def fingerprint(self) -> str:
+        return f"{self.name}:{self.version}:{len(self.gazetteer)}"
+
+    @classmethod
+    def from_file(cls, path: Optional[str], **kwargs) -> "RuleBackend":
+        """Load a gazetteer of "name<TAB>type" lines, if the file exists"""
+        gazetteer = {}
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    name, _, place_type = line.rstrip("\n").partition("\t")
+                    key = normalize_place_name(name)
+                    if key:
+                        gazetteer[key] = place_type.strip() or "other"
+            logger.info(f"📖 Loaded {len(gazetteer)} gazetteer names from {path}")
+        return cls(gazetteer, **kwargs)
+
+    def extract(
+        self,
+        transcript: str,
+        messages: Messages,
+        on_place: Optional[PlaceCallback] = None,
+        on_region: Optional[RegionCallback] = None,
+    ) -> Dict[str, Any]:
+        places: List[Dict[str, Any]] = []
+        seen = set()
+        for sentence in _SENTENCE_END.split(transcript):
+            for name in capitalized_spans(sentence):
+                place_type = self._place_type(name)
+                if place_type is None:
+                    continue
+                key = normalize_place_name(name)
+                if key in seen:
+                    continue
+                seen.add(key)
+                place = {
+                    "name": name,
+                    "description": sentence.strip()[:300],
+                    "type": place_type,
+                }
+                validate_place_type(place)
+                places.append(place)
+                if on_place:
+                    on_place(place)
+                if len(places) >= self.max_places:
+                    break
+            if len(places) >= self.max_places:
+                break
+
+        # Keywords say nothing reliable about the region a video is about
+        return {"places": places, "region": None}
+
+    def _place_type(self, name: str) -> Optional[str]:
+        key = normalize_place_name(name)
+        if key in self.gazetteer:
+            return self.gazetteer[key]
+        words = key.split()
+        if len(words) < 2:
+            return None
+        for word in words:
+            if word in KEYWORD_TYPES:
+                return KEYWORD_TYPES[word]
+        return None
+
+
+class CachedBackend(ExtractionBackend):
+    """Caches a backend's answers by a hash of its fingerprint and prompt.
+
+    A cached answer is replayed through on_region/on_place, so streaming
+    callers see the same sequence of events as on a live call.
+    """
+
+    def __init__(self, backend: ExtractionBackend, cache: PersistentCache):
+        self.backend = backend
+        self.cache = cache
+        self.name = backend.name
+
+    @property
+    def available(self) -> bool:
+        return self.backend.available
+
+    @property
+    def fingerprint(self) -> str:
+        return self.backend.fingerprint
+
+    def prewarm(self) -> None:
+        self.backend.prewarm()
+
+    def cache_key(self, transcript: str, messages: Messages) -> str:
+        payload = json.dumps(
+            [self.backend.fingerprint, messages, transcript], ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def extract(
+        self,
+        transcript: str,
+        messages: Messages,
+        on_place: Optional[PlaceCallback] = None,
+        on_region: Optional[RegionCallback] = None,
+    ) -> Dict[str, Any]:
+        key = self.cache_key(transcript, messages)
+        cached = self.cache.get(key)
+        if cached is not MISSING and cached is not None:
+            # Callers annotate the places, so never hand out the cached objects
+            cached = copy.deepcopy(cached)
+            if on_region and cached["region"]:
+                on_region(cached["region"])
+            if on_place:
+                for place in cached["places"]:
+                    on_place(place)
+            return cached
+
+        analysis = self.backend.extract(transcript, messages, on_place, on_region)
+        if not analysis.get("truncated"):
+            self.cache.set(key, copy.deepcopy(analysis))
+        return analysis
+
+
+class BackendChain(ExtractionBackend):
+    """Tries each available backend in order until one succeeds.
+
+    The answer records which backend produced it; "degraded" is set when it
+    did not come from the first configured one.
+    """
+
+    name = "chain"
+
+    def __init__(self, backends: List[ExtractionBackend]):
+        self.backends = backends
+
+    @property
+    def available(self) -> bool:
+        return any(backend.available for backend in self.backends)
+
+    @property
+    def fingerprint(self) -> str:
+        return ",".join(backend.fingerprint for backend in self.backends)
+
+    def prewarm(self) -> None:
+        for backend in self.backends:
+            backend.prewarm()
+
+    def extract(
+        self,
+        transcript: str,
+        messages: Messages,
+        on_place: Optional[PlaceCallback] = None,
+        on_region: Optional[RegionCallback] = None,
+    ) -> Dict[str, Any]:
+        backends = [backend for backend in self.backends if backend.available]
+        if not backends:
+            raise BackendUnavailable("No extraction backend is configured")
+        if backends[0] is not self.backends[0]:
+            # e.g. no OpenAI key: every answer comes from a fallback backend
+            skipped = self.backends[0].name
+            logger.warning(
+                f"Extraction backend '{skipped}' is not configured - "
+                f"using '{backends[0].name}' instead"
+            )
+            FALLBACKS.inc(kind=f"llm_{skipped}_unavailable")
+
+        error: Optional[Exception] = None
+        for position, backend in enumerate(backends):
+            try:
+                analysis = backend.extract(transcript, messages, on_place, on_region)
+            except Exception as e:
+                logger.warning(f"Extraction backend '{backend.name}' failed: {e}")
+                error = e
+                if position + 1 < len(backends):
+                    FALLBACKS.inc(kind=f"llm_{backend.name}_failed")
+                continue
+            analysis = dict(analysis, backend=backend.name)
+            if backend is not self.backends[0]:
+                analysis["degraded"] = True
+            return analysis
+        raise error
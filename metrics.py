@@ -0,0 +1,343 @@
+import contextvars
+import functools
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from config import logger, TRACE_RETENTION, TRACE_SLOW_SECONDS
+
+# Prefix for every exported metric name
+NAMESPACE = "trip_advisor"
+
+# Latency buckets (seconds) from cache hits up to slow LLM calls
+LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    30,
+    60,
+)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+# Spans kept per trace; long batch requests stop recording after this many
+MAX_TRACE_SPANS = 1000
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+            for key, value in values
+        ]
+
+
+class Gauge:
+    """Value read from a callback at scrape time"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, read: Callable[[], float]):
+        self.name = name
+        self.documentation = documentation
+        self.read = read
+
+    def samples(self) -> List[str]:
+        try:
+            return [f"{self.name} {self.read()}"]
+        except Exception as e:
+            logger.warning(f"Could not read gauge {self.name}: {e}")
+            return []
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+        labelnames: Sequence[str] = (),
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self.labelnames = tuple(labelnames)
+        # Per label set: [count per bucket (+Inf last), sum]
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            entry[0][index] += 1
+            entry[1][0] += value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(
+                (key, list(counts), total[0])
+                for key, (counts, total) in self._values.items()
+            )
+
+        lines = []
+        for key, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                labels = _format_labels(self.labelnames, key, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {round(total, 6)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def counter(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Counter:
+        return self._add(Counter(f"{NAMESPACE}_{name}", documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+        labelnames: Sequence[str] = (),
+    ) -> Histogram:
+        return self._add(
+            Histogram(f"{NAMESPACE}_{name}", documentation, buckets, labelnames)
+        )
+
+    def gauge(self, name: str, documentation: str, read: Callable[[], float]) -> Gauge:
+        return self._add(Gauge(f"{NAMESPACE}_{name}", documentation, read))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+    def _add(self, metric):
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+
+registry = Registry()
+
+STAGE_SECONDS = registry.histogram(
+    "span_seconds",
+    "Duration of pipeline stages and outbound calls",
+    labelnames=("span", "outcome"),
+)
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "http_request_seconds",
+    "Duration of requests served by the app",
+    labelnames=("endpoint", "status"),
+)
+LLM_TOKENS = registry.histogram(
+    "llm_tokens",
+    "Tokens used per LLM call",
+    buckets=TOKEN_BUCKETS,
+    labelnames=("kind",),
+)
+CACHE_LOOKUPS = registry.counter(
+    "cache_lookups_total",
+    "Cache lookups by cache and result (hit, negative_hit, miss)",
+    labelnames=("cache", "result"),
+)
+FALLBACKS = registry.counter(
+    "fallbacks_total",
+    "Degraded results served instead of failing",
+    labelnames=("kind",),
+)
+PLACES_MERGED = registry.counter(
+    "places_merged_total",
+    "Duplicate places merged, by stage (names before enrichment, map after it)",
+    labelnames=("stage",),
+)
+UPSTREAM_ERRORS = registry.counter(
+    "upstream_errors_total",
+    "Failed outbound calls by upstream and kind (status code, transport, circuit_open)",
+    labelnames=("upstream", "kind"),
+)
+PREFILTER_KEPT_RATIO = registry.histogram(
+    "prefilter_kept_ratio",
+    "Share of transcript characters the prefilter passes to the model",
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.8, 1.0),
+)
+PREFILTER_CHARS = registry.counter(
+    "prefilter_chars_total",
+    "Transcript characters before (input) and after (kept) the prefilter",
+    labelnames=("stage",),
+)
+REQUESTS_SHED = registry.counter(
+    "requests_shed_total",
+    "Analyses rejected or deferred by admission control, by priority class",
+    labelnames=("priority",),
+)
+
+
+class Trace:
+    """Spans recorded while serving one request"""
+
+    def __init__(self, trace_id: Optional[str] = None):
+        self.id = trace_id or uuid.uuid4().hex[:16]
+        self.started = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.spans: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def add(self, name: str, started: float, duration: float, outcome: str) -> None:
+        with self._lock:
+            if len(self.spans) >= MAX_TRACE_SPANS:
+                return
+            self.spans.append(
+                {
+                    "name": name,
+                    "start_ms": round((started - self.started) * 1000, 1),
+                    "duration_ms": round(duration * 1000, 1),
+                    "outcome": outcome,
+                }
+            )
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s["start_ms"])
+        return {
+            "trace_id": self.id,
+            "duration_ms": (
+                round(self.duration * 1000, 1) if self.duration is not None else None
+            ),
+            "spans": spans,
+        }
+
+
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar(
+    "trace", default=None
+)
+_recent_traces: "OrderedDict[str, Trace]" = OrderedDict()
+_traces_lock = threading.Lock()
+
+
+def start_trace(trace_id: Optional[str] = None) -> Tuple[Trace, contextvars.Token]:
+    trace = Trace(trace_id)
+    with _traces_lock:
+        _recent_traces[trace.id] = trace
+        while len(_recent_traces) > TRACE_RETENTION:
+            _recent_traces.popitem(last=False)
+    return trace, _current_trace.set(trace)
+
+
+def finish_trace(trace: Trace, token: contextvars.Token) -> None:
+    trace.duration = time.perf_counter() - trace.started
+    _current_trace.reset(token)
+    if TRACE_SLOW_SECONDS and trace.duration >= TRACE_SLOW_SECONDS:
+        slowest = sorted(trace.spans, key=lambda s: -s["duration_ms"])[:5]
+        breakdown = ", ".join(f"{s['name']}={s['duration_ms']}ms" for s in slowest)
+        logger.warning(
+            f"🐢 Slow request {trace.id}: {trace.duration:.2f}s ({breakdown})"
+        )
+
+
+def current_trace_id() -> Optional[str]:
+    trace = _current_trace.get()
+    return trace.id if trace else None
+
+
+def get_trace(trace_id: str) -> Optional[Trace]:
+    with _traces_lock:
+        return _recent_traces.get(trace_id)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time a block into the span histogram and the current request's trace"""
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        duration = time.perf_counter() - started
+        STAGE_SECONDS.observe(duration, span=name, outcome=outcome)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add(name, started, duration, outcome)
+
+
+def propagate(fn: Callable) -> Callable:
+    """Bind fn to the caller's context so spans recorded on worker threads
+    land in the caller's trace. Wrap once per submitted task: a context can
+    only be entered by one thread at a time.
+    """
+    context = contextvars.copy_context()
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        return context.run(fn, *args, **kwargs)
+
+    return wrapper
@@ -1,14 +1,17 @@
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 
-@dataclass
+@dataclass(slots=True)
 class Coordinates:
     lat: float
     lng: float
 
+    def to_dict(self) -> Dict[str, Any]:
+        return {"lat": self.lat, "lng": self.lng}
 
-@dataclass
+
+@dataclass(slots=True)
 class Place:
     id: str
     name: str
@@ -21,9 +24,50 @@ class Place:
     photo_url: Optional[str] = None
     photos: Optional[List[str]] = None
     website: Optional[str] = None
+    timestamp: Optional[float] = None  # Seconds into the video of the first mention
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-ready dict; unlike dataclasses.asdict it does not deep-copy
+        (the photos list is shared with the Place)
+        """
+        return {
+            "id": self.id,
+            "name": self.name,
+            "description": self.description,
+            "type": self.type,
+            "coordinates": self.coordinates.to_dict(),
+            "google_place_id": self.google_place_id,
+            "address": self.address,
+            "rating": self.rating,
+            "photo_url": self.photo_url,
+            "photos": self.photos,
+            "website": self.website,
+            "timestamp": self.timestamp,
+        }
+
+
+@dataclass(slots=True)
+class TranscriptSegment:
+    text: str
+    start: float
+    duration: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"text": self.text, "start": self.start, "duration": self.duration}
+
+
+@dataclass(slots=True)
+class Transcript:
+    video_id: str
+    language: str
+    segments: List[TranscriptSegment]
+
+    @property
+    def text(self) -> str:
+        return " ".join(segment.text for segment in self.segments)
 
 
-@dataclass
+@dataclass(slots=True)
 class YouTubeVideo:
     id: str
     title: str
@@ -31,7 +75,7 @@ class YouTubeVideo:
     transcript: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class AnalysisResult:
     places: List[Place]
     summary: str
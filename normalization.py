@@ -0,0 +1,211 @@
+import re
+import unicodedata
+from difflib import SequenceMatcher
+from typing import Any, Dict, Iterable, List, Optional
+
+from catalog import haversine_meters
+from models import Place
+
+# Articles dropped from the start of a name ("the Colosseum", "La Sagrada Familia")
+LEADING_ARTICLES = frozenset(
+    "the a an il lo la i gli le l el los las der die das les".split()
+)
+
+# Words that only say what kind of place a name is ("Wawel Castle" and
+# "Wawel"); any other extra word can name a different place ("New York" and
+# "York"), so names differing by one are left to collapse_places, which
+# also compares coordinates and Google place ids
+GENERIC_NAME_WORDS = frozenset("""
+    the of and de di del della du des da do
+    abbey basilica beach bridge castle cathedral chapel church city fort
+    fortress gallery garden gardens island lake monastery monument mount
+    mountain mountains mt museum national old palace park peak square
+    temple tower valley waterfall zamek
+    """.split())
+
+# Name similarity that is enough for two places within the collapse radius
+NEARBY_NAME_RATIO = 0.6
+
+_APOSTROPHES = re.compile(r"['’`´]")
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_place_name(name: str) -> str:
+    """Comparison key for a place name: accents stripped, casefolded,
+    punctuation removed and a leading article dropped
+    """
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    text = _APOSTROPHES.sub("", stripped.casefold().replace("&", " and "))
+    tokens = _NON_ALNUM.sub(" ", text).split()
+    if len(tokens) > 1 and tokens[0] in LEADING_ARTICLES:
+        tokens = tokens[1:]
+    return " ".join(tokens)
+
+
+def _types_compatible(a: Optional[str], b: Optional[str], strict: bool) -> bool:
+    if a == b:
+        return True
+    return not strict and "other" in (a or "other", b or "other")
+
+
+def names_match(
+    a: str,
+    b: str,
+    type_a: Optional[str],
+    type_b: Optional[str],
+    fuzzy_threshold: float,
+) -> bool:
+    """Whether two normalized names most likely refer to the same place.
+
+    One name containing every word of the other plus only generic words
+    ("Wawel Castle" and "Wawel") matches for places of the same type, so a
+    city is not merged into a landmark named after it. Near-identical
+    spellings ("Colloseum") match unless the types clearly differ.
+    """
+    if a == b:
+        return True
+    if not a or not b:
+        return False
+
+    tokens_a, tokens_b = set(a.split()), set(b.split())
+    if (
+        (tokens_a <= tokens_b or tokens_b <= tokens_a)
+        and (tokens_a ^ tokens_b) <= GENERIC_NAME_WORDS
+        and _types_compatible(type_a, type_b, strict=True)
+    ):
+        return True
+
+    if not _types_compatible(type_a, type_b, strict=False):
+        return False
+    matcher = SequenceMatcher(None, a, b, autojunk=False)
+    return (
+        matcher.real_quick_ratio() >= fuzzy_threshold
+        and matcher.quick_ratio() >= fuzzy_threshold
+        and matcher.ratio() >= fuzzy_threshold
+    )
+
+
+def _related_names(
+    a: str, b: str, type_a: Optional[str], type_b: Optional[str]
+) -> bool:
+    """Looser name check for places already known to be a few meters apart"""
+    if not _types_compatible(type_a, type_b, strict=False):
+        return False
+    if set(a.split()) & set(b.split()):
+        return True
+    return SequenceMatcher(None, a, b, autojunk=False).ratio() >= NEARBY_NAME_RATIO
+
+
+def dedupe_places(
+    places: Iterable[Dict[str, Any]], fuzzy_threshold: float
+) -> List[Dict[str, Any]]:
+    """Merge extracted places that name the same place.
+
+    The first occurrence keeps its position and name; the richer (longer)
+    description and a specific type win over "other".
+    """
+    merged: List[Dict[str, Any]] = []
+    keys: List[str] = []
+    by_key: Dict[str, Dict[str, Any]] = {}
+    for place in places:
+        name = place.get("name")
+        if not name:
+            continue
+        key = normalize_place_name(name)
+        existing = by_key.get(key)
+        if existing is None:
+            for other_key, other in zip(keys, merged):
+                if names_match(
+                    key,
+                    other_key,
+                    place.get("type"),
+                    other.get("type"),
+                    fuzzy_threshold,
+                ):
+                    existing = other
+                    break
+        if existing is None:
+            existing = dict(place)
+            merged.append(existing)
+            keys.append(key)
+            by_key[key] = existing
+            continue
+
+        by_key.setdefault(key, existing)
+        description = place.get("description") or ""
+        if len(description) > len(existing.get("description") or ""):
+            existing["description"] = description
+
+        place_type = place.get("type")
+        if existing.get("type") in (None, "other") and place_type not in (
+            None,
+            "other",
+        ):
+            existing["type"] = place_type
+
+    return merged
+
+
+def _merge_into(kept: Place, duplicate: Place) -> None:
+    if len(duplicate.description or "") > len(kept.description or ""):
+        kept.description = duplicate.description
+    if kept.type == "other" and duplicate.type != "other":
+        kept.type = duplicate.type
+    if duplicate.timestamp is not None and (
+        kept.timestamp is None or duplicate.timestamp < kept.timestamp
+    ):
+        kept.timestamp = duplicate.timestamp
+    for field in ("google_place_id", "address", "rating", "website"):
+        if getattr(kept, field) is None:
+            setattr(kept, field, getattr(duplicate, field))
+    if not kept.photos and duplicate.photos:
+        kept.photos = duplicate.photos
+        kept.photo_url = duplicate.photo_url
+
+
+def collapse_places(places: List[Place], radius_meters: float) -> List[Place]:
+    """Merge enriched places that turned out to be the same place on the map.
+
+    Places sharing a google_place_id are always merged. Places within
+    radius_meters of each other are merged when their names are related and
+    their types compatible (0 disables the radius check). Places without
+    coordinates are only merged by google_place_id.
+    """
+    kept: List[Place] = []
+    keys: List[str] = []
+    by_google_id: Dict[str, Place] = {}
+    for place in places:
+        existing = (
+            by_google_id.get(place.google_place_id) if place.google_place_id else None
+        )
+        located = place.coordinates.lat != 0 or place.coordinates.lng != 0
+        key = normalize_place_name(place.name)
+        if existing is None and located and radius_meters > 0:
+            for other_key, other in zip(keys, kept):
+                if (
+                    (other.coordinates.lat != 0 or other.coordinates.lng != 0)
+                    and haversine_meters(
+                        place.coordinates.lat,
+                        place.coordinates.lng,
+                        other.coordinates.lat,
+                        other.coordinates.lng,
+                    )
+                    <= radius_meters
+                    and _related_names(key, other_key, place.type, other.type)
+                ):
+                    existing = other
+                    break
+
+        if existing is None:
+            kept.append(place)
+            keys.append(key)
+            if place.google_place_id:
+                by_google_id[place.google_place_id] = place
+            continue
+
+        _merge_into(existing, place)
+        if existing.google_place_id:
+            by_google_id.setdefault(existing.google_place_id, existing)
+
+    return kept
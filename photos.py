@@ -0,0 +1,306 @@
+import hashlib
+import io
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import logger
+from metrics import CACHE_LOOKUPS
+from singleflight import SingleFlight
+
+try:
+    from PIL import Image
+
+    PILLOW_AVAILABLE = True
+except ImportError:
+    PILLOW_AVAILABLE = False
+
+# Route serving cached photos to the browser
+PHOTO_ROUTE = "/api/photos"
+
+# Places API (New) photo resource names: places/<place id>/photos/<reference>
+PHOTO_NAME = re.compile(r"^places/[A-Za-z0-9_-]+/photos/[A-Za-z0-9_-]+$")
+
+# Media URLs stored before the proxy existed, with the API key in the query
+_UPSTREAM_PHOTO_URL = re.compile(
+    r"/v1/(places/[A-Za-z0-9_-]+/photos/[A-Za-z0-9_-]+)/media\?(?:[^#]*&)?maxWidthPx=(\d+)"
+)
+
+_IMAGE_SIGNATURES = [
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF8", "image/gif"),
+]
+
+# Served photos are touched at most this often to keep eviction LRU-like
+_TOUCH_INTERVAL = 3600
+
+# Downloads a photo at a width; None when upstream does not have it
+PhotoFetcher = Callable[[str, int], Optional[bytes]]
+
+
+def photo_url(photo_name: str, width: int) -> str:
+    """Proxy URL of a photo; the browser never sees the upstream URL or key"""
+    return f"{PHOTO_ROUTE}/{photo_name}?w={width}"
+
+
+def proxy_photo_url(url: Optional[str]) -> Optional[str]:
+    """Rewrite an upstream media URL (which carries the API key) into its proxy URL"""
+    if not url:
+        return url
+    match = _UPSTREAM_PHOTO_URL.search(url)
+    if not match:
+        return url
+    return photo_url(match.group(1), int(match.group(2)))
+
+
+def image_type(data: bytes) -> Optional[str]:
+    """Content type of an image from its first bytes"""
+    for signature, mimetype in _IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return mimetype
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+@dataclass(slots=True)
+class StoredPhoto:
+    path: str
+    mimetype: str
+    size: int
+    etag: str
+
+
+class PhotoStore:
+    """Size-bounded disk cache of place photos, one file per photo and width.
+
+    Each photo is fetched from upstream once; concurrent requests share the
+    fetch. With Pillow installed only the largest width is downloaded and the
+    smaller ones are resized from it, otherwise each width is downloaded once.
+    The least recently served files are evicted beyond max_bytes.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        fetch: PhotoFetcher,
+        widths: List[int],
+        max_bytes: int = 512 * 1024 * 1024,
+        negative_ttl: float = 3600,
+        max_negative_entries: int = 4096,
+    ):
+        self.directory = directory
+        self.fetch = fetch
+        self.widths = sorted(widths)
+        self.max_bytes = max_bytes
+        self.negative_ttl = negative_ttl
+        self.max_negative_entries = max_negative_entries
+        self._flight = SingleFlight()
+        self._lock = threading.Lock()
+        # Photos upstream reported missing (references expire), until when
+        self._missing: "OrderedDict[str, float]" = OrderedDict()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "negative_hits": 0,
+            "fetches": 0,
+            "resized": 0,
+            "evictions": 0,
+        }
+        os.makedirs(directory, exist_ok=True)
+        self._bytes = sum(size for _, size, _ in self._scan())
+
+    def width_for(self, requested: Optional[int]) -> int:
+        """Smallest configured width at least as wide as requested"""
+        if requested is None:
+            return self.widths[len(self.widths) // 2]
+        for width in self.widths:
+            if width >= requested:
+                return width
+        return self.widths[-1]
+
+    def get(self, photo_name: str, width: int) -> Optional[StoredPhoto]:
+        """Return the cached photo, fetching it on a miss; None when it does not exist.
+
+        Raises whatever the fetcher raises when upstream is unavailable.
+        """
+        stored = self._stored(photo_name, width)
+        if stored is not None:
+            with self._lock:
+                self._stats["hits"] += 1
+            CACHE_LOOKUPS.inc(cache="photos", result="hit")
+            return stored
+
+        with self._lock:
+            missing_until = self._missing.get(photo_name)
+            if missing_until is not None and missing_until > time.time():
+                self._stats["negative_hits"] += 1
+                CACHE_LOOKUPS.inc(cache="photos", result="negative_hit")
+                return None
+            self._stats["misses"] += 1
+        CACHE_LOOKUPS.inc(cache="photos", result="miss")
+        return self._flight.do(f"{photo_name}:{width}", self._fill, photo_name, width)
+
+    def clear(self) -> None:
+        """Remove all cached photos"""
+        for path, _, _ in self._scan():
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.warning(f"Could not remove photo {path}: {e}")
+        with self._lock:
+            self._missing.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["bytes"] = self._bytes
+        stats["max_bytes"] = self.max_bytes
+        return stats
+
+    def _path(self, photo_name: str, width: int) -> str:
+        digest = hashlib.sha256(photo_name.encode()).hexdigest()[:32]
+        return os.path.join(self.directory, f"{digest}_{width}")
+
+    def _stored(self, photo_name: str, width: int) -> Optional[StoredPhoto]:
+        path = self._path(photo_name, width)
+        try:
+            stat = os.stat(path)
+            with open(path, "rb") as f:
+                mimetype = image_type(f.read(12))
+            if time.time() - stat.st_mtime > _TOUCH_INTERVAL:
+                os.utime(path)
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning(f"Could not read cached photo {path}: {e}")
+            return None
+        return StoredPhoto(
+            path=path,
+            mimetype=mimetype or "application/octet-stream",
+            size=stat.st_size,
+            etag=f"{os.path.basename(path)}-{stat.st_size}",
+        )
+
+    def _fill(self, photo_name: str, width: int) -> Optional[StoredPhoto]:
+        """Fetch or derive one photo variant and store it"""
+        # Another process may have stored it meanwhile
+        stored = self._stored(photo_name, width)
+        if stored is not None:
+            return stored
+
+        data = None
+        largest = self.widths[-1]
+        if PILLOW_AVAILABLE and width < largest:
+            source = self.get(photo_name, largest)
+            if source is None:
+                return None
+            data = self._resize(source.path, width)
+
+        if data is None:
+            with self._lock:
+                self._stats["fetches"] += 1
+            data = self.fetch(photo_name, width)
+            if data is None:
+                self._remember_missing(photo_name)
+                return None
+        else:
+            with self._lock:
+                self._stats["resized"] += 1
+
+        if image_type(data) is None:
+            logger.warning(f"Upstream returned a non-image photo for '{photo_name}'")
+            return None
+
+        self._write(self._path(photo_name, width), data)
+        return self._stored(photo_name, width)
+
+    def _resize(self, source_path: str, width: int) -> Optional[bytes]:
+        try:
+            with Image.open(source_path) as image:
+                if image.width <= width:
+                    # Never upscale: the original is already small enough
+                    with open(source_path, "rb") as f:
+                        return f.read()
+                height = max(1, round(image.height * width / image.width))
+                resized = image.resize((width, height), Image.LANCZOS)
+                output = io.BytesIO()
+                resized.save(
+                    output,
+                    format=image.format or "JPEG",
+                    quality=85,
+                    optimize=True,
+                )
+                return output.getvalue()
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not resize photo {source_path}: {e}")
+            return None
+
+    def _write(self, path: str, data: bytes) -> None:
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            # A file being replaced (refetched by another process) is not counted twice
+            try:
+                replaced = os.stat(path).st_size
+            except FileNotFoundError:
+                replaced = 0
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not store photo {path}: {e}")
+            return
+
+        with self._lock:
+            self._bytes += len(data) - replaced
+            over_budget = self._bytes > self.max_bytes
+        if over_budget:
+            self._evict()
+
+    def _evict(self) -> None:
+        """Remove the least recently served photos down to 90% of max_bytes"""
+        entries = sorted(self._scan(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        evicted = 0
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            evicted += 1
+        with self._lock:
+            self._bytes = total
+            self._stats["evictions"] += evicted
+        if evicted:
+            logger.info(f"🧹 Evicted {evicted} cached photos")
+
+    def _scan(self) -> List[Tuple[str, int, float]]:
+        """(path, size, mtime) of every stored photo"""
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(".tmp") or not entry.is_file():
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((entry.path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def _remember_missing(self, photo_name: str) -> None:
+        with self._lock:
+            self._missing[photo_name] = time.time() + self.negative_ttl
+            self._missing.move_to_end(photo_name)
+            while len(self._missing) > self.max_negative_entries:
+                self._missing.popitem(last=False)
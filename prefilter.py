@@ -0,0 +1,147 @@
+import re
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from extraction import estimate_tokens
+from llm_backends import KEYWORD_TYPES, capitalized_spans
+from config import VALID_PLACE_TYPES
+
+# Sentence ends in punctuated transcripts (and video descriptions)
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+_WORD = re.compile(r"[^\W\d_][\w'’-]*")
+
+# Place vocabulary: type keywords plus the type names themselves
+PLACE_WORDS = frozenset(KEYWORD_TYPES) | frozenset(VALID_PLACE_TYPES) - {"other"}
+
+# Placed between passages that were not adjacent in the transcript
+PASSAGE_SEPARATOR = "\n…\n"
+
+# Sentences scoring at least this (a keyword plus a name, or a name the
+# gazetteer knows) also keep their neighbours; weaker hits are kept alone
+STRONG_SCORE = 2
+
+# Caption tags such as "[Music]" are capitalized even in uncased captions
+_CAPTION_TAG = re.compile(r"\[[^\]]*\]")
+
+# Below this share of capitalized words (not counting sentence starts) the
+# transcript is an uncased auto-caption and spans say nothing
+MIN_CAPITALIZED_SHARE = 0.002
+
+
+@dataclass(slots=True)
+class Prefiltered:
+    text: str
+    sentences: int
+    kept_sentences: int
+    original_chars: int
+    kept_chars: int
+
+    @property
+    def kept_ratio(self) -> float:
+        return self.kept_chars / self.original_chars if self.original_chars else 1.0
+
+
+def split_sentences(text: str, max_words: int = 40) -> List[str]:
+    """Split text into sentences; unpunctuated runs (auto-captions) are cut
+    every max_words words
+    """
+    sentences = []
+    for sentence in _SENTENCE_END.split(text):
+        words = sentence.split()
+        for start in range(0, len(words), max_words):
+            sentences.append(" ".join(words[start : start + max_words]))
+    return sentences
+
+
+class Prefilter:
+    """Keeps only the passages of a transcript that may mention places.
+
+    A sentence is a candidate when it contains a place keyword ("lake",
+    "castle", a VALID_PLACE_TYPES name), a capitalized span that is not just
+    its first word, or a name the gazetteer knows. Strong candidates are kept
+    with ``context`` sentences on each side, weak ones alone; everything else
+    is dropped before the transcript reaches the model. Short or uncased
+    transcripts are kept whole.
+    """
+
+    def __init__(
+        self,
+        context: int = 1,
+        min_tokens: int = 1500,
+        max_sentence_words: int = 40,
+        known_name: Optional[Callable[[str], bool]] = None,
+    ):
+        self.context = context
+        self.min_tokens = min_tokens
+        self.max_sentence_words = max_sentence_words
+        self.known_name = known_name
+
+    def apply(self, transcript: str) -> Prefiltered:
+        sentences = split_sentences(transcript, self.max_sentence_words)
+        unchanged = Prefiltered(
+            text=transcript,
+            sentences=len(sentences),
+            kept_sentences=len(sentences),
+            original_chars=len(transcript),
+            kept_chars=len(transcript),
+        )
+        if estimate_tokens(transcript) < self.min_tokens or not self._cased(sentences):
+            return unchanged
+
+        scores = [self.score(sentence) for sentence in sentences]
+        if not any(scores):
+            # Nothing looks like a place: let the model judge the whole text
+            return unchanged
+
+        keep = [False] * len(sentences)
+        for i, score in enumerate(scores):
+            if not score:
+                continue
+            context = self.context if score >= STRONG_SCORE else 0
+            for j in range(max(0, i - context), min(len(sentences), i + context + 1)):
+                keep[j] = True
+
+        passages: List[List[str]] = []
+        for i, sentence in enumerate(sentences):
+            if not keep[i]:
+                continue
+            if i == 0 or not keep[i - 1]:
+                passages.append([])
+            passages[-1].append(sentence)
+        text = PASSAGE_SEPARATOR.join(" ".join(passage) for passage in passages)
+        return Prefiltered(
+            text=text,
+            sentences=len(sentences),
+            kept_sentences=sum(keep),
+            original_chars=len(transcript),
+            kept_chars=len(text),
+        )
+
+    def score(self, sentence: str) -> int:
+        """Evidence that a sentence mentions a place (0 = none)"""
+        score = sum(
+            1 for word in _WORD.findall(sentence) if word.casefold() in PLACE_WORDS
+        )
+        first_word = _WORD.search(sentence)
+        for span in capitalized_spans(sentence):
+            words = span.split()
+            if len(words) == 1 and (
+                len(span) < 2 or (first_word and span == first_word.group())
+            ):
+                # "I", or a word capitalized only because it starts the sentence
+                continue
+            score += 1
+            if self.known_name and self.known_name(span):
+                score += 2
+        return score
+
+    @staticmethod
+    def _cased(sentences: List[str]) -> bool:
+        words = capitalized = 0
+        for sentence in sentences:
+            sentence_words = _WORD.findall(_CAPTION_TAG.sub(" ", sentence))[1:]
+            words += len(sentence_words)
+            capitalized += sum(
+                1 for word in sentence_words if word[0].isupper() and len(word) > 1
+            )
+        return not words or capitalized / words >= MIN_CAPITALIZED_SHARE
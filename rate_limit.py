@@ -0,0 +1,48 @@
+import threading
+import time
+from typing import Dict
+
+
+class RateLimiter:
+    """Thread-safe token bucket: ``rate`` requests per second with bursts of
+    up to ``burst``. A rate of 0 disables limiting.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._waited = 0.0
+        self._acquired = 0
+
+    def acquire(self) -> float:
+        """Block until a request may be sent, returning the time spent waiting"""
+        if self.rate <= 0:
+            return 0.0
+
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.burst, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    self._acquired += 1
+                    self._waited += waited
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "rate_per_second": self.rate,
+                "acquired": self._acquired,
+                "waited_seconds": round(self._waited, 3),
+            }
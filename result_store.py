@@ -0,0 +1,156 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from config import logger
+from metrics import CACHE_LOOKUPS
+
+
+@dataclass
+class StoredResult:
+    video_id: str
+    places: List[Dict[str, Any]]
+    created_at: float
+    stale: bool
+
+
+class ResultStore:
+    """Size-bounded store of finished analyses with stale-while-revalidate.
+
+    Entries are keyed by video_id plus a pipeline fingerprint, so changing the
+    prompt or model never serves results produced by an older pipeline. An
+    entry younger than ``ttl`` is fresh; until ``ttl + stale_ttl`` it is still
+    served but marked stale so the caller can refresh it in the background.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        ttl: float = 24 * 3600,
+        stale_ttl: float = 7 * 24 * 3600,
+        max_entries: int = 1000,
+    ):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._refresh_executor = ThreadPoolExecutor(
+            max_workers=2, thread_name_prefix="revalidate"
+        )
+        self._stats = {"fresh_hits": 0, "stale_hits": 0, "misses": 0, "evictions": 0}
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS analysis_results (
+                key TEXT PRIMARY KEY,
+                video_id TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )""")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_analysis_results_accessed ON analysis_results (accessed_at)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def key_for(video_id: str, pipeline_version: str) -> str:
+        """Content address of an analysis result"""
+        return hashlib.sha256(f"{video_id}:{pipeline_version}".encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[StoredResult]:
+        """Return the stored result, or None when missing or expired"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT video_id, payload, created_at FROM analysis_results WHERE key = ?",
+                (key,),
+            ).fetchone()
+
+            if row is None or now - row[2] >= self.ttl + self.stale_ttl:
+                self._stats["misses"] += 1
+                CACHE_LOOKUPS.inc(cache="results", result="miss")
+                return None
+
+            self._conn.execute(
+                "UPDATE analysis_results SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+
+            stale = now - row[2] >= self.ttl
+            self._stats["stale_hits" if stale else "fresh_hits"] += 1
+        CACHE_LOOKUPS.inc(cache="results", result="stale_hit" if stale else "hit")
+
+        return StoredResult(
+            video_id=row[0], places=json.loads(row[1]), created_at=row[2], stale=stale
+        )
+
+    def stored_since(self, key: str, since: float) -> Optional[List[Dict[str, Any]]]:
+        """Places of a result stored at or after since, without counting a
+        lookup (used to poll for a result another process is producing)
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM analysis_results WHERE key = ? AND created_at >= ?",
+                (key, since),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key: str, video_id: str, places: List[Dict[str, Any]]) -> None:
+        """Store a result, evicting the least recently used entries over the limit"""
+        now = time.time()
+        payload = json.dumps(places, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analysis_results (key, video_id, payload, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, video_id, payload, now, now),
+            )
+            cursor = self._conn.execute(
+                """DELETE FROM analysis_results WHERE key IN (
+                    SELECT key FROM analysis_results ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )""",
+                (self.max_entries,),
+            )
+            self._stats["evictions"] += max(cursor.rowcount, 0)
+            self._conn.commit()
+
+    def revalidate(self, key: str, refresh: Callable[[], Any]) -> bool:
+        """Run refresh in the background unless one is already running for key"""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                refresh()
+            except Exception as e:
+                logger.warning(f"Background refresh failed for result {key[:12]}: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        self._refresh_executor.submit(run)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for the health endpoint"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = self._conn.execute(
+                "SELECT COUNT(*) FROM analysis_results"
+            ).fetchone()[0]
+            stats["refreshing"] = len(self._refreshing)
+        return stats
@@ -1,18 +1,175 @@
-from flask import request, jsonify, render_template
-from dataclasses import asdict
+from flask import request, jsonify, render_template, Response, url_for, g, send_file
+import httpx
 import logging
 import os
+import json
+import math
+import re
+import threading
+import time
 
-from analyzer import YouTubeAnalyzer
-from config import logger, GOOGLE_MAPS_API_KEY
+from service import (
+    get_analyzer,
+    get_analysis_leases,
+    get_result_store,
+    analysis_flight,
+    result_key,
+    refresh_analysis,
+    run_analysis,
+)
+from scheduler import BULK, INTERACTIVE, Overloaded
+from batch import parse_limit, run_batch, BatchInputError
+from jobs import JobManager
+from models import Place
+from photos import PHOTO_NAME, PHOTO_ROUTE
+from serialization import (
+    to_columnar,
+    pack_msgpack,
+    MSGPACK_AVAILABLE,
+    MSGPACK_MIMETYPE,
+)
+from metrics import (
+    registry,
+    HTTP_REQUEST_SECONDS,
+    start_trace,
+    finish_trace,
+    current_trace_id,
+    get_trace,
+)
+from config import (
+    logger,
+    GOOGLE_MAPS_API_KEY,
+    JOB_MAX_WORKERS,
+    JOB_RETENTION,
+    JOB_STREAM_KEEPALIVE,
+    CATALOG_MAX_RADIUS,
+    CATALOG_MAX_RESULTS,
+    ITINERARY_MAX_PLACES,
+    ITINERARY_MAX_DAYS,
+    ITINERARY_TIME_BUDGET,
+    PHOTO_MAX_AGE,
+    SHARED_STATE_DB_PATH,
+    SHARED_POLL_INTERVAL,
+)
 
-# Initialize analyzer
-analyzer = YouTubeAnalyzer()
+# Background analyses started with {"async": true}, visible to every worker
+# process; the job database and pool are created with the first job
+_job_manager = None
+_job_manager_lock = threading.Lock()
+
+
+def get_job_manager() -> JobManager:
+    """The job manager shared by this process, created on first use"""
+    global _job_manager
+    if _job_manager is None:
+        with _job_manager_lock:
+            if _job_manager is None:
+                _job_manager = JobManager(
+                    max_workers=JOB_MAX_WORKERS,
+                    retention=JOB_RETENTION,
+                    db_path=SHARED_STATE_DB_PATH,
+                    poll_interval=SHARED_POLL_INTERVAL,
+                )
+    return _job_manager
+
+
+registry.gauge(
+    "analyses_in_flight",
+    "Pipeline runs currently executing",
+    lambda: analysis_flight.stats()["in_flight"],
+)
+registry.gauge(
+    "jobs_active",
+    "Background jobs queued or running",
+    lambda: _job_manager.stats()["active"] if _job_manager else 0,
+)
+
+# Client-supplied trace ids are accepted when they look like ours
+_TRACE_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+def _json_progress(emit):
+    """Adapt a job's emit function to the analyzer's progress callback"""
+
+    def progress(stage, data):
+        if isinstance(data.get("place"), Place):
+            data = {**data, "place": data["place"].to_dict()}
+        emit(stage, data)
+
+    return progress
+
+
+def _wants_columnar(data=None):
+    """Whether the client asked for the columnar place layout"""
+    requested = request.args.get("format") or (data or {}).get("format")
+    return requested == "columnar"
+
+
+def _places_response(payload, columnar=False):
+    """Respond with payload["places"] as-is or columnar, as JSON or MessagePack"""
+    if columnar:
+        payload = {**payload, "places": to_columnar(payload["places"])}
+
+    if (
+        MSGPACK_AVAILABLE
+        and request.accept_mimetypes.best_match(["application/json", MSGPACK_MIMETYPE])
+        == MSGPACK_MIMETYPE
+    ):
+        return Response(pack_msgpack(payload), mimetype=MSGPACK_MIMETYPE)
+    return jsonify(payload)
+
+
+def _overloaded(e):
+    """429 response telling the client when to retry"""
+    retry_after = math.ceil(e.retry_after)
+    return (
+        jsonify(
+            {
+                "error": str(e),
+                "retry_after": retry_after,
+                "trace_id": current_trace_id(),
+            }
+        ),
+        429,
+        {"Retry-After": str(retry_after)},
+    )
+
+
+def _catalog_limit():
+    """Result limit requested for a catalog query, capped by configuration"""
+    limit = request.args.get("limit", default=100, type=int)
+    return max(1, min(limit, CATALOG_MAX_RESULTS))
 
 
 def register_routes(app):
     """Register all routes with the Flask app"""
 
+    @app.before_request
+    def begin_trace():
+        trace_id = request.headers.get("X-Trace-Id", "")
+        g.trace, g.trace_token = start_trace(
+            trace_id if _TRACE_ID.match(trace_id) else None
+        )
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def add_trace_header(response):
+        if "trace" in g:
+            response.headers["X-Trace-Id"] = g.trace.id
+        g.status = response.status_code
+        return response
+
+    @app.teardown_request
+    def end_trace(error=None):
+        if "trace" not in g:
+            return
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - g.request_started,
+            endpoint=request.url_rule.rule if request.url_rule else "unmatched",
+            status=str(g.get("status", 500)),
+        )
+        finish_trace(g.trace, g.trace_token)
+
     @app.route("/")
     def index():
         """Serve the main page"""
@@ -23,6 +180,7 @@ def register_routes(app):
     @app.route("/api/analyze", methods=["POST"])
     def analyze_video():
         """Analyze YouTube video and extract places"""
+        analyzer = get_analyzer()
         try:
             data = request.get_json()
             video_url = data.get("video_url")
@@ -35,26 +193,171 @@ def register_routes(app):
             if not video_id:
                 return jsonify({"error": "Invalid YouTube URL"}), 400
 
-            # Analyze video
-            places = analyzer.analyze_youtube_video(video_id)
+            cache_key = result_key(video_id)
 
-            # Convert to dict format for JSON response
-            places_dict = []
-            for place in places:
-                place_dict = asdict(place)
-                places_dict.append(place_dict)
+            stored = (
+                None if data.get("force_refresh") else get_result_store().get(cache_key)
+            )
+            if stored and stored.stale:
+                logger.info(f"♻️ Serving stale result for {video_id}, refreshing")
+                get_result_store().revalidate(
+                    cache_key, lambda: refresh_analysis(video_id, cache_key)
+                )
 
-            return jsonify(
-                {"success": True, "places": places_dict, "video_id": video_id}
+            # Job mode: return a job id right away and run the pipeline in the background
+            if data.get("async"):
+                if stored:
+                    job = get_job_manager().completed(
+                        video_id, cache_key, stored.places
+                    )
+                else:
+                    analyzer.scheduler.check(INTERACTIVE)
+                    job = get_job_manager().submit(
+                        video_id,
+                        cache_key,
+                        lambda emit: analyzer.scheduler.run(
+                            INTERACTIVE,
+                            run_analysis,
+                            video_id,
+                            cache_key,
+                            _json_progress(emit),
+                        ),
+                    )
+                return (
+                    jsonify(
+                        {
+                            "success": True,
+                            "job_id": job.id,
+                            "video_id": video_id,
+                            "status": job.status,
+                            "status_url": url_for("get_job", job_id=job.id),
+                            "events_url": url_for("stream_job_events", job_id=job.id),
+                            "trace_id": current_trace_id(),
+                        }
+                    ),
+                    202,
+                )
+
+            if stored:
+                return _places_response(
+                    {
+                        "success": True,
+                        "places": stored.places,
+                        "video_id": video_id,
+                        "cached": True,
+                        "trace_id": current_trace_id(),
+                    },
+                    columnar=_wants_columnar(data),
+                )
+
+            # Analyze video
+            with analyzer.scheduler.admit(INTERACTIVE):
+                places_dict = run_analysis(video_id, cache_key)
+
+            return _places_response(
+                {
+                    "success": True,
+                    "places": places_dict,
+                    "video_id": video_id,
+                    "cached": False,
+                    "trace_id": current_trace_id(),
+                },
+                columnar=_wants_columnar(data),
             )
 
+        except Overloaded as e:
+            return _overloaded(e)
         except Exception as e:
             logger.error(f"Error analyzing video: {e}")
+            return jsonify({"error": str(e), "trace_id": current_trace_id()}), 500
+
+    @app.route("/api/analyze/batch", methods=["POST"])
+    def analyze_batch():
+        """Analyze many videos (URLs, a playlist or a channel), streaming JSON Lines"""
+        analyzer = get_analyzer()
+        try:
+            data = request.get_json(silent=True) or {}
+            if not isinstance(data, dict):
+                raise BatchInputError("Request body must be a JSON object")
+            video_urls = data.get("video_urls") or []
+            if not isinstance(video_urls, list):
+                raise BatchInputError("video_urls must be a list of URLs")
+            limit = parse_limit(data.get("limit"))
+            analyzer.scheduler.check(BULK)
+            generator = run_batch(
+                video_urls=video_urls,
+                playlist_url=data.get("playlist_url"),
+                channel_id=data.get("channel_id"),
+                skip_cached=data.get("skip_cached", True),
+                force_refresh=bool(data.get("force_refresh")),
+                limit=limit,
+            )
+            # Resolve inputs (e.g. playlist pages) before the stream starts
+            first_line = next(generator)
+        except BatchInputError as e:
+            return jsonify({"error": str(e)}), 400
+        except Overloaded as e:
+            return _overloaded(e)
+        except Exception as e:
+            logger.error(f"Error starting batch analysis: {e}")
             return jsonify({"error": str(e)}), 500
 
+        columnar = _wants_columnar(data)
+
+        def generate():
+            yield json.dumps(first_line, ensure_ascii=False) + "\n"
+            for line in generator:
+                if columnar and "places" in line:
+                    line["places"] = to_columnar(line["places"])
+                yield json.dumps(line, ensure_ascii=False) + "\n"
+
+        return Response(
+            generate(),
+            mimetype="application/x-ndjson",
+            headers={"X-Accel-Buffering": "no"},
+        )
+
+    @app.route("/api/jobs/<job_id>", methods=["GET"])
+    def get_job(job_id):
+        """Get the status of a background analysis"""
+        job = get_job_manager().get(job_id)
+        if not job:
+            return jsonify({"error": "Job not found"}), 404
+        return jsonify(job.to_dict())
+
+    @app.route("/api/jobs/<job_id>/events", methods=["GET"])
+    def stream_job_events(job_id):
+        """Stream progress of a background analysis as Server-Sent Events"""
+        job = get_job_manager().get(job_id)
+        if not job:
+            return jsonify({"error": "Job not found"}), 404
+
+        # Resume after the last event the browser saw when it reconnects
+        last_event_id = request.headers.get("Last-Event-ID", type=int)
+        start = last_event_id + 1 if last_event_id is not None else 0
+
+        def generate():
+            cursor = start
+            while True:
+                events, finished = job.wait_for_events(cursor, JOB_STREAM_KEEPALIVE)
+                for event in events:
+                    yield f"id: {event['id']}\nevent: {event['stage']}\ndata: {json.dumps(event)}\n\n"
+                cursor += len(events)
+                if finished and not events:
+                    return
+                if not events:
+                    yield ": keep-alive\n\n"
+
+        return Response(
+            generate(),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
     @app.route("/api/transcript", methods=["POST"])
     def get_transcript():
         """Get YouTube video transcript (legacy endpoint)"""
+        analyzer = get_analyzer()
         try:
             data = request.get_json()
             video_url = data.get("video_url")
@@ -67,27 +370,224 @@ def register_routes(app):
             if not video_id:
                 return jsonify({"error": "Invalid YouTube URL"}), 400
 
-            # Get transcript
-            transcript = analyzer.get_youtube_transcript(video_id)
+            # Get transcript (shared with /api/analyze through the transcript store)
+            transcript = analyzer.get_transcript(video_id)
 
             return jsonify(
-                {"video_id": video_id, "transcript": transcript, "success": True}
+                {
+                    "video_id": video_id,
+                    "transcript": transcript.text,
+                    "language": transcript.language,
+                    "segments": [segment.to_dict() for segment in transcript.segments],
+                    "success": True,
+                }
             )
 
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
+    @app.route("/api/places/nearby", methods=["GET"])
+    def places_nearby():
+        """Places from all analyzed videos within radius meters of a point"""
+        analyzer = get_analyzer()
+        lat = request.args.get("lat", type=float)
+        lng = request.args.get("lng", type=float)
+        radius = request.args.get("radius", default=5000, type=float)
+
+        if lat is None or lng is None or not (-90 <= lat <= 90 and -180 <= lng <= 180):
+            return jsonify({"error": "Valid lat and lng are required"}), 400
+        if not 0 < radius <= CATALOG_MAX_RADIUS:
+            return (
+                jsonify(
+                    {
+                        "error": f"radius must be between 0 and {CATALOG_MAX_RADIUS:g} meters"
+                    }
+                ),
+                400,
+            )
+
+        places = analyzer.catalog.nearby(
+            lat,
+            lng,
+            radius,
+            limit=_catalog_limit(),
+            exclude_video_id=request.args.get("exclude_video"),
+        )
+        return _places_response(
+            {"success": True, "places": places, "count": len(places)},
+            columnar=_wants_columnar(),
+        )
+
+    @app.route("/api/places/bbox", methods=["GET"])
+    def places_in_bbox():
+        """Places from all analyzed videos inside a bounding box"""
+        analyzer = get_analyzer()
+        bounds = [
+            request.args.get(name, type=float)
+            for name in ("south", "west", "north", "east")
+        ]
+        if any(value is None for value in bounds):
+            return jsonify({"error": "south, west, north and east are required"}), 400
+
+        south, west, north, east = bounds
+        if not (
+            -90 <= south <= north <= 90 and -180 <= west <= 180 and -180 <= east <= 180
+        ):
+            return jsonify({"error": "Invalid bounding box"}), 400
+
+        places = analyzer.catalog.within_bbox(
+            south,
+            west,
+            north,
+            east,
+            limit=_catalog_limit(),
+            exclude_video_id=request.args.get("exclude_video"),
+        )
+        return _places_response(
+            {"success": True, "places": places, "count": len(places)},
+            columnar=_wants_columnar(),
+        )
+
+    @app.route("/api/itinerary", methods=["POST"])
+    def plan_trip():
+        """Order places (given, or from analyzed videos) into a route, optionally per day"""
+        # NumPy is only imported once someone plans a trip
+        from itinerary import coordinates_of, place_key, plan_itinerary
+
+        analyzer = get_analyzer()
+        data = request.get_json(silent=True) or {}
+        places = data.get("places") or []
+        if not isinstance(places, list) or not all(
+            isinstance(place, dict) for place in places
+        ):
+            return jsonify({"error": "places must be a list of places"}), 400
+
+        video_urls = list(data.get("video_urls") or [])
+        if data.get("video_url"):
+            video_urls.append(data["video_url"])
+        for video_url in video_urls:
+            video_id = analyzer.extract_video_id(video_url)
+            if not video_id:
+                return jsonify({"error": f"Invalid YouTube URL: {video_url}"}), 400
+            stored = get_result_store().get(result_key(video_id))
+            if not stored:
+                return jsonify({"error": f"Video {video_id} is not analyzed yet"}), 404
+            places.extend(stored.places)
+
+        try:
+            for place in places:
+                coordinates_of(place)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        # The same place can come from several videos
+        places = list({place_key(place): place for place in places}.values())
+        if not places:
+            return jsonify({"error": "places or video_urls are required"}), 400
+        if len(places) > ITINERARY_MAX_PLACES:
+            return (
+                jsonify({"error": f"Too many places (max {ITINERARY_MAX_PLACES})"}),
+                400,
+            )
+
+        days = data.get("days", 1)
+        if not isinstance(days, int) or not 1 <= days <= ITINERARY_MAX_DAYS:
+            return (
+                jsonify({"error": f"days must be between 1 and {ITINERARY_MAX_DAYS}"}),
+                400,
+            )
+
+        start = data.get("start")
+        if start is not None:
+            try:
+                start = (float(start["lat"]), float(start["lng"]))
+            except (KeyError, TypeError, ValueError):
+                return jsonify({"error": "start must have lat and lng"}), 400
+            if not (-90 <= start[0] <= 90 and -180 <= start[1] <= 180):
+                return jsonify({"error": "start must have lat and lng"}), 400
+
+        plan = plan_itinerary(
+            places, days=days, start=start, time_budget=ITINERARY_TIME_BUDGET
+        )
+        return jsonify({"success": True, **plan})
+
+    @app.route(f"{PHOTO_ROUTE}/<path:photo_name>", methods=["GET"])
+    def get_photo(photo_name):
+        """Serve a place photo from the photo cache, downloading it once on a miss"""
+        analyzer = get_analyzer()
+        if not PHOTO_NAME.match(photo_name):
+            return jsonify({"error": "Photo not found"}), 404
+
+        width = analyzer.photo_store.width_for(request.args.get("w", type=int))
+        try:
+            photo = analyzer.photo_store.get(photo_name, width)
+        except httpx.HTTPError as e:
+            logger.error(f"Error fetching photo {photo_name}: {e}")
+            return jsonify({"error": "Photo temporarily unavailable"}), 502
+        if photo is None:
+            return jsonify({"error": "Photo not found"}), 404
+
+        # Photos never change for a given name and width
+        response = send_file(
+            photo.path,
+            mimetype=photo.mimetype,
+            etag=photo.etag,
+            max_age=PHOTO_MAX_AGE,
+            conditional=True,
+        )
+        response.cache_control.immutable = True
+        return response
+
+    @app.route("/api/metrics", methods=["GET"])
+    def metrics():
+        """Prometheus metrics"""
+        return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+    @app.route("/api/traces/<trace_id>", methods=["GET"])
+    def get_trace_spans(trace_id):
+        """Timing breakdown of a recent request"""
+        trace = get_trace(trace_id)
+        if trace is None:
+            return jsonify({"error": "Trace not found"}), 404
+        return jsonify(trace.to_dict())
+
     @app.route("/api/health", methods=["GET"])
     def health_check():
         """Health check endpoint"""
+        analyzer = get_analyzer()
         return jsonify(
             {
                 "status": "OK",
                 "message": "Python Trip Advisor backend is running",
+                "worker_pid": os.getpid(),
                 "apis": {
                     "youtube": bool(analyzer.youtube_api_key),
                     "openai": bool(analyzer.openai_api_key),
                     "google_maps": bool(analyzer.google_maps_api_key),
                 },
+                "llm_backends": [
+                    {"name": backend.name, "available": backend.available}
+                    for backend in analyzer.extractor.backends
+                ],
+                "cache": {
+                    "geocode": analyzer.geocode_cache.stats(),
+                    "places": analyzer.places_cache.stats(),
+                    "place_lookups": analyzer.place_lookup_cache.stats(),
+                    "llm": analyzer.llm_cache.stats(),
+                    "photos": analyzer.photo_store.stats(),
+                    "results": get_result_store().stats(),
+                    "transcripts": analyzer.transcript_store.stats(),
+                },
+                "in_flight": {
+                    "analyses": analysis_flight.stats(),
+                    "leases": get_analysis_leases().stats(),
+                    "lookups": analyzer.lookup_flight.stats(),
+                },
+                "catalog": analyzer.catalog.stats(),
+                "gazetteer": analyzer.gazetteer.stats() if analyzer.gazetteer else None,
+                # A health probe does not create the job database and pool
+                "jobs": _job_manager.stats() if _job_manager is not None else None,
+                "upstreams": analyzer.http.stats(),
+                "scheduler": analyzer.scheduler.stats(),
             }
         )
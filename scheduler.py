@@ -0,0 +1,312 @@
+import contextvars
+import hashlib
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from config import logger
+from metrics import REQUESTS_SHED
+from rate_limit import RateLimiter
+
+# Priority classes: requests someone is waiting for, and batch or background work
+INTERACTIVE = "interactive"
+BULK = "bulk"
+PRIORITIES = (INTERACTIVE, BULK)
+
+# Budget usage is reported over this many seconds
+USAGE_WINDOW = 60
+
+_priority: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "priority", default=INTERACTIVE
+)
+
+
+def current_priority() -> str:
+    return _priority.get()
+
+
+@contextmanager
+def priority(name: str) -> Iterator[None]:
+    """Run the block (and work it hands to propagated threads) in a priority class"""
+    token = _priority.set(name)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class Overloaded(Exception):
+    """Raised instead of admitting work the upstream budgets cannot serve in time"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Budget(RateLimiter):
+    """Token bucket shared by both priority classes.
+
+    Interactive callers take any available token. Bulk callers wait while
+    interactive callers are queued and leave ``reserve`` of the burst in the
+    bucket, so a request arriving during a backfill starts without queueing
+    behind it. Calls also draw from the API key's budget when one is given.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        burst: int = 1,
+        reserve: float = 0.25,
+        key_budget: Optional["Budget"] = None,
+    ):
+        super().__init__(rate, burst)
+        self.name = name
+        self.key_budget = key_budget
+        self._reserve = self.burst * reserve
+        self._cond = threading.Condition(self._lock)
+        self._queued = {name: 0 for name in PRIORITIES}
+        self._acquired_by = {name: 0 for name in PRIORITIES}
+        self._waited_by = {name: 0.0 for name in PRIORITIES}
+        # (time, priority) of recent acquisitions, for the usage report
+        self._recent: deque = deque()
+
+    def acquire(self) -> float:
+        """Block until the current priority class may send a request"""
+        waited = self.key_budget.acquire() if self.key_budget else 0.0
+        cls = current_priority()
+        started = time.monotonic()
+        with self._cond:
+            self._queued[cls] += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    delay = self._take(cls, now)
+                    if delay is None:
+                        break
+                    self._cond.wait(delay)
+            finally:
+                self._queued[cls] -= 1
+
+            waited += now - started
+            self._acquired += 1
+            self._waited += now - started
+            self._acquired_by[cls] += 1
+            self._waited_by[cls] += now - started
+            self._recent.append((now, cls))
+            self._trim(now)
+        return waited
+
+    def backlog_seconds(self, cls: str) -> float:
+        """Estimated wait for a new caller of cls behind the callers already queued"""
+        with self._lock:
+            if self.rate <= 0:
+                return 0.0
+            ahead = self._queued[INTERACTIVE]
+            if cls == BULK:
+                ahead += self._queued[BULK]
+            return ahead / self.rate
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            self._trim(now)
+            used = {name: 0 for name in PRIORITIES}
+            for _, cls in self._recent:
+                used[cls] += 1
+            quota = self.rate * USAGE_WINDOW
+            stats = {
+                "rate_per_second": self.rate,
+                "quota_per_minute": round(quota),
+                "burst": self.burst,
+                "tokens": round(self._tokens, 2) if self.rate > 0 else None,
+                "used_last_minute": used,
+                "utilization": (
+                    round(sum(used.values()) / quota, 3) if quota > 0 else None
+                ),
+                "queued": dict(self._queued),
+                "acquired": dict(self._acquired_by),
+                "waited_seconds": {
+                    name: round(seconds, 3) for name, seconds in self._waited_by.items()
+                },
+            }
+        if self.key_budget:
+            stats["api_key"] = self.key_budget.name
+        return stats
+
+    def _take(self, cls: str, now: float) -> Optional[float]:
+        """Take a token for cls, or return how long to wait before trying again"""
+        if self.rate <= 0:
+            return None
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        needed = 1.0
+        if cls == BULK:
+            if self._queued[INTERACTIVE]:
+                return 1 / self.rate
+            # Never more than the bucket holds, or bulk callers wait forever
+            needed = min(needed + self._reserve, self.burst)
+        if self._tokens >= needed:
+            self._tokens -= 1
+            return None
+        return (needed - self._tokens) / self.rate
+
+    def _trim(self, now: float) -> None:
+        while self._recent and self._recent[0][0] < now - USAGE_WINDOW:
+            self._recent.popleft()
+
+
+class Scheduler:
+    """Upstream budgets plus admission control for whole analyses.
+
+    Each analysis is admitted in a priority class. Interactive work is
+    rejected with Overloaded (served as 429 with Retry-After) when too many
+    analyses are running or the upstream queues ahead of it are longer than
+    max_queue_seconds; bulk work waits for a slot instead.
+    """
+
+    def __init__(
+        self,
+        share: float = 1.0,
+        reserve: float = 0.25,
+        max_in_flight: Optional[Dict[str, int]] = None,
+        max_queue_seconds: Optional[Dict[str, float]] = None,
+    ):
+        self.share = share
+        self.reserve = reserve
+        self.max_in_flight = max_in_flight or {INTERACTIVE: 64, BULK: 8}
+        self.max_queue_seconds = max_queue_seconds or {INTERACTIVE: 15, BULK: 300}
+        self.budgets: Dict[str, Budget] = {}
+        self._lock = threading.Lock()
+        self._slots = threading.Condition(self._lock)
+        self._in_flight = {name: 0 for name in PRIORITIES}
+        self._admitted = {name: 0 for name in PRIORITIES}
+        self._shed = {name: 0 for name in PRIORITIES}
+        # Moving average of admitted analysis durations, used for Retry-After
+        self._mean_seconds = 5.0
+
+    def budget(
+        self,
+        name: str,
+        rate: float,
+        api_key: Optional[str] = None,
+        key_rate: float = 0,
+    ) -> Budget:
+        """Budget of one upstream; with key_rate, calls also draw from the key's budget"""
+        key_budget = None
+        if api_key and key_rate > 0:
+            fingerprint = hashlib.sha256(api_key.encode()).hexdigest()[:8]
+            key_budget = self._budget(f"key:{fingerprint}", key_rate)
+        return self._budget(name, rate, key_budget)
+
+    def check(self, cls: str) -> None:
+        """Raise Overloaded if work of cls would not be admitted right now"""
+        self._try_admit(cls, take=False)
+
+    @contextmanager
+    def admit(self, cls: str, wait: bool = False) -> Iterator[None]:
+        """Run the block as one admitted analysis of cls.
+
+        Raises Overloaded when the class is saturated, or with wait=True
+        blocks until a slot frees up.
+        """
+        if wait:
+            with self._slots:
+                while self._in_flight[cls] >= self.max_in_flight[cls]:
+                    self._slots.wait()
+                self._in_flight[cls] += 1
+        else:
+            self._try_admit(cls, take=True)
+
+        started = time.monotonic()
+        try:
+            with self._lock:
+                self._admitted[cls] += 1
+            with priority(cls):
+                yield
+        finally:
+            with self._slots:
+                self._in_flight[cls] -= 1
+                self._mean_seconds += 0.2 * (
+                    time.monotonic() - started - self._mean_seconds
+                )
+                self._slots.notify()
+
+    def run(self, cls: str, fn: Callable, *args, **kwargs) -> Any:
+        """Call fn as an admitted analysis of cls, waiting for a slot"""
+        with self.admit(cls, wait=True):
+            return fn(*args, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            classes = {
+                name: {
+                    "in_flight": self._in_flight[name],
+                    "max_in_flight": self.max_in_flight[name],
+                    "max_queue_seconds": self.max_queue_seconds[name],
+                    "admitted": self._admitted[name],
+                    "shed": self._shed[name],
+                }
+                for name in PRIORITIES
+            }
+            budgets = dict(self.budgets)
+        return {
+            "share": round(self.share, 3),
+            "classes": classes,
+            "budgets": {name: budget.stats() for name, budget in budgets.items()},
+        }
+
+    def _budget(
+        self, name: str, rate: float, key_budget: Optional[Budget] = None
+    ) -> Budget:
+        with self._lock:
+            budget = self.budgets.get(name)
+            if budget is None:
+                rate = rate * self.share
+                # Room for one request plus the interactive reserve, even
+                # when this process's share is below one request per second
+                burst = max(math.ceil(rate), 2 if self.reserve > 0 else 1)
+                budget = Budget(
+                    name,
+                    rate,
+                    burst=burst,
+                    reserve=self.reserve,
+                    key_budget=key_budget,
+                )
+                self.budgets[name] = budget
+            return budget
+
+    def _try_admit(self, cls: str, take: bool) -> None:
+        """Raise Overloaded if cls is saturated, otherwise take a slot when
+        take is set. The slot check and the increment share one critical
+        section, so concurrent callers cannot overshoot max_in_flight.
+        """
+        backlog = max(
+            (budget.backlog_seconds(cls) for budget in list(self.budgets.values())),
+            default=0.0,
+        )
+        with self._lock:
+            in_flight = self._in_flight[cls]
+            rejection = None
+            if backlog > self.max_queue_seconds[cls]:
+                rejection = (f"Upstream queues are {backlog:.0f}s deep", backlog)
+            elif in_flight >= self.max_in_flight[cls]:
+                rejection = (
+                    f"{in_flight} {cls} analyses in progress",
+                    self._mean_seconds,
+                )
+            elif take:
+                self._in_flight[cls] += 1
+        if rejection:
+            self._reject(cls, *rejection)
+
+    def _reject(self, cls: str, reason: str, retry_after: float) -> None:
+        retry_after = max(1.0, retry_after)
+        with self._lock:
+            self._shed[cls] += 1
+        REQUESTS_SHED.inc(priority=cls)
+        logger.warning(f"🚦 Shedding {cls} work: {reason}, retry in {retry_after:.0f}s")
+        raise Overloaded(f"Server is busy: {reason}", retry_after)
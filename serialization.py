@@ -0,0 +1,152 @@
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import msgpack
+
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+COLUMNAR_FORMAT = "columnar-v1"
+MSGPACK_MIMETYPE = "application/x-msgpack"
+
+
+def _common_affixes(urls: List[str]) -> Tuple[str, str]:
+    """Longest prefix and suffix shared by every URL (non-overlapping)"""
+    if not urls:
+        return "", ""
+    prefix = os.path.commonprefix(urls)
+    reversed_urls = [url[len(prefix) :][::-1] for url in urls]
+    suffix = os.path.commonprefix(reversed_urls)[::-1]
+    return prefix, suffix
+
+
+def to_columnar(places: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Pack place dicts into a columnar layout.
+
+    Each field becomes one list. Coordinates are split into lat/lng columns.
+    Place types are interned into a lookup table. Photo URLs are stored
+    without the prefix and suffix they all share, and photo_url becomes 0
+    when it is the first photo. Fields some places lack are listed under
+    "absent" and places whose coordinates are None under
+    "null_coordinates". from_columnar restores the original dicts.
+    """
+    fields: List[str] = []
+    for place in places:
+        for field in place:
+            if field not in fields:
+                fields.append(field)
+    absent = {
+        field: [i for i, place in enumerate(places) if field not in place]
+        for field in fields
+    }
+    absent = {field: indices for field, indices in absent.items() if indices}
+    null_coordinates = [
+        i for i, place in enumerate(places) if place.get("coordinates", {}) is None
+    ]
+
+    all_photos = [url for place in places for url in place.get("photos") or []]
+    prefix, suffix = _common_affixes(all_photos)
+    end = -len(suffix) if suffix else None
+
+    types: List[str] = []
+    type_index: Dict[str, int] = {}
+    columns: Dict[str, List[Any]] = {}
+    for field in fields:
+        if field == "coordinates":
+            columns["lat"] = [
+                (place.get("coordinates") or {}).get("lat") for place in places
+            ]
+            columns["lng"] = [
+                (place.get("coordinates") or {}).get("lng") for place in places
+            ]
+        elif field == "type":
+            column = []
+            for place in places:
+                place_type = place.get("type")
+                if place_type not in type_index:
+                    type_index[place_type] = len(types)
+                    types.append(place_type)
+                column.append(type_index[place_type])
+            columns["type"] = column
+        elif field == "photos":
+            columns["photos"] = [
+                (
+                    [url[len(prefix) : end] for url in place["photos"]]
+                    if place.get("photos") is not None
+                    else None
+                )
+                for place in places
+            ]
+        elif field == "photo_url":
+            columns["photo_url"] = [
+                (
+                    0
+                    if place.get("photos")
+                    and place.get("photo_url") == place["photos"][0]
+                    else place.get("photo_url")
+                )
+                for place in places
+            ]
+        else:
+            columns[field] = [place.get(field) for place in places]
+
+    return {
+        "format": COLUMNAR_FORMAT,
+        "count": len(places),
+        "fields": fields,
+        "types": types,
+        "photo_prefix": prefix,
+        "photo_suffix": suffix,
+        "absent": absent,
+        "null_coordinates": null_coordinates,
+        "columns": columns,
+    }
+
+
+def from_columnar(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Unpack a to_columnar payload back into place dicts"""
+    columns = payload["columns"]
+    types = payload["types"]
+    prefix = payload["photo_prefix"]
+    suffix = payload["photo_suffix"]
+    absent = {
+        field: set(indices) for field, indices in payload.get("absent", {}).items()
+    }
+    null_coordinates = set(payload.get("null_coordinates", ()))
+
+    places = []
+    for i in range(payload["count"]):
+        place: Dict[str, Any] = {}
+        for field in payload["fields"]:
+            if i in absent.get(field, ()):
+                continue
+            if field == "coordinates":
+                place[field] = (
+                    None
+                    if i in null_coordinates
+                    else {"lat": columns["lat"][i], "lng": columns["lng"][i]}
+                )
+            elif field == "type":
+                place[field] = types[columns["type"][i]]
+            elif field == "photos":
+                photos = columns["photos"][i]
+                place[field] = (
+                    [prefix + photo + suffix for photo in photos]
+                    if photos is not None
+                    else None
+                )
+            else:
+                place[field] = columns[field][i]
+        if place.get("photo_url") == 0 and place.get("photos"):
+            place["photo_url"] = place["photos"][0]
+        places.append(place)
+    return places
+
+
+def pack_msgpack(payload: Any) -> Optional[bytes]:
+    """MessagePack encoding of payload, or None when msgpack is not installed"""
+    if not MSGPACK_AVAILABLE:
+        return None
+    return msgpack.packb(payload, use_bin_type=True)
@@ -0,0 +1,126 @@
+import argparse
+import importlib.util
+import os
+import sys
+
+from config import (
+    logger,
+    configure_logging,
+    GAZETTEER_PATH,
+    HOST,
+    PORT,
+    PREWARM,
+    WEB_THREADS,
+    WEB_WORKERS,
+)
+
+# Production entry point: serves the app with gunicorn, WEB_WORKERS pre-forked
+# processes with WEB_THREADS request threads each. The module is also a
+# gunicorn config file, so `gunicorn -c serve.py app:app` gets the same
+# settings and hooks. Without gunicorn (e.g. on Windows) it falls back to
+# Werkzeug's development server in a single process.
+
+# gunicorn settings (overridden by the command line of either entry point)
+bind = f"{HOST}:{PORT}"
+workers = WEB_WORKERS
+# Requests mostly wait on upstream APIs, so a thread per request is cheap;
+# how many analyses make progress at once is bounded by the enrichment and
+# LLM pools and the upstream rate limits, not by the server
+worker_class = "gthread"
+threads = WEB_THREADS
+backlog = 1024
+# Seconds a worker gets to finish its requests on shutdown or reload
+graceful_timeout = 30
+
+
+def on_starting(server) -> None:
+    """Import the gazetteer dump once, before any worker starts reading it"""
+    if GAZETTEER_PATH:
+        from gazetteer import prepare
+
+        prepare()
+
+
+def post_fork(server, worker) -> None:
+    """Give every worker an equal share of the upstream rate limits"""
+    import service
+
+    service.configure(rate_limit_processes=server.cfg.workers)
+
+
+def post_worker_init(worker) -> None:
+    """Open the worker's own databases and pools before it takes requests"""
+    # Importing the app already prewarmed it with PREWARM=True
+    if not PREWARM:
+        from service import prewarm
+
+        prewarm()
+    logger.info(f"👷 Worker {os.getpid()} serving")
+
+
+def serve_gunicorn(options: dict) -> None:
+    from gunicorn.app.base import BaseApplication
+
+    class Server(BaseApplication):
+        def load_config(self):
+            for hook in (on_starting, post_fork, post_worker_init):
+                self.cfg.set(hook.__name__, hook)
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            # Imported in each worker after forking, so every worker opens
+            # its own databases and pools
+            from app import app
+
+            return app
+
+    Server().run()
+
+
+def serve_werkzeug(host: str, port: int) -> None:
+    import service
+
+    service.configure(rate_limit_processes=1)
+    from app import app
+
+    logger.warning("gunicorn is not available, using the development server")
+    app.run(host=host, port=port, threaded=True)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Serve the app from several worker processes sharing one port"
+    )
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=WEB_WORKERS)
+    parser.add_argument("--threads", type=int, default=WEB_THREADS)
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    workers = max(1, args.workers)
+    logger.info(
+        f"Starting Python Trip Advisor backend on http://{args.host}:{args.port} "
+        f"with {workers} worker(s)"
+    )
+    if importlib.util.find_spec("gunicorn") is None:
+        on_starting(None)
+        serve_werkzeug(args.host, args.port)
+        return 0
+
+    serve_gunicorn(
+        {
+            "bind": f"{args.host}:{args.port}",
+            "workers": workers,
+            "worker_class": worker_class,
+            "threads": max(1, args.threads),
+            "backlog": backlog,
+            "graceful_timeout": graceful_timeout,
+        }
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
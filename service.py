@@ -0,0 +1,186 @@
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from analyzer import YouTubeAnalyzer
+from result_store import ResultStore, StoredResult
+from singleflight import ProgressFanout, SharedLease, SingleFlight
+from scheduler import BULK
+from metrics import span
+from config import (
+    logger,
+    CACHE_DB_PATH,
+    RESULT_CACHE_TTL,
+    RESULT_CACHE_STALE_TTL,
+    RESULT_CACHE_MAX_ENTRIES,
+    SHARED_STATE_DB_PATH,
+    ANALYSIS_LEASE_TTL,
+    SHARED_POLL_INTERVAL,
+    RATE_LIMIT_PROCESSES,
+)
+
+# Shared pipeline state used by the web routes and the command line tools
+
+# The analyzer, the result store and the leases open databases (and the
+# analyzer its API clients), so they are created on first use or by prewarm()
+# and importing this module leaves the cache directory untouched
+_analyzer: Optional[YouTubeAnalyzer] = None
+_analyzer_lock = threading.Lock()
+# Processes sharing the upstream rate limits, see configure()
+_rate_limit_processes = RATE_LIMIT_PROCESSES
+
+_result_store: Optional[ResultStore] = None
+_analysis_leases: Optional[SharedLease] = None
+_shared_state_lock = threading.Lock()
+
+# Concurrent analyses of the same video share a single pipeline run, and
+# every caller gets its progress events
+analysis_flight = SingleFlight()
+_progress: Dict[str, ProgressFanout] = {}
+_progress_lock = threading.Lock()
+
+
+def get_analyzer() -> YouTubeAnalyzer:
+    """The analyzer shared by this process, created on first use"""
+    global _analyzer
+    if _analyzer is None:
+        with _analyzer_lock:
+            if _analyzer is None:
+                _analyzer = YouTubeAnalyzer(rate_limit_processes=_rate_limit_processes)
+    return _analyzer
+
+
+def get_result_store() -> ResultStore:
+    """Finished analyses, served without rerunning the pipeline"""
+    global _result_store
+    if _result_store is None:
+        with _shared_state_lock:
+            if _result_store is None:
+                _result_store = ResultStore(
+                    CACHE_DB_PATH,
+                    ttl=RESULT_CACHE_TTL,
+                    stale_ttl=RESULT_CACHE_STALE_TTL,
+                    max_entries=RESULT_CACHE_MAX_ENTRIES,
+                )
+    return _result_store
+
+
+def get_analysis_leases() -> SharedLease:
+    """Leases that let worker processes sharing the cache directory run each
+    analysis once
+    """
+    global _analysis_leases
+    if _analysis_leases is None:
+        with _shared_state_lock:
+            if _analysis_leases is None:
+                _analysis_leases = SharedLease(
+                    SHARED_STATE_DB_PATH,
+                    ttl=ANALYSIS_LEASE_TTL,
+                    poll_interval=SHARED_POLL_INTERVAL,
+                )
+    return _analysis_leases
+
+
+def configure(rate_limit_processes: int) -> None:
+    """Set how many processes share the upstream rate limits. Must be called
+    before the analyzer is created.
+    """
+    global _rate_limit_processes
+    with _analyzer_lock:
+        if _analyzer is not None:
+            raise RuntimeError("configure() called after the analyzer was created")
+        _rate_limit_processes = max(1, rate_limit_processes)
+
+
+def prewarm() -> None:
+    """Create the analyzer, its API clients and hot cache entries now instead
+    of on the first request
+    """
+    started = time.perf_counter()
+    get_analyzer().prewarm()
+    logger.info(f"🔥 Prewarmed in {time.perf_counter() - started:.2f}s")
+
+
+def result_key(video_id: str) -> str:
+    """Result store key for a video under the current pipeline version"""
+    return ResultStore.key_for(video_id, get_analyzer().pipeline_version)
+
+
+def get_stored_result(video_id: str) -> Optional[StoredResult]:
+    return get_result_store().get(result_key(video_id))
+
+
+def run_analysis(video_id: str, cache_key: str, progress=None) -> List[Dict[str, Any]]:
+    """Run the pipeline once for all concurrent requests for the same result.
+
+    Every caller's progress callback sees the run's events, including a
+    caller that joins a run already in flight.
+    """
+    with _progress_lock:
+        fanout = _progress.setdefault(cache_key, ProgressFanout())
+        fanout.users += 1
+    if progress:
+        fanout.subscribe(progress)
+    try:
+        return analysis_flight.do(cache_key, _run_fanned_out, video_id, cache_key)
+    finally:
+        if progress:
+            fanout.unsubscribe(progress)
+        with _progress_lock:
+            fanout.users -= 1
+            if not fanout.users and _progress.get(cache_key) is fanout:
+                del _progress[cache_key]
+
+
+def _run_fanned_out(video_id: str, cache_key: str) -> List[Dict[str, Any]]:
+    """Run by the leader of a coalesced analysis"""
+    with _progress_lock:
+        fanout = _progress.setdefault(cache_key, ProgressFanout())
+    try:
+        return _run_leased(video_id, cache_key, fanout.emit)
+    finally:
+        # The next run for this key starts with no events
+        with _progress_lock:
+            if _progress.get(cache_key) is fanout:
+                del _progress[cache_key]
+
+
+def refresh_analysis(video_id: str, cache_key: str) -> List[Dict[str, Any]]:
+    """Rerun an analysis as bulk work, e.g. to refresh a stale result"""
+    return get_analyzer().scheduler.run(BULK, run_analysis, video_id, cache_key)
+
+
+def _run_leased(video_id: str, cache_key: str, progress=None) -> List[Dict[str, Any]]:
+    """Run the pipeline, or wait for the result if another process is running it"""
+    started = time.time()
+    return get_analysis_leases().run(
+        cache_key,
+        lambda: _run_analysis(video_id, cache_key, progress),
+        lambda: get_result_store().stored_since(cache_key, started),
+    )
+
+
+def _run_analysis(video_id: str, cache_key: str, progress=None):
+    """Run the full pipeline for a video and store the serialized places"""
+    extraction: Dict[str, Any] = {}
+
+    def track(stage: str, data: Dict[str, Any]) -> None:
+        if stage == "ai":
+            extraction.update(data)
+        if progress:
+            progress(stage, data)
+
+    with span("pipeline"):
+        places = get_analyzer().analyze_youtube_video(video_id, progress=track)
+
+    # Convert to dict format for JSON response
+    places_dict = [place.to_dict() for place in places]
+
+    # A fallback extraction is served but not stored, so the next request retries the model
+    if extraction.get("degraded"):
+        logger.warning(
+            f"Not storing degraded result for {video_id} (backend: {extraction.get('backend')})"
+        )
+    else:
+        get_result_store().put(cache_key, video_id, places_dict)
+    return places_dict
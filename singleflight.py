@@ -0,0 +1,237 @@
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from config import logger
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into a single execution.
+
+    The first caller for a key runs the function; every caller that arrives
+    while it is still running waits on the same future and receives the same
+    result (or exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Future] = {}
+        self._stats = {"executions": 0, "coalesced": 0}
+
+    def do(self, key: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) once for all concurrent callers of key"""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self._stats["coalesced"] += 1
+                leader = False
+            else:
+                future = Future()
+                self._calls[key] = future
+                self._stats["executions"] += 1
+                leader = True
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def in_flight(self, key: str) -> bool:
+        """Whether a call for key is currently running"""
+        with self._lock:
+            return key in self._calls
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._calls)
+        return stats
+
+
+class ProgressFanout:
+    """Progress events of one coalesced run, delivered to every caller
+    waiting on it. A caller joining late first gets the events so far, so
+    its view of the run is the same as the leader's.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._events: List[Tuple[str, Dict[str, Any]]] = []
+        self._listeners: List[Callable[[str, Dict[str, Any]], Any]] = []
+        # Callers currently relying on this fanout, counted by its owner
+        self.users = 0
+
+    @property
+    def listeners(self) -> int:
+        with self._lock:
+            return len(self._listeners)
+
+    def subscribe(self, listener: Callable[[str, Dict[str, Any]], Any]) -> None:
+        # Replayed under the lock so no event is delivered twice or out of order
+        with self._lock:
+            for stage, data in self._events:
+                self._deliver(listener, stage, data)
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Callable[[str, Dict[str, Any]], Any]) -> None:
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def emit(self, stage: str, data: Dict[str, Any]) -> None:
+        with self._lock:
+            self._events.append((stage, data))
+            for listener in self._listeners:
+                self._deliver(listener, stage, data)
+
+    @staticmethod
+    def _deliver(listener, stage: str, data: Dict[str, Any]) -> None:
+        # One broken listener must not stop the run or the other listeners
+        try:
+            listener(stage, data)
+        except Exception as e:
+            logger.warning(f"Progress listener failed on '{stage}': {e}")
+
+
+class SharedLease:
+    """Cross-process counterpart of SingleFlight through a SQLite lease table.
+
+    Worker processes sharing the database run the work for a key only while
+    holding its lease; the others poll for the outcome instead. Held leases
+    are renewed in the background, so a lease outlives its ttl only while its
+    process is alive.
+    """
+
+    def __init__(self, db_path: str, ttl: float = 30, poll_interval: float = 0.5):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._held: Set[str] = set()
+        self._renewer: Optional[threading.Thread] = None
+        self._stats = {"acquired": 0, "waited": 0}
+        self._conn = self._connect()
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        """Open the lease table; without it every lease is granted"""
+        try:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""CREATE TABLE IF NOT EXISTS leases (
+                    key TEXT PRIMARY KEY,
+                    owner TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )""")
+            conn.commit()
+            return conn
+        except sqlite3.Error as e:
+            logger.warning(
+                f"Could not open lease database {self.db_path}: {e} - leases are per process"
+            )
+            return None
+
+    def run(
+        self, key: str, fn: Callable[[], Any], poll: Callable[[], Optional[Any]]
+    ) -> Any:
+        """Run fn() under the lease for key, or return poll()'s first non-None
+        value while another process holds it. When the holder finishes
+        without a result (or dies), the lease is taken over and fn() runs here.
+        """
+        waited = False
+        while not self._acquire(key):
+            if not waited:
+                waited = True
+                with self._lock:
+                    self._stats["waited"] += 1
+                logger.info(f"⏳ {key} is being processed by another worker, waiting")
+            result = poll()
+            if result is not None:
+                return result
+            time.sleep(self.poll_interval)
+
+        try:
+            return fn()
+        finally:
+            self._release(key)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["held"] = len(self._held)
+        return stats
+
+    def _acquire(self, key: str) -> bool:
+        with self._lock:
+            if self._conn is None:
+                acquired = True
+            else:
+                now = time.time()
+                try:
+                    cursor = self._conn.execute(
+                        """INSERT INTO leases (key, owner, expires_at) VALUES (?, ?, ?)
+                        ON CONFLICT(key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+                        WHERE leases.expires_at < ?""",
+                        (key, self.owner, now + self.ttl, now),
+                    )
+                    self._conn.commit()
+                    acquired = cursor.rowcount > 0
+                except sqlite3.Error as e:
+                    logger.warning(f"Lease error for {key}: {e}")
+                    acquired = True
+            if acquired:
+                self._stats["acquired"] += 1
+                self._held.add(key)
+                if self._conn is not None and self._renewer is None:
+                    self._renewer = threading.Thread(
+                        target=self._renew_forever, name="lease-renewer", daemon=True
+                    )
+                    self._renewer.start()
+        return acquired
+
+    def _release(self, key: str) -> None:
+        with self._lock:
+            self._held.discard(key)
+            if self._conn is None:
+                return
+            try:
+                self._conn.execute(
+                    "DELETE FROM leases WHERE key = ? AND owner = ?", (key, self.owner)
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Could not release lease {key}: {e}")
+
+    def _renew_forever(self) -> None:
+        while True:
+            time.sleep(self.ttl / 3)
+            with self._lock:
+                keys = list(self._held)
+                if not keys:
+                    continue
+                try:
+                    self._conn.executemany(
+                        "UPDATE leases SET expires_at = ? WHERE key = ? AND owner = ?",
+                        [(time.time() + self.ttl, key, self.owner) for key in keys],
+                    )
+                    self._conn.commit()
+                except sqlite3.Error as e:
+                    logger.warning(f"Could not renew leases: {e}")
@@ -1,4 +1,13 @@
 // Trip Advisor Frontend JavaScript
+
+// Heights (px) assumed for list rows until they have been rendered and measured
+const ESTIMATED_CARD_HEIGHT = 220;
+const ESTIMATED_HEADER_HEIGHT = 44;
+// Pixels of the list rendered above and below the visible part
+const LIST_OVERSCAN = 800;
+// Photo width requested for the full-screen gallery (cards use the default)
+const GALLERY_PHOTO_WIDTH = 800;
+
 class TripAdvisorApp {
     constructor() {
         this.places = [];
@@ -6,7 +15,17 @@ class TripAdvisorApp {
         this.currentFilter = 'all';
         this.currentSort = 'name';
         this.map = null;
-        this.markers = [];
+        this.clusterer = null;
+        this.infoWindow = null;
+        // Markers by place id, so streamed places only add what is new
+        this.markers = new Map();
+        this.renderScheduled = false;
+
+        // Windowed list: every row is known, only the visible ones are in the DOM
+        this.listRows = [];
+        this.rowHeights = new Map();
+        this.renderedRows = new Map();
+        this.listWindowScheduled = false;
         
         this.init();
     }
@@ -43,6 +62,15 @@ class TripAdvisorApp {
             this.currentSort = e.target.value;
             this.renderPlacesList();
         });
+
+        document.getElementById('filter-all').addEventListener('click', () => {
+            this.setFilter('all');
+        });
+
+        // Only the rows scrolled into view are rendered
+        document.getElementById('places-list').addEventListener('scroll', () => {
+            this.scheduleListWindow();
+        }, { passive: true });
     }
 
     async analyzeVideo() {
@@ -68,7 +96,7 @@ class TripAdvisorApp {
                 headers: {
                     'Content-Type': 'application/json',
                 },
-                body: JSON.stringify({ video_url: url })
+                body: JSON.stringify({ video_url: url, async: true })
             });
 
             const data = await response.json();
@@ -77,7 +105,10 @@ class TripAdvisorApp {
                 throw new Error(data.error || 'Wystąpił błąd podczas analizy filmu');
             }
 
-            this.places = data.places;
+            // Places are rendered as they stream in; the final list keeps the original order
+            this.videoId = data.video_id;
+            this.resetResults();
+            this.places = data.job_id ? await this.followJob(data) : data.places;
             this.renderResults();
             
         } catch (error) {
@@ -88,6 +119,101 @@ class TripAdvisorApp {
         }
     }
 
+    followJob(job) {
+        if (!window.EventSource) {
+            return this.pollJob(job.status_url);
+        }
+
+        return new Promise((resolve, reject) => {
+            const source = new EventSource(job.events_url);
+
+            source.addEventListener('transcript', () => {
+                this.setLoadingText('Szukam miejsc w transkrypcji...');
+            });
+
+            source.addEventListener('ai', (e) => {
+                const event = JSON.parse(e.data);
+                this.setLoadingText(`Znaleziono ${event.places_found} miejsc, szukam ich na mapie...`);
+            });
+
+            source.addEventListener('place', (e) => {
+                this.addStreamedPlace(JSON.parse(e.data).place);
+            });
+
+            source.addEventListener('done', (e) => {
+                source.close();
+                resolve(JSON.parse(e.data).places);
+            });
+
+            source.addEventListener('error', (e) => {
+                // Events sent by the server carry data; connection errors do not
+                if (e.data) {
+                    source.close();
+                    reject(new Error(JSON.parse(e.data).error));
+                } else if (source.readyState === EventSource.CLOSED) {
+                    reject(new Error('Utracono połączenie z serwerem'));
+                }
+            });
+        });
+    }
+
+    async pollJob(statusUrl) {
+        while (true) {
+            const response = await fetch(statusUrl);
+            const job = await response.json();
+
+            if (!response.ok || job.status === 'error') {
+                throw new Error(job.error || 'Wystąpił błąd podczas analizy filmu');
+            }
+            if (job.status === 'done') {
+                return job.places;
+            }
+
+            await new Promise(resolve => setTimeout(resolve, 1000));
+        }
+    }
+
+    addStreamedPlace(place) {
+        this.places.push(place);
+        document.getElementById('loading-state').classList.add('hidden');
+        this.scheduleRender();
+    }
+
+    scheduleRender() {
+        // Places arriving in the same frame are rendered together
+        if (this.renderScheduled) {
+            return;
+        }
+        this.renderScheduled = true;
+        requestAnimationFrame(() => {
+            this.renderScheduled = false;
+            this.renderResults();
+        });
+    }
+
+    resetResults() {
+        this.places = [];
+        this.markers.forEach(entry => entry.marker.setMap(null));
+        this.markers.clear();
+        if (this.clusterer) {
+            this.clusterer.clearMarkers();
+        }
+        if (this.infoWindow) {
+            this.infoWindow.close();
+        }
+        this.listRows = [];
+        this.rowHeights.clear();
+        this.renderedRows.clear();
+        document.getElementById('places-list').scrollTop = 0;
+    }
+
+    setLoadingText(text) {
+        const loadingText = document.querySelector('#loading-state span');
+        if (loadingText) {
+            loadingText.textContent = text;
+        }
+    }
+
     isValidYouTubeUrl(url) {
         const patterns = [
             /^https?:\/\/(www\.)?(youtube\.com\/watch\?v=|youtu\.be\/|youtube\.com\/embed\/)/,
@@ -107,6 +233,7 @@ class TripAdvisorApp {
 
     hideLoading() {
         document.getElementById('loading-state').classList.add('hidden');
+        this.setLoadingText('Analizuję film...');
         document.getElementById('analyze-btn').disabled = false;
         document.getElementById('analyze-btn').innerHTML = '<i class="fab fa-youtube mr-2"></i>Analizuj film';
     }
@@ -184,61 +311,94 @@ class TripAdvisorApp {
     initMap() {
         const mapElement = document.getElementById('map');
         
-        // Initialize map
-        this.map = new google.maps.Map(mapElement, {
-            center: { lat: 52.2297, lng: 21.0122 }, // Warsaw as default
-            zoom: 6,
-            mapTypeControl: true,
-            streetViewControl: true,
-            fullscreenControl: true,
-        });
+        // Initialize map once and reuse it while places stream in
+        if (!this.map) {
+            this.map = new google.maps.Map(mapElement, {
+                center: { lat: 52.2297, lng: 21.0122 }, // Warsaw as default
+                zoom: 6,
+                mapTypeControl: true,
+                streetViewControl: true,
+                fullscreenControl: true,
+            });
 
-        // Clear existing markers
-        this.markers.forEach(marker => marker.setMap(null));
-        this.markers = [];
+            // Nearby markers are grouped into clusters computed for the visible area only
+            if (window.markerClusterer) {
+                const algorithm = markerClusterer.SuperClusterViewportAlgorithm
+                    ? new markerClusterer.SuperClusterViewportAlgorithm({ maxZoom: 15 })
+                    : undefined;
+                this.clusterer = new markerClusterer.MarkerClusterer({ map: this.map, algorithm });
+            }
+        }
 
-        if (this.places.length > 0) {
-            const bounds = new google.maps.LatLngBounds();
-            
-            console.log(`Rendering ${this.places.length} places on map`);
-            
-            this.places.forEach((place, index) => {
-                console.log(`Place ${index}:`, place);
-                
-                if (place.coordinates && (place.coordinates.lat !== 0 || place.coordinates.lng !== 0)) {
-                    console.log(`Adding marker for ${place.name} at ${place.coordinates.lat}, ${place.coordinates.lng}`);
-                    
-                    const marker = new google.maps.Marker({
-                        position: place.coordinates,
-                        map: this.map,
-                        title: place.name,
-                        icon: this.getMarkerIcon(place.type)
-                    });
-
-                    const infoWindow = new google.maps.InfoWindow({
-                        content: this.createInfoWindowContent(place)
-                    });
-
-                    marker.addListener('click', () => {
-                        infoWindow.open(this.map, marker);
-                    });
-
-                    this.markers.push(marker);
-                    bounds.extend(place.coordinates);
-                } else {
-                    console.log(`Skipping ${place.name} - invalid coordinates:`, place.coordinates);
-                }
-            });
+        this.updateMarkers();
+    }
+
+    updateMarkers() {
+        // Add markers for new places and drop those merged away, keeping the rest
+        const bounds = new google.maps.LatLngBounds();
+        const current = new Set();
+        const added = [];
+
+        this.places.forEach(place => {
+            if (!this.hasCoordinates(place)) {
+                return;
+            }
+            current.add(place.id);
+            bounds.extend(place.coordinates);
+
+            const entry = this.markers.get(place.id);
+            if (entry) {
+                entry.place = place;
+                return;
+            }
 
-            console.log(`Total markers added: ${this.markers.length}`);
+            const marker = new google.maps.Marker({
+                position: place.coordinates,
+                map: this.clusterer ? null : this.map,
+                title: place.name,
+                icon: this.getMarkerIcon(place.type)
+            });
+            marker.addListener('click', () => {
+                this.openInfoWindow(this.markers.get(place.id).place, marker);
+            });
+            this.markers.set(place.id, { marker, place });
+            added.push(marker);
+        });
 
-            // Fit map to show all markers
-            if (this.markers.length > 0) {
-                this.map.fitBounds(bounds);
+        const removed = [];
+        this.markers.forEach((entry, id) => {
+            if (!current.has(id)) {
+                entry.marker.setMap(null);
+                removed.push(entry.marker);
+                this.markers.delete(id);
             }
+        });
+
+        if (this.clusterer && (added.length > 0 || removed.length > 0)) {
+            this.clusterer.removeMarkers(removed, true);
+            this.clusterer.addMarkers(added, true);
+            this.clusterer.render();
+        }
+
+        // Fit map to show all markers
+        if (added.length > 0 && current.size > 0) {
+            this.map.fitBounds(bounds);
         }
     }
 
+    openInfoWindow(place, marker) {
+        // One info window, filled in when a marker is clicked
+        if (!this.infoWindow) {
+            this.infoWindow = new google.maps.InfoWindow();
+        }
+        this.infoWindow.setContent(this.createInfoWindowContent(place));
+        this.infoWindow.open({ anchor: marker, map: this.map });
+    }
+
+    hasCoordinates(place) {
+        return Boolean(place.coordinates && (place.coordinates.lat !== 0 || place.coordinates.lng !== 0));
+    }
+
     getMarkerIcon(type) {
         const iconMap = {
             'park': 'https://maps.google.com/mapfiles/ms/icons/green-dot.png',
@@ -253,8 +413,6 @@ class TripAdvisorApp {
     }
 
     createInfoWindowContent(place) {
-        console.log(`Creating info window for place: ${place.name}, photos:`, place.photos);
-        
         const photosHtml = place.photos && place.photos.length > 0 ? `
             <div class="mb-3">
                 <div class="flex space-x-1 overflow-x-auto">
@@ -262,6 +420,10 @@ class TripAdvisorApp {
                         <img 
                             src="${photo}" 
                             alt="${place.name}" 
+                            loading="lazy"
+                            decoding="async"
+                            width="64"
+                            height="64"
                             class="w-16 h-16 object-cover rounded cursor-pointer hover:opacity-80"
                             onclick="window.openPhotoGallery('${place.id}')"
                         />
@@ -304,39 +466,40 @@ class TripAdvisorApp {
 
     generateFilterButtons() {
         const filterContainer = document.querySelector('#list-view .flex.flex-wrap.gap-2');
-        const existingButtons = filterContainer.querySelectorAll('button[id^="filter-"]');
-        existingButtons.forEach(btn => btn.remove());
 
         const typeCounts = {};
         this.places.forEach(place => {
             typeCounts[place.type] = (typeCounts[place.type] || 0) + 1;
         });
 
-        const typeIcons = {
-            'park': '🌳',
-            'mountains': '⛰️',
-            'sea': '🌊',
-            'city': '🏙️',
-            'monument': '🏛️',
-            'lake': '🏞️',
-            'other': '📍',
-        };
+        // Buttons are kept and only their counts updated as places stream in
+        filterContainer.querySelectorAll('button[id^="filter-"]').forEach(btn => {
+            if (btn.id !== 'filter-all' && !(btn.id.slice('filter-'.length) in typeCounts)) {
+                btn.remove();
+            }
+        });
 
         Object.entries(typeCounts).forEach(([type, count]) => {
-            const button = document.createElement('button');
-            button.id = `filter-${type}`;
-            button.className = 'px-3 py-1 rounded-full text-xs font-medium bg-gray-100 text-gray-600 hover:bg-gray-200';
-            button.innerHTML = `
-                <span>${typeIcons[type] || '📍'}</span>
-                <span class="capitalize ml-1">${type}</span>
-                <span>(${count})</span>
-            `;
-            
-            button.addEventListener('click', () => {
-                this.setFilter(type);
-            });
-            
-            filterContainer.appendChild(button);
+            let button = document.getElementById(`filter-${type}`);
+            if (!button) {
+                button = document.createElement('button');
+                button.id = `filter-${type}`;
+                button.className = type === this.currentFilter
+                    ? 'px-3 py-1 rounded-full text-xs font-medium bg-blue-100 text-blue-800'
+                    : 'px-3 py-1 rounded-full text-xs font-medium bg-gray-100 text-gray-600 hover:bg-gray-200';
+                button.innerHTML = `
+                    <span>${this.getTypeIcon(type)}</span>
+                    <span class="capitalize ml-1">${type}</span>
+                    <span data-role="count"></span>
+                `;
+
+                button.addEventListener('click', () => {
+                    this.setFilter(type);
+                });
+
+                filterContainer.appendChild(button);
+            }
+            button.querySelector('[data-role="count"]').textContent = `(${count})`;
         });
     }
 
@@ -353,13 +516,11 @@ class TripAdvisorApp {
             activeButton.className = 'px-3 py-1 rounded-full text-xs font-medium bg-blue-100 text-blue-800';
         }
         
+        document.getElementById('places-list').scrollTop = 0;
         this.renderPlacesList();
     }
 
     renderPlacesList() {
-        const placesList = document.getElementById('places-list');
-        placesList.innerHTML = '';
-
         let filteredPlaces = this.places;
         
         // Apply filter
@@ -367,8 +528,8 @@ class TripAdvisorApp {
             filteredPlaces = this.places.filter(place => place.type === this.currentFilter);
         }
 
-        // Apply sort
-        filteredPlaces.sort((a, b) => {
+        // Apply sort (on a copy, the map keeps the original order)
+        filteredPlaces = [...filteredPlaces].sort((a, b) => {
             switch (this.currentSort) {
                 case 'name':
                     return a.name.localeCompare(b.name);
@@ -381,17 +542,8 @@ class TripAdvisorApp {
             }
         });
 
-        if (filteredPlaces.length === 0) {
-            placesList.innerHTML = `
-                <div class="text-center py-8">
-                    <i class="fas fa-map-marker-alt text-gray-400 text-4xl mb-4"></i>
-                    <p class="text-gray-600">Brak miejsc do wyświetlenia dla wybranego filtra</p>
-                </div>
-            `;
-            return;
-        }
-
-        // Group by type if showing all
+        // Flatten into rows: a header per type when showing all, then its cards
+        const rows = [];
         if (this.currentFilter === 'all') {
             const grouped = {};
             filteredPlaces.forEach(place => {
@@ -402,36 +554,139 @@ class TripAdvisorApp {
             });
 
             Object.entries(grouped).forEach(([type, places]) => {
-                const typeSection = document.createElement('div');
-                typeSection.className = 'space-y-3';
-                
-                const typeHeader = document.createElement('div');
-                typeHeader.className = 'flex items-center space-x-2';
-                typeHeader.innerHTML = `
-                    <span class="text-lg">${this.getTypeIcon(type)}</span>
-                    <h3 class="text-lg font-semibold text-gray-900 capitalize">
-                        ${type} (${places.length})
-                    </h3>
-                `;
-                
-                typeSection.appendChild(typeHeader);
-                
-                places.forEach(place => {
-                    typeSection.appendChild(this.createPlaceCard(place));
-                });
-                
-                placesList.appendChild(typeSection);
+                rows.push({ key: `type:${type}:${places.length}`, type, count: places.length });
+                places.forEach(place => rows.push({ key: `place:${place.id}`, place }));
             });
         } else {
-            filteredPlaces.forEach(place => {
-                placesList.appendChild(this.createPlaceCard(place));
-            });
+            filteredPlaces.forEach(place => rows.push({ key: `place:${place.id}`, place }));
         }
+
+        this.listRows = rows;
+        this.renderListWindow();
+    }
+
+    scheduleListWindow() {
+        if (this.listWindowScheduled) {
+            return;
+        }
+        this.listWindowScheduled = true;
+        requestAnimationFrame(() => {
+            this.listWindowScheduled = false;
+            this.renderListWindow();
+        });
+    }
+
+    renderListWindow() {
+        // Render only the rows near the visible part of the list; spacers stand in for the rest
+        const placesList = document.getElementById('places-list');
+
+        if (this.listRows.length === 0) {
+            this.renderedRows.clear();
+            placesList.innerHTML = `
+                <div class="text-center py-8">
+                    <i class="fas fa-map-marker-alt text-gray-400 text-4xl mb-4"></i>
+                    <p class="text-gray-600">Brak miejsc do wyświetlenia dla wybranego filtra</p>
+                </div>
+            `;
+            return;
+        }
+
+        let topSpacer = placesList.querySelector('[data-role="top-spacer"]');
+        let rowsHost = placesList.querySelector('[data-role="rows"]');
+        let bottomSpacer = placesList.querySelector('[data-role="bottom-spacer"]');
+        if (!rowsHost) {
+            placesList.innerHTML = '';
+            topSpacer = document.createElement('div');
+            topSpacer.dataset.role = 'top-spacer';
+            rowsHost = document.createElement('div');
+            rowsHost.dataset.role = 'rows';
+            bottomSpacer = document.createElement('div');
+            bottomSpacer.dataset.role = 'bottom-spacer';
+            placesList.append(topSpacer, rowsHost, bottomSpacer);
+        }
+
+        const viewportHeight = placesList.clientHeight;
+        const viewTop = placesList.scrollTop - LIST_OVERSCAN;
+        const viewBottom = placesList.scrollTop + placesList.clientHeight + LIST_OVERSCAN;
+
+        let offset = 0;
+        let start = 0;
+        while (start < this.listRows.length && offset + this.rowHeight(this.listRows[start]) < viewTop) {
+            offset += this.rowHeight(this.listRows[start]);
+            start++;
+        }
+        let end = start;
+        let windowBottom = offset;
+        while (end < this.listRows.length && windowBottom < viewBottom) {
+            windowBottom += this.rowHeight(this.listRows[end]);
+            end++;
+        }
+
+        // Reuse elements of rows that stay visible, create the rest
+        const visible = new Map();
+        const elements = [];
+        this.listRows.slice(start, end).forEach(row => {
+            const rendered = this.renderedRows.get(row.key);
+            const element = rendered && rendered.row.place === row.place
+                ? rendered.element
+                : this.createListRow(row);
+            visible.set(row.key, { row, element });
+            elements.push(element);
+        });
+        this.renderedRows = visible;
+        rowsHost.replaceChildren(...elements);
+
+        // Remember real heights so the spacers match the rows they replace
+        visible.forEach(({ row, element }) => {
+            if (element.offsetHeight > 0) {
+                this.rowHeights.set(row.key, element.offsetHeight);
+            }
+        });
+
+        let total = 0;
+        let before = 0;
+        this.listRows.forEach((row, index) => {
+            const height = this.rowHeight(row);
+            if (index < start) {
+                before += height;
+            }
+            total += height;
+        });
+        let rendered = 0;
+        visible.forEach(({ row }) => {
+            rendered += this.rowHeight(row);
+        });
+        topSpacer.style.height = `${before}px`;
+        bottomSpacer.style.height = `${Math.max(0, total - before - rendered)}px`;
+
+        // The list grows until it reaches its maximum height; fill the new space
+        if (placesList.clientHeight !== viewportHeight) {
+            this.scheduleListWindow();
+        }
+    }
+
+    rowHeight(row) {
+        return this.rowHeights.get(row.key) || (row.place ? ESTIMATED_CARD_HEIGHT : ESTIMATED_HEADER_HEIGHT);
+    }
+
+    createListRow(row) {
+        const element = document.createElement('div');
+        if (row.place) {
+            element.className = 'pb-4';
+            element.appendChild(this.createPlaceCard(row.place));
+        } else {
+            element.className = 'flex items-center space-x-2 pb-3 pt-2';
+            element.innerHTML = `
+                <span class="text-lg">${this.getTypeIcon(row.type)}</span>
+                <h3 class="text-lg font-semibold text-gray-900 capitalize">
+                    ${row.type} (${row.count})
+                </h3>
+            `;
+        }
+        return element;
     }
 
     createPlaceCard(place) {
-        console.log(`Creating card for place: ${place.name}, photos:`, place.photos);
-        
         const photosHtml = place.photos && place.photos.length > 0 ? `
             <div class="mb-3">
                 <div class="flex space-x-2 overflow-x-auto">
@@ -439,6 +694,10 @@ class TripAdvisorApp {
                         <img 
                             src="${photo}" 
                             alt="${place.name}" 
+                            loading="lazy"
+                            decoding="async"
+                            width="80"
+                            height="80"
                             class="w-20 h-20 object-cover rounded cursor-pointer hover:opacity-80 flex-shrink-0"
                             onclick="window.openPhotoGallery('${place.id}')"
                         />
@@ -453,9 +712,10 @@ class TripAdvisorApp {
         ` : '';
 
         const googleMapsUrl = this.getGoogleMapsUrl(place);
+        const videoMomentUrl = this.getVideoMomentUrl(place);
 
         const card = document.createElement('div');
-        card.className = 'bg-white border border-gray-200 rounded-lg p-4 hover:shadow-md transition-shadow fade-in';
+        card.className = 'bg-white border border-gray-200 rounded-lg p-4 hover:shadow-md transition-shadow';
         
         card.innerHTML = `
             <div class="flex flex-col sm:flex-row sm:items-start sm:justify-between gap-4">
@@ -499,6 +759,16 @@ class TripAdvisorApp {
                             <i class="fas fa-bookmark mr-2"></i>Zapisz w Google Maps
                         </button>
                     ` : ''}
+                    ${videoMomentUrl ? `
+                        <a
+                            href="${videoMomentUrl}"
+                            target="_blank"
+                            rel="noopener noreferrer"
+                            class="inline-flex items-center px-3 py-1.5 rounded-md text-sm font-medium bg-red-50 text-red-700 hover:bg-red-100 transition-colors"
+                        >
+                            <i class="fab fa-youtube mr-2"></i>${this.formatTimestamp(place.timestamp)} w filmie
+                        </a>
+                    ` : ''}
                     ${place.website ? `
                         <a
                             href="${place.website}"
@@ -544,6 +814,20 @@ class TripAdvisorApp {
         return null;
     }
 
+    getVideoMomentUrl(place) {
+        if (!this.videoId || typeof place.timestamp !== 'number') {
+            return null;
+        }
+        return `https://www.youtube.com/watch?v=${encodeURIComponent(this.videoId)}&t=${Math.floor(place.timestamp)}s`;
+    }
+
+    formatTimestamp(seconds) {
+        const total = Math.floor(seconds);
+        const minutes = Math.floor(total / 60);
+        const secs = String(total % 60).padStart(2, '0');
+        return `${minutes}:${secs}`;
+    }
+
     getTypeIcon(type) {
         const iconMap = {
             'park': '🌳',
@@ -593,10 +877,12 @@ class TripAdvisorApp {
             place.photos.forEach((photo, index) => {
                 const imgContainer = document.createElement('div');
                 imgContainer.className = 'flex-shrink-0 w-full h-full flex items-center justify-center';
+                // Loaded only when shown (see updateGalleryDisplay)
                 imgContainer.innerHTML = `
                     <img 
-                        src="${photo}" 
+                        data-src="${this.getPhotoUrl(photo, GALLERY_PHOTO_WIDTH)}" 
                         alt="${place.name} - Zdjęcie ${index + 1}" 
+                        decoding="async"
                         class="max-w-full max-h-full object-contain"
                     />
                 `;
@@ -735,9 +1021,13 @@ class TripAdvisorApp {
             nextBtn.disabled = this.currentPhotoIndex === this.currentPlace.photos.length - 1;
         }
 
-        // Update image display
+        // Update image display, loading the current photo and preloading the next one
         const imageContainers = modalImages.querySelectorAll('div');
         imageContainers.forEach((container, index) => {
+            const img = container.querySelector('img');
+            if (img && !img.src && (index === this.currentPhotoIndex || index === this.currentPhotoIndex + 1)) {
+                img.src = img.dataset.src;
+            }
             if (index === this.currentPhotoIndex) {
                 container.classList.remove('hidden');
             } else {
@@ -745,6 +1035,11 @@ class TripAdvisorApp {
             }
         });
     }
+
+    getPhotoUrl(photo, width) {
+        // Proxied photos (/api/photos/...?w=) can be requested in another size
+        return photo.replace(/([?&]w=)\d+/, `$1${width}`);
+    }
 }
 
 // Global function to open photo gallery
@@ -0,0 +1,5 @@
+import os
+import tempfile
+
+# Keep every on-disk cache of modules imported by the tests out of the checkout
+os.environ["CACHE_DIR"] = tempfile.mkdtemp(prefix="trip-advisor-tests-")
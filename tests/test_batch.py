@@ -0,0 +1,61 @@
+import io
+import json
+import sys
+
+import pytest
+
+import batch
+import cli
+from batch import BatchInputError, parse_limit
+
+
+@pytest.mark.parametrize("value, expected", [(None, None), (5, 5), ("12", 12)])
+def test_parse_limit_accepts_positive_integers(value, expected):
+    assert parse_limit(value) == expected
+
+
+@pytest.mark.parametrize("value", [0, -1, "ten", "1.5", 2.5, True, [3], {}])
+def test_parse_limit_rejects_everything_else(value):
+    with pytest.raises(BatchInputError):
+        parse_limit(value)
+
+
+@pytest.fixture
+def client():
+    from app import create_app
+
+    return create_app(prewarm=False).test_client()
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        {"video_urls": ["https://youtu.be/abc"], "limit": "many"},
+        {"video_urls": ["https://youtu.be/abc"], "limit": -2},
+        {"video_urls": "https://youtu.be/abc"},
+        {"video_urls": [42]},
+        [],
+    ],
+)
+def test_batch_endpoint_rejects_invalid_input_with_400(client, body):
+    response = client.post("/api/analyze/batch", json=body)
+
+    assert response.status_code == 400
+    assert response.get_json()["error"]
+
+
+def test_cli_reads_urls_from_stdin_without_closing_it(monkeypatch, capsys):
+    received = {}
+
+    def fake_run_batch(video_urls, **kwargs):
+        received["video_urls"] = video_urls
+        yield {"type": "summary", "total": len(video_urls)}
+
+    monkeypatch.setattr(batch, "run_batch", fake_run_batch)
+    stdin = io.StringIO("https://youtu.be/a\n\nhttps://youtu.be/b\n")
+    monkeypatch.setattr(sys, "stdin", stdin)
+
+    assert cli.main(["--file", "-"]) == 0
+    assert received["video_urls"] == ["https://youtu.be/a", "https://youtu.be/b"]
+    assert not stdin.closed
+    assert json.loads(capsys.readouterr().out)["total"] == 2
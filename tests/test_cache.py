@@ -0,0 +1,88 @@
+import sqlite3
+import time
+
+import cache
+from cache import MISSING, PersistentCache
+
+
+def disk_rows(db_path, namespace):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(
+            "SELECT COUNT(*) FROM cache WHERE namespace = ?", (namespace,)
+        ).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_values_survive_a_new_instance(tmp_path):
+    db_path = str(tmp_path / "cache.sqlite3")
+    PersistentCache("geocode", db_path).set("rome", {"lat": 41.9})
+
+    assert PersistentCache("geocode", db_path).get("rome") == {"lat": 41.9}
+    assert PersistentCache("places", db_path).get("rome") is MISSING
+
+
+def test_none_is_a_negative_entry_with_its_own_ttl(tmp_path):
+    store = PersistentCache(
+        "geocode", str(tmp_path / "cache.sqlite3"), ttl=60, negative_ttl=-1
+    )
+    store.set("nowhere", None)
+    store.set("rome", None)
+    store.set("rome", "found")
+
+    assert store.get("nowhere") is MISSING
+    assert store.get("rome") == "found"
+
+
+def test_memory_tier_is_bounded(tmp_path):
+    store = PersistentCache(
+        "geocode", str(tmp_path / "cache.sqlite3"), max_memory_entries=2
+    )
+    for key in "abc":
+        store.set(key, key)
+
+    assert store.stats()["memory_entries"] == 2
+    # The evicted entry is still served from disk
+    assert store.get("a") == "a"
+    assert store.stats()["disk_hits"] == 1
+
+
+def test_expired_rows_are_purged_on_open(tmp_path):
+    db_path = str(tmp_path / "cache.sqlite3")
+    store = PersistentCache("geocode", db_path, ttl=-1)
+    store.set("old", "value")
+    PersistentCache("places", db_path).set("other", "value")
+    assert disk_rows(db_path, "geocode") == 1
+
+    PersistentCache("geocode", db_path)
+
+    assert disk_rows(db_path, "geocode") == 0
+    assert disk_rows(db_path, "places") == 1
+
+
+def test_disk_tier_is_bounded_by_max_disk_entries(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "PURGE_EVERY_WRITES", 5)
+    db_path = str(tmp_path / "cache.sqlite3")
+    store = PersistentCache("geocode", db_path, ttl=3600, max_disk_entries=3)
+    for i in range(10):
+        store.set(f"key{i}", i)
+        time.sleep(0.001)
+
+    assert disk_rows(db_path, "geocode") <= 5
+    store.purge()
+    assert disk_rows(db_path, "geocode") == 3
+    # The most recently written rows are the ones kept
+    fresh = PersistentCache("geocode", db_path)
+    assert [fresh.get(f"key{i}") for i in range(7, 10)] == [7, 8, 9]
+    assert fresh.get("key0") is MISSING
+
+
+def test_preload_fills_the_memory_tier(tmp_path):
+    db_path = str(tmp_path / "cache.sqlite3")
+    PersistentCache("geocode", db_path).set("rome", "value")
+
+    store = PersistentCache("geocode", db_path)
+    assert store.preload() == 1
+    assert store.get("rome") == "value"
+    assert store.stats()["memory_hits"] == 1
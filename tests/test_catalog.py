@@ -0,0 +1,90 @@
+import random
+
+import pytest
+
+from catalog import PlaceCatalog, haversine_meters
+from models import Coordinates, Place
+
+
+def make_place(index, lat, lng):
+    return Place(
+        id=f"p{index}",
+        name=f"Place {index}",
+        description="",
+        type="other",
+        coordinates=Coordinates(lat, lng),
+        google_place_id=f"g{index}",
+    )
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    return PlaceCatalog(str(tmp_path / "catalog.sqlite3"))
+
+
+def test_nearby_matches_a_brute_force_search(catalog):
+    rng = random.Random(1)
+    points = [
+        (50.06 + rng.uniform(-0.2, 0.2), 19.94 + rng.uniform(-0.3, 0.3))
+        for _ in range(3000)
+    ]
+    catalog.add_places(
+        [make_place(i, lat, lng) for i, (lat, lng) in enumerate(points)], "v1"
+    )
+
+    found = catalog.nearby(50.06, 19.94, 10000, limit=25)
+
+    expected = sorted(
+        (haversine_meters(50.06, 19.94, lat, lng), f"g{i}")
+        for i, (lat, lng) in enumerate(points)
+    )[:25]
+    assert [place["id"] for place in found] == [pid for _, pid in expected]
+    distances = [place["distance_m"] for place in found]
+    assert distances == sorted(distances)
+
+
+def test_nearby_respects_the_radius(catalog):
+    catalog.add_places([make_place(0, 50.0, 20.0), make_place(1, 50.0, 20.1)], "v1")
+
+    assert [p["id"] for p in catalog.nearby(50.0, 20.0, 5000)] == ["g0"]
+    assert [p["id"] for p in catalog.nearby(50.0, 20.0, 50000)] == ["g0", "g1"]
+
+
+def test_nearby_crosses_the_antimeridian(catalog):
+    catalog.add_places(
+        [make_place(0, -17.0, 179.99), make_place(1, -17.0, -179.99)], "v1"
+    )
+
+    found = catalog.nearby(-17.0, 179.995, 5000)
+    assert sorted(p["id"] for p in found) == ["g0", "g1"]
+
+
+def test_nearby_skips_places_only_seen_in_the_excluded_video(catalog):
+    catalog.add_places([make_place(0, 50.0, 20.0)], "v1")
+    catalog.add_places([make_place(1, 50.0, 20.001)], "v2")
+
+    found = catalog.nearby(50.0, 20.0, 1000, exclude_video_id="v1")
+    assert [p["id"] for p in found] == ["g1"]
+    assert found[0]["videos"][0]["video_id"] == "v2"
+
+
+def test_places_without_location_or_id_are_not_cataloged(catalog):
+    place = make_place(0, 0, 0)
+    unnamed = make_place(1, 50.0, 20.0)
+    unnamed.google_place_id = None
+
+    assert catalog.add_places([place, unnamed], "v1") == 0
+
+
+def test_within_bbox_across_the_antimeridian(catalog):
+    catalog.add_places(
+        [
+            make_place(0, -17.0, 179.5),
+            make_place(1, -17.0, -179.5),
+            make_place(2, -17.0, 0.0),
+        ],
+        "v1",
+    )
+
+    found = catalog.within_bbox(-18, 179, -16, -179)
+    assert sorted(p["id"] for p in found) == ["g0", "g1"]
@@ -0,0 +1,122 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from analyzer import EnrichmentSession, YouTubeAnalyzer
+from models import Coordinates, Place
+
+
+class StubAnalyzer:
+    """The parts of YouTubeAnalyzer an EnrichmentSession uses, with the
+    Google lookup replaced by a function of the place
+    """
+
+    _enrich_place_or_fallback = YouTubeAnalyzer._enrich_place_or_fallback
+    _resolve_locally = YouTubeAnalyzer._resolve_locally
+    _create_place_without_coordinates = (
+        YouTubeAnalyzer._create_place_without_coordinates
+    )
+    gazetteer = None
+
+    def __init__(self, lookup):
+        self.lookup = lookup
+        self.looked_up = []
+        self.enrichment_executor = ThreadPoolExecutor(max_workers=8)
+        self._lock = threading.Lock()
+
+    def _enrich_single_place(self, place, index, bias=None):
+        with self._lock:
+            self.looked_up.append(place["name"])
+        return self.lookup(place, index)
+
+
+def found(place, index):
+    return Place(
+        id=f"place_{index}",
+        name=place["name"],
+        description=place.get("description", ""),
+        type=place.get("type", "other"),
+        coordinates=Coordinates(lat=50.0 + index, lng=19.0),
+    )
+
+
+@pytest.fixture
+def analyzer():
+    analyzer = StubAnalyzer(found)
+    yield analyzer
+    analyzer.enrichment_executor.shutdown(wait=True)
+
+
+def test_places_come_back_in_input_order(analyzer):
+    def slow_first(place, index):
+        # The first places finish last
+        time.sleep(0.05 * (3 - index))
+        return found(place, index)
+
+    analyzer.lookup = slow_first
+    places = [{"name": name} for name in ("Wawel", "Rynek", "Kazimierz")]
+
+    enriched = EnrichmentSession(analyzer).finish(places)
+
+    assert [place.name for place in enriched] == ["Wawel", "Rynek", "Kazimierz"]
+
+
+def test_repeated_names_share_one_lookup(analyzer):
+    session = EnrichmentSession(analyzer)
+    first = session.add({"name": "Wawel Castle", "type": "castle"})
+    again = session.add({"name": "wawel  castle", "type": "castle"})
+
+    enriched = session.finish(
+        [{"name": "Wawel Castle", "type": "castle"}, {"name": "Rynek"}]
+    )
+
+    assert first is again
+    assert sorted(analyzer.looked_up) == ["Rynek", "Wawel Castle"]
+    assert [place.name for place in enriched] == ["Wawel Castle", "Rynek"]
+
+
+def test_progress_reports_each_place_once(analyzer):
+    events = []
+    lock = threading.Lock()
+
+    def progress(stage, data):
+        with lock:
+            events.append((stage, data["index"], data["total"], data["place"].name))
+
+    places = [{"name": "Wawel"}, {"name": "Rynek"}, {"name": "Wawel"}]
+    EnrichmentSession(analyzer, progress, total=2).finish(places)
+    # Done callbacks may still be running in the pool
+    analyzer.enrichment_executor.shutdown(wait=True)
+
+    assert sorted(events) == [("place", 0, 2, "Wawel"), ("place", 1, 2, "Rynek")]
+
+
+def test_a_failing_lookup_does_not_sink_the_batch(analyzer):
+    def flaky(place, index):
+        if place["name"] == "Rynek":
+            raise RuntimeError("upstream timeout")
+        return found(place, index)
+
+    analyzer.lookup = flaky
+    places = [{"name": "Wawel"}, {"name": "Rynek", "description": "Main square"}]
+
+    enriched = EnrichmentSession(analyzer).finish(places)
+
+    assert [place.name for place in enriched] == ["Wawel", "Rynek"]
+    assert enriched[0].coordinates.lat == 50.0
+    assert (enriched[1].coordinates.lat, enriched[1].coordinates.lng) == (0.0, 0.0)
+    assert enriched[1].description == "Main square"
+
+
+def test_final_list_details_are_merged_into_streamed_places(analyzer):
+    session = EnrichmentSession(analyzer)
+    session.add({"name": "Wawel", "type": "other"})
+
+    enriched = session.finish(
+        [{"name": "Wawel", "type": "castle", "description": "Royal castle on a hill"}]
+    )
+
+    assert enriched[0].type == "castle"
+    assert enriched[0].description == "Royal castle on a hill"
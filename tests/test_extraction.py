@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+from extraction import PlaceStreamParser, estimate_tokens, split_transcript
+
+COMPLETION = json.dumps(
+    {
+        "region": "Lesser Poland",
+        "places": [
+            {"name": "Wawel", "type": "monument", "description": 'The "royal" castle'},
+            {"name": "Kraków {Old Town}", "type": "city", "description": "[centre]"},
+        ],
+        "summary": "A day in Kraków",
+    },
+    ensure_ascii=False,
+)
+
+
+def feed_in_pieces(parser, text, size):
+    found = []
+    for start in range(0, len(text), size):
+        found.append(parser.feed(text[start : start + size]))
+    return found
+
+
+@pytest.mark.parametrize("size", [1, 3, 17, len(COMPLETION)])
+def test_stream_parser_yields_places_as_they_complete(size):
+    parser = PlaceStreamParser()
+    found = feed_in_pieces(parser, f"```json\n{COMPLETION}\n```", size)
+
+    assert [p["name"] for pieces in found for p in pieces] == [
+        "Wawel",
+        "Kraków {Old Town}",
+    ]
+    assert parser.places == json.loads(COMPLETION)["places"]
+    assert parser.fields == {"region": "Lesser Poland", "summary": "A day in Kraków"}
+    assert parser.complete
+    assert parser.invalid == 0
+
+
+def test_first_place_is_returned_before_the_completion_ends():
+    parser = PlaceStreamParser()
+    cut = COMPLETION.index("Kraków {Old")
+
+    assert [p["name"] for p in parser.feed(COMPLETION[:cut])] == ["Wawel"]
+    assert not parser.complete
+
+
+def test_invalid_place_objects_are_counted_and_skipped():
+    parser = PlaceStreamParser()
+    parser.feed('{"places": [{"name": "A",}, {"name": "B"}]}')
+
+    assert [p["name"] for p in parser.places] == ["B"]
+    assert parser.invalid == 1
+
+
+def test_short_transcripts_are_not_split():
+    assert split_transcript("a few words", chunk_tokens=100) == ["a few words"]
+
+
+def test_chunks_respect_the_budget_and_overlap():
+    words = [f"word{i}" for i in range(2000)]
+    chunks = split_transcript(" ".join(words), chunk_tokens=500, overlap_tokens=50)
+
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 500 for chunk in chunks)
+    for previous, following in zip(chunks, chunks[1:]):
+        assert following.split()[0] in previous.split()
+    # Every word is in some chunk
+    assert set(words) == {word for chunk in chunks for word in chunk.split()}
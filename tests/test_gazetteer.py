@@ -0,0 +1,122 @@
+import sqlite3
+import threading
+
+import pytest
+
+from gazetteer import Gazetteer
+
+
+def geonames_row(place_id, name, lat, lng, feature, population=0, aliases=""):
+    feature_class, feature_code = feature.split(".")
+    fields = [""] * 19
+    fields[0] = str(place_id)
+    fields[1] = name
+    fields[2] = name
+    fields[3] = aliases
+    fields[4] = str(lat)
+    fields[5] = str(lng)
+    fields[6] = feature_class
+    fields[7] = feature_code
+    fields[8] = "XX"
+    fields[14] = str(population)
+    return "\t".join(fields)
+
+
+@pytest.fixture
+def dump(tmp_path):
+    path = tmp_path / "cities.txt"
+    path.write_text(
+        "\n".join(
+            [
+                geonames_row(1, "Kraków", 50.06, 19.94, "P.PPLA", 770000, "Cracow"),
+                geonames_row(2, "Paris", 48.85, 2.35, "P.PPLC", 2100000),
+                geonames_row(3, "Paris", 33.66, -95.55, "P.PPLA2", 25000),
+                geonames_row(4, "Springfield", 39.8, -89.6, "P.PPLA", 114000),
+                geonames_row(5, "Springfield", 37.2, -93.3, "P.PPLA2", 169000),
+                geonames_row(6, "Lake Garda", 45.6, 10.6, "H.LK"),
+                geonames_row(7, "Some Road", 1, 1, "R.RD"),
+            ]
+        )
+        + "\n",
+        encoding="utf-8",
+    )
+    return str(path)
+
+
+@pytest.fixture
+def index(tmp_path, dump):
+    db_path = str(tmp_path / "gazetteer.sqlite3")
+    Gazetteer.open(db_path, dump).close()
+    gazetteer = Gazetteer.open_readonly(db_path)
+    yield gazetteer
+    gazetteer.close()
+
+
+def test_exact_and_alternate_names_resolve(index):
+    assert index.resolve("Krakow").id == 1
+    assert index.resolve("Cracow").name == "Kraków"
+    assert index.resolve("lake garda", "lake").type == "lake"
+    assert index.resolve("Some Road") is None
+
+
+def test_population_decides_between_namesakes(index):
+    assert index.resolve("Paris").country == "XX"
+    assert index.resolve("Paris").id == 2
+    # Similar populations: ambiguous unless the region settles it
+    assert index.resolve("Springfield") is None
+    bias = {
+        "rectangle": {
+            "low": {"latitude": 36, "longitude": -95},
+            "high": {"latitude": 38, "longitude": -92},
+        }
+    }
+    assert index.resolve("Springfield", bias=bias).id == 5
+
+
+def test_misspellings_match_fuzzily(index):
+    match = index.resolve("Lake Gardda")
+    assert match.id == 6
+    assert not match.exact
+
+
+def test_knows_is_exact(index):
+    assert index.knows("Cracow")
+    assert not index.knows("Lake Gardda")
+
+
+def test_readonly_index_is_not_written(index):
+    with pytest.raises(sqlite3.OperationalError):
+        index._conn.execute("DELETE FROM gazetteer_places")
+
+
+def test_readonly_open_without_an_import_returns_none(tmp_path):
+    db_path = str(tmp_path / "gazetteer.sqlite3")
+    assert Gazetteer.open_readonly(db_path) is None
+
+    Gazetteer(db_path).close()
+    assert Gazetteer.open_readonly(db_path) is None
+
+
+def test_concurrent_opens_import_once(tmp_path, dump, monkeypatch):
+    db_path = str(tmp_path / "gazetteer.sqlite3")
+    loads = []
+    load = Gazetteer.load
+
+    def counting_load(self, path):
+        loads.append(path)
+        return load(self, path)
+
+    monkeypatch.setattr(Gazetteer, "load", counting_load)
+    threads = [
+        threading.Thread(target=lambda: Gazetteer.open(db_path, dump).close())
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+
+    assert len(loads) == 1
+    # Unchanged dump: not imported again
+    Gazetteer.open(db_path, dump).close()
+    assert len(loads) == 1
@@ -0,0 +1,87 @@
+import httpx
+import pytest
+
+from http_client import CircuitBreaker, CircuitOpenError, HttpClient
+
+
+def make_client(handler, **kwargs):
+    kwargs.setdefault("backoff_base", 0)
+    client = HttpClient(**kwargs)
+    client._client = httpx.Client(transport=httpx.MockTransport(handler))
+    client.register("api", "http://upstream.test")
+    return client
+
+
+def test_transient_statuses_are_retried():
+    statuses = iter([503, 429, 200])
+    client = make_client(lambda request: httpx.Response(next(statuses)))
+
+    assert client.get("api", "/ping").status_code == 200
+    stats = client.stats()["api"]
+    assert stats["requests"] == 3
+    assert stats["retries"] == 2
+    assert stats["circuit"] == CircuitBreaker.CLOSED
+
+
+def test_last_error_response_is_returned_after_the_retries():
+    client = make_client(lambda request: httpx.Response(500), max_retries=1)
+
+    assert client.get("api", "/ping").status_code == 500
+    assert client.stats()["api"]["requests"] == 2
+
+
+def test_client_errors_are_not_retried():
+    client = make_client(lambda request: httpx.Response(404))
+
+    assert client.get("api", "/missing").status_code == 404
+    assert client.stats()["api"]["requests"] == 1
+
+
+def test_breaker_opens_after_consecutive_failures():
+    def refuse(request):
+        raise httpx.ConnectError("refused", request=request)
+
+    client = make_client(refuse, max_retries=0, failure_threshold=2)
+    for _ in range(2):
+        with pytest.raises(httpx.ConnectError):
+            client.get("api", "/ping")
+
+    with pytest.raises(CircuitOpenError):
+        client.get("api", "/ping")
+    assert client.stats()["api"]["rejected"] == 1
+
+
+def test_half_open_trial_failing_with_any_exception_reopens_the_breaker():
+    calls = []
+
+    def broken(request):
+        calls.append(request)
+        raise ValueError("not a transport error")
+
+    client = make_client(broken, max_retries=0, failure_threshold=1)
+    breaker = client.upstreams["api"].breaker
+    breaker.record_failure()
+    breaker.opened_at -= breaker.reset_timeout
+
+    with pytest.raises(ValueError):
+        client.get("api", "/ping")
+    assert breaker.state == CircuitBreaker.OPEN
+
+    # The failed trial is finished: once the timeout passes again a new one is let through
+    breaker.opened_at -= breaker.reset_timeout
+    client._client = httpx.Client(
+        transport=httpx.MockTransport(lambda r: httpx.Response(200))
+    )
+    assert client.get("api", "/ping").status_code == 200
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert len(calls) == 1
+
+
+def test_only_one_trial_call_while_half_open():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.allow()
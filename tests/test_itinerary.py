@@ -0,0 +1,81 @@
+import pytest
+
+from itinerary import coordinates_of, place_key, plan_itinerary
+
+
+def place(name, lat, lng, **extra):
+    return {"name": name, "coordinates": {"lat": lat, "lng": lng}, **extra}
+
+
+KRAKOW = [
+    place("Wawel", 50.054, 19.935),
+    place("Rynek", 50.061, 19.937),
+    place("Kazimierz", 50.051, 19.944),
+    place("Zakrzówek", 50.037, 19.911),
+]
+
+
+def test_coordinates_of_skips_missing_and_null_island():
+    assert coordinates_of(place("Wawel", 50, 19.9)) == (50.0, 19.9)
+    assert coordinates_of({"name": "Somewhere"}) is None
+    assert coordinates_of(place("Fallback", 0, 0)) is None
+
+
+@pytest.mark.parametrize(
+    "coordinates",
+    [
+        {"lat": "north", "lng": 19.9},
+        {"lat": True, "lng": 19.9},
+        {"lat": 91, "lng": 19.9},
+        {"lat": 50, "lng": -181},
+        {"lat": float("nan"), "lng": 19.9},
+        [50, 19.9],
+    ],
+)
+def test_coordinates_of_rejects_invalid_coordinates(coordinates):
+    with pytest.raises(ValueError):
+        coordinates_of({"name": "Wawel", "coordinates": coordinates})
+
+
+def test_place_key_falls_back_to_name_and_location():
+    assert place_key(place("Wawel", 50, 19.9, id="w1")) == "w1"
+    assert place_key(place("Wawel", 50, 19.9)) != place_key(place("Rynek", 50, 19.9))
+    assert place_key(place("Wawel", 50, 19.9)) == place_key(place("Wawel", 50, 19.9))
+
+
+def test_plan_visits_every_located_place_once():
+    plan = plan_itinerary(KRAKOW + [{"name": "Nowhere"}], days=2, time_budget=0.1)
+
+    names = [stop["name"] for day in plan["days"] for stop in day["places"]]
+    assert sorted(names) == sorted(p["name"] for p in KRAKOW)
+    assert plan["skipped"] == [{"id": None, "name": "Nowhere"}]
+    assert plan["distance_meters"] == sum(d["distance_meters"] for d in plan["days"])
+
+
+@pytest.fixture
+def client():
+    from app import create_app
+
+    return create_app(prewarm=False).test_client()
+
+
+@pytest.mark.parametrize(
+    "places",
+    [
+        [place("Wawel", "50.05", 19.93)],
+        [place("Wawel", 50.05, 200)],
+        [{"name": "Wawel", "coordinates": "here"}],
+    ],
+)
+def test_itinerary_endpoint_rejects_invalid_coordinates_with_400(client, places):
+    response = client.post("/api/itinerary", json={"places": places})
+
+    assert response.status_code == 400
+    assert "Wawel" in response.get_json()["error"]
+
+
+def test_itinerary_endpoint_keeps_places_without_ids_apart(client):
+    response = client.post("/api/itinerary", json={"places": KRAKOW + KRAKOW[:1]})
+
+    assert response.status_code == 200
+    assert response.get_json()["count"] == len(KRAKOW)
@@ -0,0 +1,150 @@
+import json
+import threading
+import time
+
+import pytest
+
+import routes
+import service
+from jobs import DONE, ERROR, JobManager
+
+
+@pytest.fixture
+def manager(tmp_path):
+    return JobManager(max_workers=2, db_path=str(tmp_path / "state.sqlite3"))
+
+
+def wait_finished(job, timeout=2.0):
+    events, finished = job.wait_for_events(0, timeout)
+    while not finished:
+        events, finished = job.wait_for_events(len(events), timeout)
+    return job
+
+
+def test_a_job_reports_progress_and_its_result(manager):
+    def analysis(progress):
+        progress("ai", {"places_found": 2})
+        progress("place", {"index": 0, "place": {"name": "Wawel"}})
+        progress("place", {"index": 1, "place": {"name": "Rynek"}})
+        return [{"name": "Wawel"}, {"name": "Rynek"}]
+
+    job = wait_finished(manager.submit("video", "key", analysis))
+
+    assert job.status == DONE
+    assert [event["stage"] for event in job.events] == [
+        "running",
+        "ai",
+        "place",
+        "place",
+        DONE,
+    ]
+    status = job.to_dict()
+    assert (status["places_done"], status["places_total"]) == (2, 2)
+    assert status["places"] == [{"name": "Wawel"}, {"name": "Rynek"}]
+
+
+def test_a_failed_job_reports_the_error(manager):
+    def analysis(progress):
+        raise RuntimeError("transcript unavailable")
+
+    job = wait_finished(manager.submit("video", "key", analysis))
+
+    assert job.status == ERROR
+    assert job.error == "transcript unavailable"
+    assert job.events[-1] == {
+        "id": 1,
+        "stage": ERROR,
+        "error": "transcript unavailable",
+    }
+    assert manager.stats()["active"] == 0
+
+
+def test_duplicate_submissions_share_the_running_job(manager):
+    release = threading.Event()
+
+    def analysis(progress):
+        release.wait(2)
+        return []
+
+    first = manager.submit("video", "key", analysis)
+    second = manager.submit("video", "key", analysis)
+    release.set()
+
+    assert first is second
+    assert wait_finished(first).status == DONE
+
+
+def test_jobs_are_visible_to_other_worker_processes(manager, tmp_path):
+    job = wait_finished(manager.submit("video", "key", lambda progress: [{"n": 1}]))
+    other = JobManager(db_path=str(tmp_path / "state.sqlite3"))
+
+    stored = other.get(job.id)
+
+    assert stored is not job
+    assert stored.status == DONE
+    assert stored.result == [{"n": 1}]
+    assert [event["stage"] for event in stored.events] == ["running", DONE]
+    assert other.get("unknown") is None
+
+
+def test_completed_jobs_replay_stored_places(manager):
+    job = manager.completed("video", "key", [{"name": "Wawel"}])
+
+    assert job.status == DONE
+    assert [event["stage"] for event in job.events] == ["place", DONE]
+    assert manager.get(job.id) is job
+
+
+def test_job_events_are_streamed_as_server_sent_events(manager, monkeypatch):
+    from app import create_app
+
+    monkeypatch.setattr(routes, "_job_manager", manager)
+    job = wait_finished(manager.completed("video", "key", [{"name": "Wawel"}]))
+    client = create_app(prewarm=False).test_client()
+
+    response = client.get(f"/api/jobs/{job.id}/events")
+    frames = [frame for frame in response.get_data(as_text=True).split("\n\n") if frame]
+
+    assert response.mimetype == "text/event-stream"
+    assert frames[0].startswith("id: 0\nevent: place\ndata: ")
+    assert json.loads(frames[1].split("data: ", 1)[1])["stage"] == DONE
+
+    resumed = client.get(f"/api/jobs/{job.id}/events", headers={"Last-Event-ID": "0"})
+    assert resumed.get_data(as_text=True).startswith("id: 1\nevent: done")
+
+
+def test_callers_joining_a_running_analysis_get_its_progress(monkeypatch):
+    started = threading.Event()
+    release = threading.Event()
+
+    def pipeline(video_id, cache_key, progress):
+        progress("ai", {"places_found": 2})
+        started.set()
+        release.wait(2)
+        progress("place", {"index": 0})
+        progress("place", {"index": 1})
+        return ["result"]
+
+    monkeypatch.setattr(service, "_run_leased", pipeline)
+    seen = {"leader": [], "follower": []}
+    results = {}
+
+    def call(name):
+        results[name] = service.run_analysis(
+            "video", "coalesced", lambda stage, data: seen[name].append(stage)
+        )
+
+    leader = threading.Thread(target=call, args=("leader",))
+    leader.start()
+    assert started.wait(2)
+    follower = threading.Thread(target=call, args=("follower",))
+    follower.start()
+    while service._progress["coalesced"].listeners < 2:
+        time.sleep(0.01)
+    release.set()
+    leader.join()
+    follower.join()
+
+    assert results == {"leader": ["result"], "follower": ["result"]}
+    assert seen["follower"] == seen["leader"] == ["ai", "place", "place"]
+    assert "coalesced" not in service._progress
@@ -0,0 +1,116 @@
+import pytest
+
+from cache import PersistentCache
+from llm_backends import (
+    BackendChain,
+    BackendUnavailable,
+    CachedBackend,
+    ExtractionBackend,
+    OpenAIBackend,
+    RuleBackend,
+    parse_extraction,
+)
+from metrics import FALLBACKS
+
+
+class FakeBackend(ExtractionBackend):
+    def __init__(self, name, places=None, error=None):
+        self.name = name
+        self.places = places or []
+        self.error = error
+        self.calls = 0
+
+    def extract(self, transcript, messages, on_place=None, on_region=None):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        for place in self.places:
+            if on_place:
+                on_place(place)
+        return {"places": [dict(p) for p in self.places], "region": "Tuscany"}
+
+
+def fallbacks(kind):
+    return FALLBACKS._values.get((kind,), 0)
+
+
+def test_parse_extraction_strips_fences_and_fixes_types():
+    analysis = parse_extraction(
+        '```json\n{"places": [{"name": "Uffizi", "type": "gallery"}], "region": " "}\n```'
+    )
+
+    assert analysis == {"places": [{"name": "Uffizi", "type": "other"}], "region": None}
+
+
+def test_chain_falls_back_when_a_backend_fails():
+    chain = BackendChain(
+        [
+            FakeBackend("openai", error=RuntimeError("timeout")),
+            FakeBackend("rules", [{"name": "Lake Como"}]),
+        ]
+    )
+    before = fallbacks("llm_openai_failed")
+
+    analysis = chain.extract("text", [])
+
+    assert analysis["backend"] == "rules"
+    assert analysis["degraded"]
+    assert fallbacks("llm_openai_failed") == before + 1
+
+
+def test_missing_openai_key_is_reported_when_rules_serve_instead(caplog):
+    chain = BackendChain(
+        [OpenAIBackend(None, "model"), FakeBackend("rules", [{"name": "Lake Como"}])]
+    )
+    before = fallbacks("llm_openai_unavailable")
+
+    analysis = chain.extract("text", [])
+
+    assert analysis["backend"] == "rules"
+    assert analysis["degraded"]
+    assert fallbacks("llm_openai_unavailable") == before + 1
+    assert "'openai' is not configured" in caplog.text
+
+
+def test_chain_without_available_backends_raises():
+    with pytest.raises(BackendUnavailable):
+        BackendChain([OpenAIBackend(None, "model")]).extract("text", [])
+
+
+def test_cached_answers_are_replayed_through_the_callbacks(tmp_path):
+    backend = FakeBackend("openai", [{"name": "Duomo", "type": "monument"}])
+    cache = PersistentCache("llm", str(tmp_path / "cache.sqlite3"))
+    cached = CachedBackend(backend, cache)
+    cached.extract("text", [{"role": "user", "content": "x"}])
+
+    seen = []
+    analysis = cached.extract(
+        "text", [{"role": "user", "content": "x"}], on_place=seen.append
+    )
+
+    assert backend.calls == 1
+    assert seen == analysis["places"] == [{"name": "Duomo", "type": "monument"}]
+    # Callers may annotate the answer without changing the cache
+    analysis["places"][0]["timestamp"] = 1
+    assert (
+        "timestamp"
+        not in cached.extract("text", [{"role": "user", "content": "x"}])["places"][0]
+    )
+    cached.extract("other text", [])
+    assert backend.calls == 2
+
+
+def test_rule_backend_keeps_names_with_place_keywords():
+    analysis = RuleBackend().extract(
+        "We met Anna. Then we sailed on Lake Como and saw Sforza Castle.", []
+    )
+
+    assert [p["name"] for p in analysis["places"]] == ["Lake Como", "Sforza Castle"]
+
+
+def test_a_backend_without_extract_cannot_be_created():
+    class Incomplete(ExtractionBackend):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
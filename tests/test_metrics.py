@@ -0,0 +1,54 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from metrics import Registry, finish_trace, get_trace, propagate, span, start_trace
+
+
+def test_counter_renders_labelled_samples():
+    registry = Registry()
+    counter = registry.counter("lookups_total", "Lookups", labelnames=("result",))
+    counter.inc(result="hit")
+    counter.inc(2, result="hit")
+    counter.inc(result='mi"ss')
+
+    text = registry.render()
+    assert "# TYPE trip_advisor_lookups_total counter" in text
+    assert 'trip_advisor_lookups_total{result="hit"} 3' in text
+    assert 'trip_advisor_lookups_total{result="mi\\"ss"} 1' in text
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    histogram = registry.histogram("size", "Sizes", buckets=(1, 10))
+    for value in (0.5, 5, 5, 50):
+        histogram.observe(value)
+
+    lines = registry.render().splitlines()
+    assert 'trip_advisor_size_bucket{le="1.0"} 1' in lines
+    assert 'trip_advisor_size_bucket{le="10.0"} 3' in lines
+    assert 'trip_advisor_size_bucket{le="+Inf"} 4' in lines
+    assert "trip_advisor_size_sum 60.5" in lines
+    assert "trip_advisor_size_count 4" in lines
+
+
+def test_spans_on_worker_threads_land_in_the_callers_trace():
+    trace, token = start_trace()
+    try:
+        with span("outer"):
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                for name in ("a", "b"):
+                    executor.submit(propagate(lambda name=name: _child(name)))
+        with pytest.raises(ValueError):
+            with span("failing"):
+                raise ValueError
+    finally:
+        finish_trace(trace, token)
+
+    spans = {s["name"]: s["outcome"] for s in get_trace(trace.id).to_dict()["spans"]}
+    assert spans == {"outer": "ok", "a": "ok", "b": "ok", "failing": "error"}
+
+
+def _child(name):
+    with span(name):
+        pass
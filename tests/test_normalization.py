@@ -0,0 +1,110 @@
+import pytest
+
+from models import Coordinates, Place
+from normalization import (
+    collapse_places,
+    dedupe_places,
+    names_match,
+    normalize_place_name,
+)
+
+THRESHOLD = 0.88
+
+
+@pytest.mark.parametrize(
+    "name, key",
+    [
+        ("The Colosseum", "colosseum"),
+        ("Kraków  Old-Town", "krakow old town"),
+        ("St. Peter’s Basilica", "st peters basilica"),
+        ("Fish & Chips", "fish and chips"),
+        ("The", "the"),
+    ],
+)
+def test_normalize_place_name(name, key):
+    assert normalize_place_name(name) == key
+
+
+@pytest.mark.parametrize(
+    "a, b, type_a, type_b",
+    [
+        ("colosseum", "colosseum", "monument", "monument"),
+        ("wawel castle", "wawel", "monument", "monument"),
+        ("new york city", "new york", "city", "city"),
+        ("lake garda", "garda", "lake", "lake"),
+        ("colloseum", "colosseum", "monument", "other"),
+    ],
+)
+def test_names_that_match(a, b, type_a, type_b):
+    assert names_match(a, b, type_a, type_b, THRESHOLD)
+
+
+@pytest.mark.parametrize(
+    "a, b, type_a, type_b",
+    [
+        ("york", "new york", "city", "city"),
+        ("paris", "paris texas", "city", "city"),
+        ("washington", "washington dc", "city", "city"),
+        ("como", "lake como", "city", "lake"),
+        ("rome colosseum", "colosseum", "monument", "monument"),
+        ("krakow", "wawel", None, None),
+        ("colloseum", "colosseum", "monument", "city"),
+    ],
+)
+def test_different_places_do_not_match(a, b, type_a, type_b):
+    assert not names_match(a, b, type_a, type_b, THRESHOLD)
+
+
+def test_dedupe_keeps_distinct_places_of_the_same_type():
+    places = dedupe_places(
+        [
+            {"name": "New York", "type": "city", "description": "Big apple"},
+            {"name": "York", "type": "city", "description": "Minster"},
+            {"name": "the Wawel Castle", "type": "monument", "description": ""},
+            {"name": "Wawel", "type": "monument", "description": "Royal castle"},
+        ],
+        THRESHOLD,
+    )
+
+    assert [(p["name"], p["description"]) for p in places] == [
+        ("New York", "Big apple"),
+        ("York", "Minster"),
+        ("the Wawel Castle", "Royal castle"),
+    ]
+
+
+def make_place(name, lat, lng, place_type="monument", google_place_id=None):
+    return Place(
+        id=name,
+        name=name,
+        description="",
+        type=place_type,
+        coordinates=Coordinates(lat, lng),
+        google_place_id=google_place_id,
+    )
+
+
+def test_collapse_merges_by_location_and_place_id():
+    places = collapse_places(
+        [
+            make_place("Rome Colosseum", 41.8902, 12.4922),
+            make_place("Colosseum", 41.8903, 12.4923),
+            make_place("Pantheon", 41.8986, 12.4769, google_place_id="pantheon"),
+            make_place("The Pantheon", 0, 0, google_place_id="pantheon"),
+        ],
+        radius_meters=50,
+    )
+
+    assert [p.name for p in places] == ["Rome Colosseum", "Pantheon"]
+
+
+def test_collapse_keeps_distant_namesakes_apart():
+    places = collapse_places(
+        [
+            make_place("York", 53.96, -1.08, "city"),
+            make_place("New York", 40.71, -74.0, "city"),
+        ],
+        radius_meters=50,
+    )
+
+    assert len(places) == 2
@@ -0,0 +1,95 @@
+import os
+
+import pytest
+
+import photos
+from photos import PhotoStore, proxy_photo_url
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\0" * 90
+NAME = "places/abc/photos/ref1"
+
+
+class Upstream:
+    def __init__(self, missing=()):
+        self.missing = set(missing)
+        self.calls = []
+
+    def __call__(self, photo_name, width):
+        self.calls.append((photo_name, width))
+        if photo_name in self.missing:
+            return None
+        return PNG
+
+
+@pytest.fixture(autouse=True)
+def without_pillow(monkeypatch):
+    # Every width is fetched, so fetch counts do not depend on Pillow
+    monkeypatch.setattr(photos, "PILLOW_AVAILABLE", False)
+
+
+def make_store(tmp_path, upstream, **kwargs):
+    return PhotoStore(str(tmp_path), upstream, widths=[200, 400], **kwargs)
+
+
+def test_a_photo_is_fetched_once_and_then_served_from_disk(tmp_path):
+    upstream = Upstream()
+    store = make_store(tmp_path, upstream)
+
+    first = store.get(NAME, 200)
+    second = store.get(NAME, 200)
+
+    assert upstream.calls == [(NAME, 200)]
+    assert first.path == second.path and first.mimetype == "image/png"
+    stats = store.stats()
+    assert (stats["misses"], stats["hits"], stats["bytes"]) == (1, 1, len(PNG))
+    # A new store finds the file on disk
+    assert make_store(tmp_path, upstream).stats()["bytes"] == len(PNG)
+
+
+def test_rewriting_a_photo_does_not_count_its_bytes_twice(tmp_path):
+    store = make_store(tmp_path, Upstream())
+    path = store._path(NAME, 200)
+
+    store._write(path, PNG)
+    store._write(path, PNG)
+
+    assert store.stats()["bytes"] == len(PNG)
+
+
+def test_least_recently_served_photos_are_evicted(tmp_path):
+    store = make_store(tmp_path, Upstream(), max_bytes=len(PNG) * 3 - 1)
+    oldest = store.get("places/abc/photos/old", 200)
+    os.utime(oldest.path, (1, 1))
+    store.get("places/abc/photos/mid", 200)
+    store.get("places/abc/photos/new", 200)
+
+    assert not os.path.exists(oldest.path)
+    assert store.stats()["evictions"] == 1
+    assert store.stats()["bytes"] == len(PNG) * 2
+
+
+def test_missing_photos_are_remembered(tmp_path):
+    upstream = Upstream(missing={NAME})
+    store = make_store(tmp_path, upstream)
+
+    assert store.get(NAME, 200) is None
+    assert store.get(NAME, 400) is None
+    assert upstream.calls == [(NAME, 200)]
+    assert store.stats()["negative_hits"] == 1
+
+
+def test_expired_negative_entries_are_fetched_again(tmp_path):
+    upstream = Upstream(missing={NAME})
+    store = make_store(tmp_path, upstream, negative_ttl=-1)
+
+    store.get(NAME, 200)
+    store.get(NAME, 200)
+
+    assert len(upstream.calls) == 2
+
+
+def test_upstream_urls_are_rewritten_to_the_proxy():
+    url = "https://places.googleapis.com/v1/places/abc/photos/ref1/media?key=k&maxWidthPx=400"
+
+    assert proxy_photo_url(url) == "/api/photos/places/abc/photos/ref1?w=400"
+    assert proxy_photo_url("https://example.com/a.jpg") == "https://example.com/a.jpg"
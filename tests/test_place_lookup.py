@@ -0,0 +1,177 @@
+import json
+
+import httpx
+import pytest
+
+import analyzer as analyzer_module
+from analyzer import PLACES_LOOKUP_FIELD_MASK, YouTubeAnalyzer
+from gazetteer import Gazetteer
+from metrics import FALLBACKS
+from tests.test_gazetteer import geonames_row
+
+WAWEL = {
+    "id": "ChIJwawel",
+    "location": {"latitude": 50.054, "longitude": 19.935},
+    "formattedAddress": "Wawel 5, 31-001 Kraków, Poland",
+    "rating": 4.8,
+    "websiteUri": "https://wawel.krakow.pl/",
+    "photos": [
+        {"name": "places/ChIJwawel/photos/p1"},
+        {"name": "places/ChIJwawel/photos/p2"},
+    ],
+}
+
+GEOCODED = {
+    "place_id": "ChIJgeocoded",
+    "formatted_address": "Kraków, Poland",
+    "geometry": {"location": {"lat": 50.06, "lng": 19.94}},
+}
+
+
+class Upstream:
+    """Places Text Search and Geocoding answers, recording every request"""
+
+    def __init__(self, places=None, geocode=None):
+        self.places = places or []
+        self.geocode = geocode
+        self.requests = []
+
+    def __call__(self, request):
+        self.requests.append(request)
+        if request.url.path == "/v1/places:searchText":
+            return httpx.Response(200, json={"places": self.places})
+        if request.url.path == "/maps/api/geocode/json":
+            if self.geocode is None:
+                return httpx.Response(
+                    200, json={"status": "ZERO_RESULTS", "results": []}
+                )
+            return httpx.Response(200, json={"status": "OK", "results": [self.geocode]})
+        return httpx.Response(404)
+
+    def paths(self):
+        return [request.url.path for request in self.requests]
+
+
+@pytest.fixture
+def make_analyzer(monkeypatch):
+    monkeypatch.setattr(analyzer_module, "ENRICHMENT_MODE", "places")
+
+    def make(upstream):
+        analyzer = YouTubeAnalyzer()
+        analyzer.google_maps_api_key = "test-key"
+        analyzer.gazetteer = None
+        for cache in (
+            analyzer.geocode_cache,
+            analyzer.places_cache,
+            analyzer.place_lookup_cache,
+        ):
+            cache.clear()
+        analyzer.http._client = httpx.Client(transport=httpx.MockTransport(upstream))
+        return analyzer
+
+    return make
+
+
+@pytest.fixture
+def gazetteer(tmp_path):
+    dump = tmp_path / "cities.txt"
+    dump.write_text(
+        geonames_row(6, "Lake Garda", 45.6, 10.6, "H.LK") + "\n", encoding="utf-8"
+    )
+    gazetteer = Gazetteer.open(str(tmp_path / "gazetteer.sqlite3"), str(dump))
+    yield gazetteer
+    gazetteer.close()
+
+
+def test_one_places_call_fills_every_field(make_analyzer):
+    upstream = Upstream(places=[WAWEL])
+    analyzer = make_analyzer(upstream)
+
+    place = analyzer._enrich_single_place(
+        {"name": "Wawel Castle", "type": "castle", "description": "Royal castle"}, 0
+    )
+
+    assert upstream.paths() == ["/v1/places:searchText"]
+    request = upstream.requests[0]
+    assert request.headers["X-Goog-FieldMask"] == PLACES_LOOKUP_FIELD_MASK
+    assert json.loads(request.content) == {
+        "textQuery": "Wawel Castle",
+        "maxResultCount": 1,
+    }
+    assert (place.id, place.google_place_id) == ("ChIJwawel", "ChIJwawel")
+    assert (place.coordinates.lat, place.coordinates.lng) == (50.054, 19.935)
+    assert place.address == "Wawel 5, 31-001 Kraków, Poland"
+    assert place.rating == 4.8
+    assert place.website == "https://wawel.krakow.pl/"
+    assert (place.name, place.type, place.description) == (
+        "Wawel Castle",
+        "castle",
+        "Royal castle",
+    )
+    assert len(place.photos) == 2
+    assert place.photo_url == place.photos[0]
+    assert place.photo_url.startswith("/api/photos/places/ChIJwawel/photos/p1?w=")
+
+
+def test_lookups_are_cached_per_name_and_bias(make_analyzer):
+    upstream = Upstream(places=[WAWEL])
+    analyzer = make_analyzer(upstream)
+    bias = {
+        "circle": {"center": {"latitude": 50.0, "longitude": 19.9}, "radius": 5000.0}
+    }
+
+    analyzer._lookup_place("Wawel Castle")
+    analyzer._lookup_place("  wawel castle ")
+    analyzer._lookup_place("Wawel Castle", bias)
+    analyzer._lookup_place("Wawel Castle", bias)
+
+    assert len(upstream.requests) == 2
+    assert "locationBias" not in json.loads(upstream.requests[0].content)
+    assert json.loads(upstream.requests[1].content)["locationBias"] == bias
+
+
+def test_geocoding_is_used_when_places_finds_nothing(make_analyzer):
+    upstream = Upstream(places=[], geocode=GEOCODED)
+    analyzer = make_analyzer(upstream)
+    before = FALLBACKS._values.get(("places_lookup_to_geocode",), 0)
+
+    place = analyzer._enrich_single_place({"name": "Old Town Kraków"}, 3)
+    again = analyzer._enrich_single_place({"name": "Old Town Kraków"}, 3)
+
+    assert upstream.paths() == ["/v1/places:searchText", "/maps/api/geocode/json"]
+    assert (place.coordinates.lat, place.coordinates.lng) == (50.06, 19.94)
+    assert place.google_place_id == "ChIJgeocoded"
+    assert place.address == "Kraków, Poland"
+    assert place.photos == []
+    assert again.coordinates.lat == 50.06
+    assert FALLBACKS._values[("places_lookup_to_geocode",)] == before + 2
+
+
+def test_a_place_neither_api_knows_is_not_enriched(make_analyzer):
+    upstream = Upstream()
+    analyzer = make_analyzer(upstream)
+
+    assert analyzer._enrich_single_place({"name": "Nowhere Special"}, 0) is None
+
+
+def test_an_exact_gazetteer_name_skips_the_apis(make_analyzer, gazetteer):
+    upstream = Upstream(places=[WAWEL])
+    analyzer = make_analyzer(upstream)
+    analyzer.gazetteer = gazetteer
+
+    place = analyzer._enrich_single_place({"name": "Lake Garda", "type": "lake"}, 0)
+
+    assert upstream.requests == []
+    assert (place.coordinates.lat, place.coordinates.lng) == (45.6, 10.6)
+
+
+def test_a_fuzzy_gazetteer_match_is_left_to_the_apis(make_analyzer, gazetteer):
+    upstream = Upstream(places=[WAWEL])
+    analyzer = make_analyzer(upstream)
+    analyzer.gazetteer = gazetteer
+
+    place = analyzer._enrich_single_place({"name": "Lake Gardda", "type": "lake"}, 0)
+
+    assert upstream.paths() == ["/v1/places:searchText"]
+    assert place.google_place_id == "ChIJwawel"
+    assert (place.coordinates.lat, place.coordinates.lng) == (50.054, 19.935)
@@ -0,0 +1,73 @@
+from prefilter import PASSAGE_SEPARATOR, Prefilter, split_sentences
+
+CHATTER = "so yeah we had a really good time and the weather was fine."
+
+
+def transcript(*sentences, filler=20):
+    return " ".join([CHATTER] * filler + list(sentences) + [CHATTER] * filler)
+
+
+def test_split_sentences_cuts_unpunctuated_captions():
+    assert split_sentences("One. Two!\nThree") == ["One.", "Two!", "Three"]
+    assert len(split_sentences("word " * 100, max_words=40)) == 3
+
+
+def test_short_transcripts_are_kept_whole():
+    text = transcript("We walked around Lake Bled.")
+
+    result = Prefilter(min_tokens=10_000).apply(text)
+
+    assert result.text == text
+    assert result.kept_ratio == 1.0
+
+
+def test_uncased_captions_are_kept_whole():
+    text = transcript("then we walked around lake bled and ate cake", filler=40)
+
+    assert Prefilter(min_tokens=0).apply(text).text == text
+
+
+def test_chatter_is_dropped_and_places_kept_with_context():
+    text = transcript(
+        "Before that we had breakfast.",
+        "Then we drove to Lake Bled in the morning.",
+        "It was quiet.",
+    )
+
+    result = Prefilter(min_tokens=0, context=1).apply(text)
+
+    assert "Lake Bled" in result.text
+    assert "Before that we had breakfast." in result.text
+    assert "It was quiet." in result.text
+    assert result.kept_sentences == 3
+    assert result.kept_ratio < 0.2
+
+
+def test_separate_mentions_become_separate_passages():
+    text = transcript(
+        "We stayed in Ljubljana.",
+        *[CHATTER] * 5,
+        "Then the castle in Bled.",
+    )
+
+    result = Prefilter(min_tokens=0, context=0).apply(text)
+
+    assert result.text.split(PASSAGE_SEPARATOR) == [
+        "We stayed in Ljubljana.",
+        "Then the castle in Bled.",
+    ]
+
+
+def test_sentence_starts_do_not_count_as_names():
+    prefilter = Prefilter()
+
+    assert prefilter.score("Honestly it was fine.") == 0
+    assert prefilter.score("I think it was fine.") == 0
+    assert prefilter.score("We ate near the Old Town.") > 0
+
+
+def test_names_the_gazetteer_knows_score_higher():
+    plain = Prefilter()
+    gazetteer = Prefilter(known_name=lambda name: name == "Bled")
+
+    assert gazetteer.score("We went to Bled.") == plain.score("We went to Bled.") + 2
@@ -0,0 +1,118 @@
+import threading
+
+import pytest
+
+import result_store
+from result_store import ResultStore
+
+PLACES = [{"id": "1", "name": "Wawel"}]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(result_store, "time", clock)
+    return clock
+
+
+def make_store(tmp_path, **kwargs):
+    kwargs.setdefault("ttl", 100)
+    kwargs.setdefault("stale_ttl", 50)
+    return ResultStore(str(tmp_path / "results.sqlite3"), **kwargs)
+
+
+def test_results_are_fresh_then_stale_then_expired(tmp_path, clock):
+    store = make_store(tmp_path)
+    store.put("k", "video", PLACES)
+
+    clock.now += 99
+    fresh = store.get("k")
+    assert fresh.places == PLACES and not fresh.stale
+
+    clock.now += 1
+    assert store.get("k").stale
+
+    clock.now += 50
+    assert store.get("k") is None
+    assert store.get("missing") is None
+
+    stats = store.stats()
+    assert (stats["fresh_hits"], stats["stale_hits"], stats["misses"]) == (1, 1, 2)
+
+
+def test_results_survive_a_restart(tmp_path, clock):
+    make_store(tmp_path).put("k", "video", PLACES)
+
+    assert make_store(tmp_path).get("k").places == PLACES
+
+
+def test_keys_depend_on_the_pipeline_version():
+    assert ResultStore.key_for("video", "1") != ResultStore.key_for("video", "2")
+    assert ResultStore.key_for("video", "1") == ResultStore.key_for("video", "1")
+
+
+def test_stored_since_only_sees_newer_results(tmp_path, clock):
+    store = make_store(tmp_path)
+    store.put("k", "video", PLACES)
+
+    assert store.stored_since("k", clock.now) == PLACES
+    assert store.stored_since("k", clock.now + 1) is None
+    assert store.stats()["misses"] == 0
+
+
+def test_least_recently_read_results_are_evicted(tmp_path, clock):
+    store = make_store(tmp_path, max_entries=2)
+    for key in ("a", "b"):
+        store.put(key, key, PLACES)
+        clock.now += 1
+    store.get("a")
+    clock.now += 1
+
+    store.put("c", "c", PLACES)
+
+    assert store.get("b") is None
+    assert store.get("a") and store.get("c")
+    assert store.stats()["evictions"] == 1
+    assert store.stats()["entries"] == 2
+
+
+def test_revalidation_runs_once_per_key(tmp_path):
+    store = make_store(tmp_path)
+    release = threading.Event()
+    done = threading.Event()
+    calls = []
+
+    def refresh():
+        calls.append(1)
+        release.wait(2)
+        done.set()
+
+    assert store.revalidate("k", refresh)
+    assert not store.revalidate("k", refresh)
+    assert store.stats()["refreshing"] == 1
+    release.set()
+    assert done.wait(2)
+
+    store._refresh_executor.shutdown(wait=True)
+    assert calls == [1]
+    assert store.stats()["refreshing"] == 0
+
+
+def test_a_failed_revalidation_can_be_retried(tmp_path):
+    store = make_store(tmp_path)
+
+    def refresh():
+        raise RuntimeError("upstream down")
+
+    assert store.revalidate("k", refresh)
+    store._refresh_executor.shutdown(wait=True)
+
+    assert store.stats()["refreshing"] == 0
@@ -0,0 +1,96 @@
+import threading
+import time
+
+import pytest
+
+from scheduler import (
+    BULK,
+    INTERACTIVE,
+    Budget,
+    Overloaded,
+    Scheduler,
+    current_priority,
+    priority,
+)
+
+
+def acquire_in_thread(budget, cls, timeout=2.0):
+    done = threading.Event()
+
+    def run():
+        with priority(cls):
+            budget.acquire()
+        done.set()
+
+    threading.Thread(target=run, daemon=True).start()
+    return done.wait(timeout)
+
+
+@pytest.mark.parametrize("share, rate", [(1 / 4, 2), (1, 1), (1 / 8, 0.5)])
+def test_bulk_acquires_with_small_rates_and_shares(share, rate):
+    budget = Scheduler(share=share).budget("transcripts", rate)
+
+    assert acquire_in_thread(budget, BULK)
+
+
+def test_bulk_acquires_when_the_reserve_exceeds_the_burst():
+    budget = Budget("transcripts", rate=0.5, burst=1, reserve=0.5)
+
+    assert acquire_in_thread(budget, BULK)
+
+
+def test_bulk_leaves_the_reserve_for_interactive_callers():
+    budget = Budget("places", rate=0.01, burst=4, reserve=0.25)
+
+    with priority(BULK):
+        for _ in range(3):
+            assert budget.acquire() < 0.1
+    assert not acquire_in_thread(budget, BULK, timeout=0.2)
+    assert budget.acquire() < 0.1
+
+
+def test_interactive_work_is_shed_when_saturated():
+    scheduler = Scheduler(max_in_flight={INTERACTIVE: 1, BULK: 1})
+
+    with scheduler.admit(INTERACTIVE):
+        assert current_priority() == INTERACTIVE
+        with pytest.raises(Overloaded) as excinfo:
+            with scheduler.admit(INTERACTIVE):
+                pass
+    assert excinfo.value.retry_after >= 1
+    assert scheduler.stats()["classes"][INTERACTIVE]["shed"] == 1
+
+
+def test_run_admits_work_in_its_priority_class():
+    scheduler = Scheduler()
+
+    assert scheduler.run(BULK, current_priority) == BULK
+    assert current_priority() == INTERACTIVE
+
+
+def test_concurrent_admissions_never_exceed_max_in_flight():
+    scheduler = Scheduler(max_in_flight={INTERACTIVE: 3, BULK: 1})
+    start = threading.Barrier(20)
+    release = threading.Event()
+    admitted = []
+
+    def request():
+        start.wait()
+        try:
+            with scheduler.admit(INTERACTIVE):
+                admitted.append(1)
+                release.wait(2)
+        except Overloaded:
+            pass
+
+    threads = [threading.Thread(target=request) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.2)
+    in_flight = scheduler.stats()["classes"][INTERACTIVE]["in_flight"]
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert in_flight == len(admitted) == 3
+    assert scheduler.stats()["classes"][INTERACTIVE]["shed"] == 17
@@ -0,0 +1,65 @@
+import json
+
+import msgpack
+
+from serialization import from_columnar, pack_msgpack, to_columnar
+
+PHOTO = "/api/photos/places/{}/photos/ref?w=400"
+
+PLACES = [
+    {
+        "id": "1",
+        "name": "Wawel",
+        "type": "castle",
+        "coordinates": {"lat": 50.054, "lng": 19.935},
+        "rating": 4.8,
+        "photo_url": PHOTO.format("a"),
+        "photos": [PHOTO.format("a"), PHOTO.format("b")],
+    },
+    {
+        "id": "2",
+        "name": "Rynek",
+        "type": "square",
+        "coordinates": None,
+        "rating": None,
+        "photo_url": PHOTO.format("x"),
+        "photos": None,
+    },
+    {
+        "id": "3",
+        "name": "Kazimierz",
+        "type": "castle",
+        "coordinates": {"lat": None, "lng": None},
+        "photos": [],
+        "website": "https://example.com",
+    },
+]
+
+
+def test_columnar_round_trip_restores_every_place():
+    payload = to_columnar(PLACES)
+
+    assert from_columnar(payload) == PLACES
+    # The payload survives JSON, as served by the API
+    assert from_columnar(json.loads(json.dumps(payload))) == PLACES
+
+
+def test_columnar_layout_shares_types_and_photo_affixes():
+    payload = to_columnar(PLACES)
+
+    assert payload["types"] == ["castle", "square"]
+    assert payload["columns"]["type"] == [0, 1, 0]
+    assert payload["photo_prefix"] == "/api/photos/places/"
+    assert payload["columns"]["photos"][0] == ["a", "b"]
+    assert payload["columns"]["photo_url"][0] == 0
+    assert payload["absent"] == {"rating": [2], "photo_url": [2], "website": [0, 1]}
+
+
+def test_empty_list_round_trips():
+    assert from_columnar(to_columnar([])) == []
+
+
+def test_msgpack_encodes_the_columnar_payload():
+    packed = pack_msgpack(to_columnar(PLACES))
+
+    assert from_columnar(msgpack.unpackb(packed, raw=False)) == PLACES
@@ -0,0 +1,73 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+
+pytest.importorskip("gunicorn")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def server(tmp_path):
+    port = free_port()
+    env = dict(os.environ, CACHE_DIR=str(tmp_path), PREWARM="False")
+    env.pop("CACHE_DB_PATH", None)
+    process = subprocess.Popen(
+        [sys.executable, "serve.py", "--host", "127.0.0.1", "--port", str(port)]
+        + ["--workers", "2", "--threads", "4"],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while True:
+        assert process.poll() is None, "server exited on startup"
+        try:
+            httpx.get(f"{url}/api/health", timeout=1)
+            break
+        except httpx.TransportError:
+            assert time.monotonic() < deadline, "server did not start"
+            time.sleep(0.1)
+    yield process, url
+    if process.poll() is None:
+        process.send_signal(signal.SIGTERM)
+        process.wait(30)
+
+
+def test_workers_serve_requests_with_a_share_of_the_rate_limits(server):
+    process, url = server
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        responses = list(
+            pool.map(lambda _: httpx.get(f"{url}/api/health", timeout=10), range(16))
+        )
+
+    assert {response.status_code for response in responses} == {200}
+    health = responses[0].json()
+    assert health["scheduler"]["share"] == 0.5
+    missing = httpx.get(f"{url}/api/jobs/unknown", timeout=10)
+    assert missing.status_code == 404
+    assert missing.json() == {"error": "Job not found"}
+
+
+def test_the_server_shuts_down_on_sigterm(server):
+    process, url = server
+
+    process.send_signal(signal.SIGTERM)
+
+    assert process.wait(30) == 0
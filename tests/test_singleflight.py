@@ -0,0 +1,84 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from singleflight import SharedLease, SingleFlight
+
+
+def test_concurrent_callers_share_one_execution():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "result"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("k", work)))
+    leader.start()
+    assert started.wait(5)
+    followers = [
+        threading.Thread(target=lambda: results.append(flight.do("k", work)))
+        for _ in range(4)
+    ]
+    for thread in followers:
+        thread.start()
+    while flight.stats()["coalesced"] < 4:
+        time.sleep(0.001)
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join(5)
+
+    assert results == ["result"] * 5
+    assert len(calls) == 1
+    assert flight.stats() == {"executions": 1, "coalesced": 4, "in_flight": 0}
+
+
+def test_exceptions_reach_every_caller_and_the_key_is_released():
+    flight = SingleFlight()
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        flight.do("k", fail)
+    assert not flight.in_flight("k")
+    assert flight.do("k", lambda: 2) == 2
+
+
+def test_lease_is_exclusive_across_instances(tmp_path):
+    db_path = str(tmp_path / "state.sqlite3")
+    first = SharedLease(db_path, ttl=30, poll_interval=0.01)
+    second = SharedLease(db_path, ttl=30, poll_interval=0.01)
+    polls = []
+
+    def poll():
+        polls.append(1)
+        return "from the other worker" if len(polls) > 2 else None
+
+    def hold():
+        # While first holds the lease, second only polls
+        return second.run("video", lambda: "ran twice", poll)
+
+    assert first.run("video", hold, lambda: None) == "from the other worker"
+    assert len(polls) == 3
+    # Released: the next caller runs the work itself
+    assert second.run("video", lambda: "ran", lambda: None) == "ran"
+
+
+def test_expired_lease_is_taken_over(tmp_path):
+    db_path = str(tmp_path / "state.sqlite3")
+    alive = SharedLease(db_path, ttl=30)
+    # Left behind by a worker that died while holding the lease
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO leases VALUES ('video', 'dead:1', ?)", (time.time() - 1,))
+    conn.commit()
+    conn.close()
+
+    assert alive.run("video", lambda: "taken over", lambda: None) == "taken over"
@@ -0,0 +1,38 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_APP = """
+import os, threading
+threads = threading.active_count()
+from app import app
+print(sorted(os.listdir(os.environ["CACHE_DIR"])), threading.active_count() - threads)
+"""
+
+
+def test_importing_the_app_opens_nothing(tmp_path):
+    env = dict(os.environ, CACHE_DIR=str(tmp_path), PREWARM="False")
+    env.pop("CACHE_DB_PATH", None)
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_APP],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    assert result.stdout.split("\n")[0] == "[] 0"
+
+
+def test_health_check_does_not_create_the_job_manager():
+    import routes
+    from app import create_app
+
+    response = create_app(prewarm=False).test_client().get("/api/health")
+
+    assert response.status_code == 200
+    assert routes._job_manager is None
+    assert response.get_json()["jobs"] is None
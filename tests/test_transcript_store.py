@@ -0,0 +1,72 @@
+import os
+
+from models import Transcript, TranscriptSegment
+from transcript_store import MentionIndex, TranscriptStore
+
+
+def make_transcript(video_id="abc"):
+    return Transcript(
+        video_id=video_id,
+        language="en",
+        segments=[
+            TranscriptSegment("Good morning from", 0.0, 2.5),
+            TranscriptSegment("Lake  Como, then we", 2.5, 3.0),
+            TranscriptSegment("drove to Bellagio ż", 5.5, 2.0),
+        ],
+    )
+
+
+def test_store_round_trip(tmp_path):
+    TranscriptStore(str(tmp_path)).put(make_transcript())
+
+    stored = TranscriptStore(str(tmp_path)).get("abc", "en")
+    assert [(s.text, s.start) for s in stored.segments] == [
+        (s.text, s.start) for s in make_transcript().segments
+    ]
+    assert TranscriptStore(str(tmp_path)).get("abc", "pl") is None
+
+
+def test_stale_transcripts_are_misses(tmp_path):
+    store = TranscriptStore(str(tmp_path))
+    store.put(make_transcript())
+
+    assert TranscriptStore(str(tmp_path)).get("abc", "en", max_age=-1) is None
+
+
+def test_expired_transcripts_are_deleted(tmp_path):
+    TranscriptStore(str(tmp_path)).put(make_transcript())
+    path = next(tmp_path.iterdir())
+    os.utime(path, (1, 1))
+
+    store = TranscriptStore(str(tmp_path), ttl=3600)
+
+    assert not path.exists()
+    assert store.get("abc", "en") is None
+    assert store.stats()["evictions"] == 1
+
+
+def test_oldest_transcripts_are_evicted_beyond_max_bytes(tmp_path):
+    store = TranscriptStore(str(tmp_path))
+    store.put(make_transcript("old"))
+    size = store.stats()["bytes"]
+    bounded = TranscriptStore(str(tmp_path), max_bytes=size * 2 + size // 2)
+    os.utime(bounded._path("old", "en"), (1, 1))
+
+    bounded.put(make_transcript("mid"))
+    bounded.put(make_transcript("new"))
+    bounded.put(make_transcript("new"))
+
+    assert not os.path.exists(bounded._path("old", "en"))
+    assert os.path.exists(bounded._path("new", "en"))
+    assert bounded.stats()["bytes"] == size * 2
+    assert bounded.stats()["evictions"] == 1
+
+
+def test_mentions_are_found_across_segments_and_case():
+    index = MentionIndex(make_transcript())
+
+    assert index.find("lake como") == 2.5
+    assert index.find("then we drove") == 2.5
+    assert index.find("BELLAGIO") == 5.5
+    assert index.find("Milan") is None
+    assert index.find("  ") is None
@@ -0,0 +1,253 @@
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from models import Transcript, TranscriptSegment
+from config import logger
+from metrics import CACHE_LOOKUPS
+
+# File layout: header, fixed-size segment index, zlib-compressed UTF-8 text.
+# The header and index are read straight from a memory map; only the text
+# body is decompressed.
+MAGIC = b"TSC1"
+HEADER = struct.Struct("<4sII")  # magic, segment count, compressed text size
+SEGMENT = struct.Struct("<ffII")  # start, duration, text offset, text length
+
+_SAFE_NAME = re.compile(r"[^A-Za-z0-9_-]")
+
+
+class TranscriptStore:
+    """Compact on-disk transcript cache keyed by video_id and language.
+
+    Transcripts older than ``ttl`` are misses and are deleted; beyond
+    ``max_bytes`` the oldest files are evicted.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_memory_entries: int = 64,
+        max_bytes: int = 256 * 1024 * 1024,
+        ttl: float = 30 * 24 * 3600,
+    ):
+        self.directory = directory
+        self.max_memory_entries = max_memory_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._memory: "OrderedDict[Tuple[str, str], Transcript]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "writes": 0,
+            "evictions": 0,
+        }
+        os.makedirs(directory, exist_ok=True)
+        self._bytes = 0
+        self._evict()
+
+    def get(
+        self, video_id: str, language: str, max_age: Optional[float] = None
+    ) -> Optional[Transcript]:
+        """Return a stored transcript, or None when missing or older than max_age"""
+        key = (video_id, language)
+        with self._lock:
+            transcript = self._memory.get(key)
+            if transcript is not None:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                CACHE_LOOKUPS.inc(cache="transcripts", result="hit")
+                return transcript
+
+        path = self._path(video_id, language)
+        max_age = self.ttl if max_age is None else min(max_age, self.ttl)
+        try:
+            if time.time() - os.path.getmtime(path) > max_age:
+                raise FileNotFoundError(path)
+            transcript = self._read(path, video_id, language)
+        except FileNotFoundError:
+            with self._lock:
+                self._stats["misses"] += 1
+            CACHE_LOOKUPS.inc(cache="transcripts", result="miss")
+            return None
+        except (OSError, ValueError, struct.error, zlib.error) as e:
+            logger.warning(f"Corrupt transcript file {path}: {e}")
+            with self._lock:
+                self._stats["misses"] += 1
+            CACHE_LOOKUPS.inc(cache="transcripts", result="miss")
+            return None
+
+        with self._lock:
+            self._stats["disk_hits"] += 1
+            self._remember(key, transcript)
+        CACHE_LOOKUPS.inc(cache="transcripts", result="hit")
+        return transcript
+
+    def put(self, transcript: Transcript) -> None:
+        """Write a transcript to disk (atomically) and to the memory tier"""
+        path = self._path(transcript.video_id, transcript.language)
+        index = []
+        body = bytearray()
+        for segment in transcript.segments:
+            encoded = segment.text.encode("utf-8")
+            index.append(
+                SEGMENT.pack(segment.start, segment.duration, len(body), len(encoded))
+            )
+            body.extend(encoded)
+        compressed = zlib.compress(bytes(body), 6)
+
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        written = 0
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(HEADER.pack(MAGIC, len(index), len(compressed)))
+                f.write(b"".join(index))
+                f.write(compressed)
+            try:
+                replaced = os.stat(path).st_size
+            except FileNotFoundError:
+                replaced = 0
+            os.replace(tmp_path, path)
+            written = HEADER.size + len(index) * SEGMENT.size + len(compressed)
+            written -= replaced
+        except OSError as e:
+            logger.warning(f"Could not store transcript {path}: {e}")
+
+        with self._lock:
+            self._stats["writes"] += 1
+            self._remember((transcript.video_id, transcript.language), transcript)
+            self._bytes += written
+            over_budget = self._bytes > self.max_bytes
+        if over_budget:
+            self._evict()
+
+    def clear(self) -> None:
+        """Remove all stored transcripts from memory and disk"""
+        with self._lock:
+            self._memory.clear()
+        for path, _, _ in self._scan():
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.warning(f"Could not remove transcript {path}: {e}")
+        with self._lock:
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+            stats["bytes"] = self._bytes
+        stats["max_bytes"] = self.max_bytes
+        return stats
+
+    def _path(self, video_id: str, language: str) -> str:
+        return os.path.join(
+            self.directory,
+            f"{_SAFE_NAME.sub('_', video_id)}.{_SAFE_NAME.sub('_', language)}.tsc",
+        )
+
+    def _read(self, path: str, video_id: str, language: str) -> Transcript:
+        with open(path, "rb") as f, mmap.mmap(
+            f.fileno(), 0, access=mmap.ACCESS_READ
+        ) as data:
+            magic, count, compressed_size = HEADER.unpack_from(data, 0)
+            if magic != MAGIC:
+                raise ValueError("bad magic")
+
+            body_offset = HEADER.size + count * SEGMENT.size
+            body = zlib.decompress(data[body_offset : body_offset + compressed_size])
+
+            segments = []
+            for i in range(count):
+                start, duration, offset, length = SEGMENT.unpack_from(
+                    data, HEADER.size + i * SEGMENT.size
+                )
+                segments.append(
+                    TranscriptSegment(
+                        text=body[offset : offset + length].decode("utf-8"),
+                        start=round(start, 3),
+                        duration=round(duration, 3),
+                    )
+                )
+
+        return Transcript(video_id=video_id, language=language, segments=segments)
+
+    def _evict(self) -> None:
+        """Delete expired transcripts, then the oldest down to 90% of max_bytes"""
+        expired_before = time.time() - self.ttl
+        entries = sorted(self._scan(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9 if total > self.max_bytes else total
+        evicted = 0
+        for path, size, mtime in entries:
+            if mtime >= expired_before and total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            evicted += 1
+        with self._lock:
+            self._bytes = total
+            self._stats["evictions"] += evicted
+        if evicted:
+            logger.info(f"🧹 Evicted {evicted} cached transcripts")
+
+    def _scan(self) -> List[Tuple[str, int, float]]:
+        """(path, size, mtime) of every stored transcript"""
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.endswith(".tsc"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((entry.path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def _remember(self, key: Tuple[str, str], transcript: Transcript) -> None:
+        self._memory[key] = transcript
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+
+class MentionIndex:
+    """Finds where phrases are first said in a transcript.
+
+    Matching is case-insensitive and works across segment boundaries. The
+    transcript text is prepared once, so phrases can be looked up one by one
+    as they become known.
+    """
+
+    def __init__(self, transcript: Transcript):
+        self.segments = transcript.segments
+        self.offsets = []
+        parts = []
+        position = 0
+        for segment in transcript.segments:
+            self.offsets.append(position)
+            text = re.sub(r"\s+", " ", segment.text).casefold()
+            parts.append(text)
+            position += len(text) + 1
+        self.haystack = " ".join(parts)
+
+    def find(self, phrase: str) -> Optional[float]:
+        """Start time of the segment where phrase first appears, or None"""
+        needle = re.sub(r"\s+", " ", phrase).strip().casefold()
+        found = self.haystack.find(needle) if needle else -1
+        if found < 0:
+            return None
+        return self.segments[bisect_right(self.offsets, found) - 1].start